@@ -1,49 +1,238 @@
 #!/usr/local/bin/python
 
+import io
+
 import writing
 
+
+# Each node describes how it is written as a list of (step, argument) pairs,
+# returned by its _renderSteps() method. GmCode.writeCode() performs the steps
+# by recursing into child nodes, while writeCodeIteratively() performs the
+# same steps with an explicit stack, so both always produce the same output.
+_kWrite = 0
+_kWriteLine = 1
+_kIndent = 2
+_kDedent = 3
+_kCode = 4
+
+
+def _performStep(writer, step, argument, indents):
+    if step == _kWrite:
+        writer.write(argument)
+    elif step == _kWriteLine:
+        writer.writeLine(argument)
+    elif step == _kIndent:
+        indent = writer.indent(argument)
+        indent.__enter__()
+        indents.append(indent)
+    elif step == _kDedent:
+        indents.pop().__exit__(None, None, None)
+
+
+# Expressions are interned: constructing an expression that is equal to one
+# that already exists returns the existing node, so equal subtrees are shared.
+# Expressions are immutable, and each one remembers the text it renders to,
+# so a shared subtree is only rendered once.
+class _NodeCache(object):
+
+    __slots__ = ('_nodes', '_maxNodes', 'internHits', 'internMisses',
+            'renderHits', 'renderMisses')
+
+    def __init__(self, maxNodes=None):
+        self._nodes = {}
+        self._maxNodes = maxNodes
+        self.resetCounters()
+
+    def resetCounters(self):
+        self.internHits = 0
+        self.internMisses = 0
+        self.renderHits = 0
+        self.renderMisses = 0
+
+    def intern(self, cls, key):
+        cacheKey = (cls,) + key
+        node = self._nodes.get(cacheKey)
+        if node is not None:
+            self.internHits += 1
+            return node
+        self.internMisses += 1
+        if self._maxNodes is not None and len(self._nodes) >= self._maxNodes:
+            self.clear()
+        node = object.__new__(cls)
+        node._initialize(*key)
+        self._nodes[cacheKey] = node
+        return node
+
+    def clear(self):
+        for node in self._nodes.values():
+            _setAttribute(node, '_renderedText', None)
+        self._nodes.clear()
+
+    def setMaxNodes(self, maxNodes):
+        self._maxNodes = maxNodes
+        if maxNodes is not None and len(self._nodes) > maxNodes:
+            self.clear()
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+# The default cap on the number of interned expressions, so that the cache
+# does not keep every expression of a long run alive.
+kDefaultCacheLimit = 1 << 16
+
+_setAttribute = object.__setattr__
+_nodeCache = _NodeCache(kDefaultCacheLimit)
+
+
+def _ratio(hits, misses):
+    return float(hits) / (hits + misses) if hits + misses else 0.0
+
+
+def getCacheStatistics():
+    return {
+        'nodes': len(_nodeCache),
+        'internHits': _nodeCache.internHits,
+        'internMisses': _nodeCache.internMisses,
+        'internHitRatio': _ratio(
+                _nodeCache.internHits, _nodeCache.internMisses),
+        'renderHits': _nodeCache.renderHits,
+        'renderMisses': _nodeCache.renderMisses,
+        'renderHitRatio': _ratio(
+                _nodeCache.renderHits, _nodeCache.renderMisses),
+    }
+
+
+# Forgets all interned expressions and their rendered text, and resets the
+# statistics. Nodes that are still referenced keep working, but are no longer
+# shared with expressions constructed afterwards.
+def clearCache():
+    _nodeCache.clear()
+    _nodeCache.resetCounters()
+
+
+# Caps the number of interned expressions. When the cap is reached, the cache
+# is cleared and starts filling up again. None means no cap. The cap defaults
+# to kDefaultCacheLimit.
+def setCacheLimit(maxNodes):
+    _nodeCache.setMaxNodes(maxNodes)
+
+
+# Writes code to writer exactly like code.writeCode(writer) does, but walks
+# the tree with an explicit stack instead of recursing into the children of
+# each node, so trees of any depth can be written.
+def writeCodeIteratively(code, writer):
+    stack = [(_kCode, code)]
+    indents = []
+    while stack:
+        step, argument = stack.pop()
+        if step == _kWrite:
+            writer.write(argument)
+        elif step == _kCode:
+            stack.extend(reversed(argument._cachedRenderSteps(writer)))
+        else:
+            _performStep(writer, step, argument, indents)
+
+
 class CodeWriter(object):
 
+    __slots__ = ('_writer',)
+
     def __init__(self, writer=None):
         self._writer = writer if writer else writing.IndentWriter()
 
 
 class GmCode(object):
 
+    __slots__ = ()
+
     def writeCode(self, writer):
-        pass
+        indents = []
+        for step, argument in self._renderSteps(writer):
+            if step == _kWrite:
+                writer.write(argument)
+            elif step == _kCode:
+                argument.writeCode(writer)
+            else:
+                _performStep(writer, step, argument, indents)
+
+    def _renderSteps(self, writer):
+        return []
+
+    def _cachedRenderSteps(self, writer):
+        return self._renderSteps(writer)
 
 
 class Expression(GmCode):
 
-    def __init__(self, text):
-        self._text = text
+    __slots__ = ('_text', '_renderedText')
+
+    def __new__(cls, *args, **kwargs):
+        return _nodeCache.intern(cls, cls._internKey(*args, **kwargs))
+
+    @staticmethod
+    def _internKey(text):
+        return (text,)
+
+    def _initialize(self, text):
+        _setAttribute(self, '_text', text)
+        _setAttribute(self, '_renderedText', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+    def renderedText(self):
+        if self._renderedText is not None:
+            _nodeCache.renderHits += 1
+            return self._renderedText
+        _nodeCache.renderMisses += 1
+        output = io.StringIO()
+        GmCode.writeCode(self, writing.LineWriter(output))
+        _setAttribute(self, '_renderedText', output.getvalue())
+        return self._renderedText
 
     def writeCode(self, writer):
-        writer.write(self._text)
+        writer.write(self.renderedText())
+
+    # The iterative renderer reuses rendered text, but does not store it, as
+    # that would take quadratic memory for very deep trees.
+    def _cachedRenderSteps(self, writer):
+        if self._renderedText is not None:
+            _nodeCache.renderHits += 1
+            return [(_kWrite, self._renderedText)]
+        _nodeCache.renderMisses += 1
+        return self._renderSteps(writer)
+
+    def _renderSteps(self, writer):
+        return [(_kWrite, self._text)]
 
 
 class Statement(GmCode):
 
+    __slots__ = ('_expression',)
+
     def __init__(self, expression):
         self._expression = expression
 
-    def writeCode(self, writer):
-        self._expression.writeCode(writer)
-        writer.writeLine(';')
+    def _renderSteps(self, writer):
+        return [(_kCode, self._expression), (_kWriteLine, ';')]
 
 
 class Comment(Statement):
 
+    __slots__ = ('_text',)
+
     def __init__(self, text=None):
         self._text = ' %s' % text if text else ''
 
-    def writeCode(self, writer):
-        writer.writeLine('//%s' % self._text)
+    def _renderSteps(self, writer):
+        return [(_kWriteLine, '//%s' % self._text)]
 
 
 class ScriptPrototype(Statement):
 
+    __slots__ = ('_functionName', '_arguments', '_returnType')
+
     def __init__(self, functionName, arguments=None, returnType=None):
         self._functionName = functionName
         self._arguments = arguments if arguments else []
@@ -53,97 +242,129 @@ class ScriptPrototype(Statement):
             prefix = '; -> ' if arguments else '-> '
             self._returnType = prefix + returnType
 
-    def writeCode(self, writer):
-        writer.writeLine(
+    def _renderSteps(self, writer):
+        return [(_kWriteLine,
                 '///%s(%s%s)' % (
                         self._functionName,
                         ', '.join(self._arguments),
-                        self._returnType))
+                        self._returnType))]
 
 
 class ScriptHeader(Statement):
 
+    __slots__ = ('_text',)
+
     def __init__(self, text):
         self._text = text
 
-    def writeCode(self, writer):
+    def _renderSteps(self, writer):
         asterisks = '*' * (writer.getRemainingSpaceInLine() - 1)
-        writer.writeLine('/' + asterisks)
-        writer.writeLine(self._text)
-        writer.writeLine(asterisks + '/')
+        return [
+            (_kWriteLine, '/' + asterisks),
+            (_kWriteLine, self._text),
+            (_kWriteLine, asterisks + '/'),
+        ]
 
 
 class FunctionCall(Expression):
 
-    def __init__(self, functionName, arguments=None):
-        self._functionName = functionName
-        self._arguments = arguments if arguments else []
+    __slots__ = ('_functionName', '_arguments')
 
-    def writeCode(self, writer):
-        writer.write('%s(' % self._functionName)
+    @staticmethod
+    def _internKey(functionName, arguments=None):
+        return (functionName, tuple(arguments) if arguments else ())
+
+    def _initialize(self, functionName, arguments):
+        _setAttribute(self, '_functionName', functionName)
+        _setAttribute(self, '_arguments', arguments)
+        _setAttribute(self, '_renderedText', None)
+
+    def _renderSteps(self, writer):
+        steps = [(_kWrite, '%s(' % self._functionName)]
         if len(self._arguments):
             for argument in self._arguments[:-1]:
-                argument.writeCode(writer)
-                writer.write(', ')
-            self._arguments[-1].writeCode(writer)
-        writer.write(')')
+                steps.append((_kCode, argument))
+                steps.append((_kWrite, ', '))
+            steps.append((_kCode, self._arguments[-1]))
+        steps.append((_kWrite, ')'))
+        return steps
 
 
 class BinaryOperation(Expression):
 
+    __slots__ = ('_leftOperand', '_operator', '_rightOperand')
+
     kValidOperators = ['+', '-', '*', '/', '%', 'div', 'mod']
 
-    def __init__(self, leftOperand, operator, rightOperand):
-        assert operator in self.kValidOperators
+    @classmethod
+    def _internKey(cls, leftOperand, operator, rightOperand):
+        assert operator in cls.kValidOperators
         assert isinstance(leftOperand, Expression)
         assert isinstance(rightOperand, Expression)
-        self._leftOperand = leftOperand
-        self._operator = operator
-        self._rightOperand = rightOperand
+        return (leftOperand, operator, rightOperand)
 
-    def writeCode(self, writer):
-        self._leftOperand.writeCode(writer)
-        writer.write(' %s ' % self._operator)
-        self._rightOperand.writeCode(writer)
+    def _initialize(self, leftOperand, operator, rightOperand):
+        _setAttribute(self, '_leftOperand', leftOperand)
+        _setAttribute(self, '_operator', operator)
+        _setAttribute(self, '_rightOperand', rightOperand)
+        _setAttribute(self, '_renderedText', None)
 
+    def _renderSteps(self, writer):
+        return [
+            (_kCode, self._leftOperand),
+            (_kWrite, ' %s ' % self._operator),
+            (_kCode, self._rightOperand),
+        ]
 
 
 class IfClause(GmCode):
 
+    __slots__ = ('_condition', '_body')
+
     def __init__(self, condition, body):
         assert isinstance(condition, Expression)
         assert isinstance(body, Statement)
         self._condition = condition
         self._body = body
 
-    def writeCode(self, writer):
-        writer.write('if (')
-        self._condition.writeCode(writer)
-        writer.writeLine(') {')
-        with writer.indent():
-            self._body.writeCode(writer)
-        writer.write('}')
+    def _renderSteps(self, writer):
+        return [
+            (_kWrite, 'if ('),
+            (_kCode, self._condition),
+            (_kWriteLine, ') {'),
+            (_kIndent, 1),
+            (_kCode, self._body),
+            (_kDedent, None),
+            (_kWrite, '}'),
+        ]
 
 
 class ElseIfClause(GmCode):
 
+    __slots__ = ('_condition', '_body')
+
     def __init__(self, condition, body):
         assert isinstance(condition, Expression)
         assert isinstance(body, Statement)
         self._condition = condition
         self._body = body
 
-    def writeCode(self, writer):
-        writer.write(' else if (')
-        self._condition.writeCode(writer)
-        writer.writeLine(') {')
-        with writer.indent():
-            self._body.writeCode(writer)
-        writer.write('}')
+    def _renderSteps(self, writer):
+        return [
+            (_kWrite, ' else if ('),
+            (_kCode, self._condition),
+            (_kWriteLine, ') {'),
+            (_kIndent, 1),
+            (_kCode, self._body),
+            (_kDedent, None),
+            (_kWrite, '}'),
+        ]
 
 
 class IfStatement(Statement):
 
+    __slots__ = ('_ifClause', '_elseIfClauses', '_elseClause')
+
     def __init__(self, ifClause, *elseClauses):
         assert isinstance(ifClause, IfClause)
         assert all(
@@ -161,24 +382,31 @@ class IfStatement(Statement):
                 self._elseIfClauses = elseClauses[:-1]
                 self._elseClause = elseClauses[-1]
         else:
-            self._elseIfClauses = []
+            self._elseIfClauses = ()
             self._elseClause = None
 
-    def writeCode(self, writer):
-        self._ifClause.writeCode(writer)
-        for elseClause in self._elseIfClauses:
-            elseClause.writeCode(writer)
+    def _renderSteps(self, writer):
+        steps = [(_kCode, self._ifClause)]
+        steps.extend(
+                (_kCode, elseClause) for elseClause in self._elseIfClauses)
         if self._elseClause:
-            writer.writeLine(' else {')
-            with writer.indent():
-                self._elseClause.writeCode(writer)
-            writer.writeLine('}')
+            steps.extend([
+                (_kWriteLine, ' else {'),
+                (_kIndent, 1),
+                (_kCode, self._elseClause),
+                (_kDedent, None),
+                (_kWriteLine, '}'),
+            ])
         else:
-            writer.writeLine('')
+            steps.append((_kWriteLine, ''))
+        return steps
 
 
 class ForLoop(Statement):
 
+    __slots__ = ('_initializerExpression', '_conditionExpression',
+            '_updateExpression', '_body')
+
     def __init__(self, initializerExpression, conditionExpression,
             updateExpression, body):
         assert all(
@@ -193,47 +421,58 @@ class ForLoop(Statement):
         self._updateExpression = updateExpression
         self._body = body
 
-    def writeCode(self, writer):
-        writer.write('for (')
-        self._initializerExpression.writeCode(writer)
-        writer.write('; ')
-        self._conditionExpression.writeCode(writer)
-        writer.write('; ')
-        self._updateExpression.writeCode(writer)
-        writer.writeLine(') {')
-        with writer.indent():
-            self._body.writeCode(writer)
-        writer.writeLine('}')
+    def _renderSteps(self, writer):
+        return [
+            (_kWrite, 'for ('),
+            (_kCode, self._initializerExpression),
+            (_kWrite, '; '),
+            (_kCode, self._conditionExpression),
+            (_kWrite, '; '),
+            (_kCode, self._updateExpression),
+            (_kWriteLine, ') {'),
+            (_kIndent, 1),
+            (_kCode, self._body),
+            (_kDedent, None),
+            (_kWriteLine, '}'),
+        ]
 
 
 class VariableAssignment(Expression):
 
-    def __init__(self, varName, expression=None, declaration=True):
+    __slots__ = ('_varName', '_expression', '_declaration')
+
+    @staticmethod
+    def _internKey(varName, expression=None, declaration=True):
         if expression:
             assert isinstance(expression, Expression)
-        self._varName = varName
-        self._expression = expression
-        self._declaration = declaration
+        return (varName, expression, bool(declaration))
 
-    def writeCode(self, writer):
+    def _initialize(self, varName, expression, declaration):
+        _setAttribute(self, '_varName', varName)
+        _setAttribute(self, '_expression', expression)
+        _setAttribute(self, '_declaration', declaration)
+        _setAttribute(self, '_renderedText', None)
+
+    def _renderSteps(self, writer):
+        steps = []
         if self._declaration:
-            writer.write('var ')
-        writer.write(self._varName)
+            steps.append((_kWrite, 'var '))
+        steps.append((_kWrite, self._varName))
         if self._expression:
-            writer.write(' = ')
-            self._expression.writeCode(writer)
+            steps.append((_kWrite, ' = '))
+            steps.append((_kCode, self._expression))
+        return steps
 
 
 class Statements(Statement):
 
+    __slots__ = ('_statements',)
+
     def __init__(self, statements):
         assert all(
                 isinstance(statement, Statement)
                 for statement in statements)
         self._statements = list(statements)
 
-    def writeCode(self, writer):
-        for statement in self._statements:
-            statement.writeCode(writer)
-
-
+    def _renderSteps(self, writer):
+        return [(_kCode, statement) for statement in self._statements]
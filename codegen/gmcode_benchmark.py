@@ -0,0 +1,170 @@
+#!/usr/local/bin/python
+
+"""Benchmarks for building and writing gmcode trees.
+
+The memory benchmark builds the ASTs for a synthetic project with tracemalloc
+running and reports the peak memory, once with the gmcode module as it is
+and once with a baseline copy of it, whose classes have their __slots__
+removed and whose expressions are not interned, which is how the nodes were
+laid out before. So the saving it reports is that of __slots__ and interning
+together, against the original representation.
+
+The render benchmark writes the same project with the recursive
+GmCode.writeCode() and with gmcode.writeCodeIteratively(), and checks that
+both produce the same text. Each renderer starts with an empty expression
+cache; the cache hit ratios are reported for the recursive renderer, which
+is the one that fills the render cache.
+
+To run:
+
+  python gmcode_benchmark.py [numberOfScripts]
+"""
+
+import ast
+import io
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+import gmcode
+import writing
+
+
+kDefaultNumberOfScripts = 10000
+
+
+def buildSyntheticScript(module, i):
+    e = module.Expression
+    className = 'Class%d' % i
+    return module.Statements([
+        module.ScriptPrototype(
+                '%s_doThing' % className, ['self', 'count real'], 'real'),
+        module.ScriptHeader('%s_doThing' % className),
+        module.Comment('This is a wrapper script created by GMIDL.'),
+        module.Statement(module.VariableAssignment('self', e('argument0'))),
+        module.Statement(module.VariableAssignment('count', e('argument1'))),
+        module.IfStatement(
+            module.IfClause(
+                e('GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY'),
+                module.Statement(module.FunctionCall('__check_instanceof__', [
+                    e('self'),
+                    e(className),
+                ]))),
+            module.ElseIfClause(
+                e('GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_DSMAP'),
+                module.Statement(module.FunctionCall('ds_map_find_value', [
+                    e('self'),
+                    e('"count"'),
+                ]))),
+            module.Statement(module.FunctionCall('NOTREACHED'))),
+        module.ForLoop(
+            module.VariableAssignment('i', e('0')),
+            e('i < count'),
+            e('i++'),
+            module.Statements([
+                module.Statement(module.VariableAssignment(
+                    'total',
+                    module.BinaryOperation(
+                        e('total'),
+                        '+',
+                        module.BinaryOperation(e('i'), '*', e('2'))),
+                    False)),
+            ])),
+        module.Statement(module.FunctionCall('return', [e('total')])),
+    ])
+
+
+def buildSyntheticProject(module, numberOfScripts):
+    return [buildSyntheticScript(module, i) for i in range(numberOfScripts)]
+
+
+# Builds a new node for every expression, instead of interning it.
+def _newUnsharedExpression(cls, *args, **kwargs):
+    node = object.__new__(cls)
+    node._initialize(*cls._internKey(*args, **kwargs))
+    return node
+
+
+def loadBaselineGmcode():
+    """Returns a copy of the gmcode module without any __slots__, which does
+    not intern expressions."""
+    class RemoveSlots(ast.NodeTransformer):
+        def visit_Assign(self, node):
+            if any(isinstance(target, ast.Name) and target.id == '__slots__'
+                    for target in node.targets):
+                return None
+            return node
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+            'gmcode.py')
+    with open(path) as file:
+        tree = RemoveSlots().visit(ast.parse(file.read(), path))
+    module = types.ModuleType('gmcode_baseline')
+    module.__file__ = path
+    exec(compile(ast.fix_missing_locations(tree), path, 'exec'),
+            module.__dict__)
+    module.Expression.__new__ = staticmethod(_newUnsharedExpression)
+    return module
+
+
+# Every run starts from an empty intern cache, so that it does not reuse the
+# expressions of an earlier run.
+def measurePeakMemory(module, numberOfScripts):
+    module.clearCache()
+    tracemalloc.start()
+    try:
+        buildSyntheticProject(module, numberOfScripts)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def runMemoryBenchmark(numberOfScripts):
+    print('Peak memory building %d scripts:' % numberOfScripts)
+    baseline = measurePeakMemory(loadBaselineGmcode(), numberOfScripts)
+    current = measurePeakMemory(gmcode, numberOfScripts)
+    print('  baseline                 %10.1f MiB' % (baseline / 2.0 ** 20))
+    print('  __slots__ and interning  %10.1f MiB (%.0f%%)' % (
+            current / 2.0 ** 20, 100.0 * current / baseline))
+
+
+def _timeRenderer(writeCode, project):
+    output = io.StringIO()
+    start = time.perf_counter()
+    with writing.IndentWriter(
+            lineWriter=writing.BufferedLineWriter(output)) as writer:
+        for script in project:
+            writeCode(script, writer)
+    return output.getvalue(), time.perf_counter() - start
+
+
+def runRenderBenchmark(numberOfScripts):
+    print('Writing %d scripts:' % numberOfScripts)
+    gmcode.clearCache()
+    project = buildSyntheticProject(gmcode, numberOfScripts)
+    iterativeText, iterativeTime = _timeRenderer(
+            gmcode.writeCodeIteratively, project)
+    gmcode.clearCache()
+    project = buildSyntheticProject(gmcode, numberOfScripts)
+    recursiveText, recursiveTime = _timeRenderer(
+            lambda code, writer: code.writeCode(writer), project)
+    assert recursiveText == iterativeText
+    print('  writeCodeIteratively %8.3fs' % iterativeTime)
+    print('  writeCode            %8.3fs (%.0f%%)' % (
+            recursiveTime, 100.0 * recursiveTime / iterativeTime))
+    statistics = gmcode.getCacheStatistics()
+    print('  %d interned expressions, %.1f%% intern hits, '
+            '%.1f%% render hits' % (
+                    statistics['nodes'],
+                    100.0 * statistics['internHitRatio'],
+                    100.0 * statistics['renderHitRatio']))
+
+
+if __name__ == '__main__':
+    numberOfScripts = (
+            int(sys.argv[1]) if len(sys.argv) > 1
+            else kDefaultNumberOfScripts)
+    runMemoryBenchmark(numberOfScripts)
+    runRenderBenchmark(numberOfScripts)
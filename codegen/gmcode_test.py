@@ -1,5 +1,6 @@
 #!/usr/local/bin/python
 
+import io
 import itertools
 import unittest
 
@@ -33,10 +34,13 @@ class CodeWritingTest(unittest.TestCase):
         self.assertEqual(len(self.expectedResults), len(self.fixtures))
         for fixture, expectedResult in zip(
                 self.fixtures, self.expectedResults):
-            fixture.writeCode(self.writer)
+            self.writeCode(fixture)
             self.assertEqual(self.recorder.readAll(), expectedResult)
             self.recorder.reset()
 
+    def writeCode(self, code):
+        code.writeCode(self.writer)
+
     def testWriteComment(self):
         self.expectedResults += [
             '// This is a comment.\n',
@@ -301,6 +305,253 @@ The above line was skipped.
         ]
 
 
+class IterativeCodeWritingTest(CodeWritingTest):
+
+    def writeCode(self, code):
+        gmcode.writeCodeIteratively(code, self.writer)
+
+
+class DeepTreeTest(unittest.TestCase):
+
+    kDepth = 10001
+
+    def setUp(self):
+        self.output = io.StringIO()
+        # Without indentation, the output stays linear in the depth.
+        self.writer = writing.IndentWriter(self.output, indentWidth=0)
+
+    def assertWritesIteratively(self, code, expectedResult):
+        gmcode.writeCodeIteratively(code, self.writer)
+        self.assertEqual(self.output.getvalue(), expectedResult)
+
+    def testLongBinaryOperationChain(self):
+        code = gmcode.Expression('x')
+        for i in range(self.kDepth):
+            code = gmcode.BinaryOperation(code, '+', gmcode.Expression('x'))
+        self.assertWritesIteratively(
+                code, ' + '.join(['x'] * (self.kDepth + 1)))
+
+    def testNestedFunctionCalls(self):
+        code = gmcode.Expression('x')
+        for i in range(self.kDepth):
+            code = gmcode.FunctionCall('f', [code])
+        self.assertWritesIteratively(
+                code, 'f(' * self.kDepth + 'x' + ')' * self.kDepth)
+
+    def testNestedIfStatements(self):
+        code = gmcode.Statement(gmcode.FunctionCall('a'))
+        for i in range(self.kDepth):
+            code = gmcode.IfStatement(
+                    gmcode.IfClause(gmcode.Expression('c'), code))
+        self.assertWritesIteratively(
+                code,
+                'if (c) {\n' * self.kDepth + 'a();\n' + '}\n' * self.kDepth)
+
+    def testNestedElseIfLadder(self):
+        code = gmcode.Statement(gmcode.FunctionCall('c'))
+        for i in range(self.kDepth):
+            code = gmcode.IfStatement(
+                    gmcode.IfClause(
+                        gmcode.Expression('x'),
+                        gmcode.Statement(gmcode.FunctionCall('a'))),
+                    gmcode.ElseIfClause(
+                        gmcode.Expression('y'),
+                        gmcode.Statement(gmcode.FunctionCall('b'))),
+                    code)
+        self.assertWritesIteratively(
+                code,
+                'if (x) {\na();\n} else if (y) {\nb();\n} else {\n'
+                        * self.kDepth
+                    + 'c();\n'
+                    + '}\n' * self.kDepth)
+
+    def testNestedStatementsAndForLoops(self):
+        code = gmcode.Statement(gmcode.FunctionCall('a'))
+        for i in range(self.kDepth):
+            code = gmcode.Statements([
+                gmcode.ForLoop(
+                    gmcode.Expression('i'),
+                    gmcode.Expression('j'),
+                    gmcode.Expression('k'),
+                    code),
+            ])
+        self.assertWritesIteratively(
+                code,
+                'for (i; j; k) {\n' * self.kDepth
+                    + 'a();\n'
+                    + '}\n' * self.kDepth)
+
+    def testLongStatementList(self):
+        code = gmcode.Statements([
+            gmcode.Statement(gmcode.FunctionCall('f%d' % i))
+            for i in range(self.kDepth)
+        ])
+        self.assertWritesIteratively(
+                code,
+                ''.join('f%d();\n' % i for i in range(self.kDepth)))
+
+    def testIndentationMatchesRecursiveWriter(self):
+        code = gmcode.Statement(gmcode.FunctionCall('a'))
+        for i in range(50):
+            code = gmcode.IfStatement(
+                    gmcode.IfClause(
+                        gmcode.Expression('x'),
+                        gmcode.Statement(gmcode.FunctionCall('b'))),
+                    gmcode.ElseIfClause(
+                        gmcode.Expression('y'),
+                        gmcode.Statement(gmcode.FunctionCall('c'))),
+                    gmcode.ForLoop(
+                        gmcode.Expression('i'),
+                        gmcode.Expression('j'),
+                        gmcode.Expression('k'),
+                        gmcode.Statements([
+                            gmcode.Statement(gmcode.FunctionCall('d')),
+                            code,
+                        ])))
+        recursiveOutput = io.StringIO()
+        code.writeCode(writing.IndentWriter(recursiveOutput))
+        iterativeOutput = io.StringIO()
+        gmcode.writeCodeIteratively(
+                code, writing.IndentWriter(iterativeOutput))
+        self.assertEqual(
+                iterativeOutput.getvalue(), recursiveOutput.getvalue())
+
+
+class NodeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        gmcode.setCacheLimit(None)
+        gmcode.clearCache()
+
+    def tearDown(self):
+        gmcode.setCacheLimit(gmcode.kDefaultCacheLimit)
+        gmcode.clearCache()
+
+    def testEqualExpressionsAreShared(self):
+        self.assertIs(gmcode.Expression('a'), gmcode.Expression('a'))
+        self.assertIsNot(gmcode.Expression('a'), gmcode.Expression('b'))
+        self.assertIs(
+                gmcode.FunctionCall('f'), gmcode.FunctionCall('f', []))
+        self.assertIs(
+                gmcode.FunctionCall('f', [gmcode.Expression('a')]),
+                gmcode.FunctionCall('f', (gmcode.Expression('a'),)))
+        self.assertIs(
+                gmcode.BinaryOperation(
+                    gmcode.Expression('a'), '+', gmcode.Expression('b')),
+                gmcode.BinaryOperation(
+                    gmcode.Expression('a'), '+', gmcode.Expression('b')))
+        self.assertIsNot(
+                gmcode.BinaryOperation(
+                    gmcode.Expression('a'), '+', gmcode.Expression('b')),
+                gmcode.BinaryOperation(
+                    gmcode.Expression('a'), '-', gmcode.Expression('b')))
+        self.assertIs(
+                gmcode.VariableAssignment('i', gmcode.Expression('0')),
+                gmcode.VariableAssignment(
+                    'i', gmcode.Expression('0'), declaration=True))
+
+    def testDifferentNodeTypesAreNotShared(self):
+        self.assertIsNot(gmcode.Expression('f()'), gmcode.FunctionCall('f'))
+
+    def testExpressionsAreImmutable(self):
+        expression = gmcode.FunctionCall('f')
+        with self.assertRaises(AttributeError):
+            expression._functionName = 'g'
+
+    def testSharedSubtreeIsRenderedOnce(self):
+        check = gmcode.FunctionCall('__check_instanceof__', [
+            gmcode.Expression('argument[0]'),
+            gmcode.Expression('Foo'),
+        ])
+        output = io.StringIO()
+        writer = writing.IndentWriter(output)
+        for i in range(3):
+            gmcode.Statement(gmcode.FunctionCall('__check_instanceof__', [
+                gmcode.Expression('argument[0]'),
+                gmcode.Expression('Foo'),
+            ])).writeCode(writer)
+        self.assertEqual(
+                output.getvalue(),
+                '__check_instanceof__(argument[0], Foo);\n' * 3)
+        statistics = gmcode.getCacheStatistics()
+        # The call and its two arguments are rendered the first time only.
+        self.assertEqual(statistics['renderMisses'], 3)
+        self.assertEqual(statistics['renderHits'], 2)
+        self.assertEqual(statistics['internMisses'], 3)
+        self.assertEqual(statistics['internHits'], 9)
+        self.assertEqual(statistics['internHitRatio'], 9.0 / 12)
+        self.assertEqual(statistics['renderHitRatio'], 2.0 / 5)
+        self.assertEqual(check.renderedText(),
+                '__check_instanceof__(argument[0], Foo)')
+
+    def testIterativeRendererReusesRenderedText(self):
+        call = gmcode.FunctionCall('f', [gmcode.Expression('a')])
+        call.renderedText()
+        output = io.StringIO()
+        gmcode.writeCodeIteratively(
+                gmcode.Statement(call), writing.IndentWriter(output))
+        self.assertEqual(output.getvalue(), 'f(a);\n')
+        self.assertEqual(gmcode.getCacheStatistics()['renderHits'], 1)
+
+    def testClearCache(self):
+        expression = gmcode.FunctionCall('f')
+        expression.renderedText()
+        gmcode.clearCache()
+        self.assertEqual(gmcode.getCacheStatistics()['nodes'], 0)
+        self.assertEqual(gmcode.getCacheStatistics()['renderMisses'], 0)
+        self.assertIsNot(gmcode.FunctionCall('f'), expression)
+        self.assertEqual(expression.renderedText(), 'f()')
+        self.assertEqual(gmcode.getCacheStatistics()['renderMisses'], 1)
+
+    def testCacheIsCappedByDefault(self):
+        gmcode.setCacheLimit(gmcode.kDefaultCacheLimit)
+        for i in range(gmcode.kDefaultCacheLimit + 1):
+            gmcode.Expression('e%d' % i)
+        self.assertLessEqual(
+                gmcode.getCacheStatistics()['nodes'],
+                gmcode.kDefaultCacheLimit)
+
+    def testCacheLimit(self):
+        gmcode.setCacheLimit(10)
+        for i in range(25):
+            gmcode.Expression('e%d' % i)
+            self.assertLessEqual(gmcode.getCacheStatistics()['nodes'], 10)
+        self.assertIs(gmcode.Expression('e24'), gmcode.Expression('e24'))
+
+
+class SlotsTest(unittest.TestCase):
+
+    def testNodesHaveNoInstanceDict(self):
+        nodes = [
+            gmcode.Expression('a'),
+            gmcode.Statement(gmcode.Expression('a')),
+            gmcode.Comment('a'),
+            gmcode.ScriptPrototype('a'),
+            gmcode.ScriptHeader('a'),
+            gmcode.FunctionCall('a'),
+            gmcode.BinaryOperation(
+                    gmcode.Expression('a'), '+', gmcode.Expression('b')),
+            gmcode.IfClause(
+                    gmcode.Expression('a'),
+                    gmcode.Statement(gmcode.Expression('b'))),
+            gmcode.ElseIfClause(
+                    gmcode.Expression('a'),
+                    gmcode.Statement(gmcode.Expression('b'))),
+            gmcode.IfStatement(gmcode.IfClause(
+                    gmcode.Expression('a'),
+                    gmcode.Statement(gmcode.Expression('b')))),
+            gmcode.ForLoop(
+                    gmcode.Expression('a'),
+                    gmcode.Expression('b'),
+                    gmcode.Expression('c'),
+                    gmcode.Statement(gmcode.Expression('d'))),
+            gmcode.VariableAssignment('a'),
+            gmcode.Statements([]),
+        ]
+        for node in nodes:
+            self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,94 @@
+#!/usr/local/bin/python
+
+"""Constant-time instanceof checks, numbered at generation time.
+
+The classes are numbered in the order of a depth-first walk over the class
+hierarchy, so the descendants of every class have consecutive numbers,
+starting right after the number of the class itself. A class then is a
+subclass of another class if its number is within the range of numbers of
+the other class and its descendants, which takes two comparisons however deep
+the hierarchy is.
+
+The number of every class and the last number of its descendants are stored
+in a table, which __gmidl_init_types fills in with the rest of the type
+metadata; see gmidl_types:
+
+    global.__gmidl_ancestry__[Bullet, 0] = 1;
+    global.__gmidl_ancestry__[Bullet, 1] = 2;
+
+Every class gets a script that checks that its argument is an instance of
+the class, __check_instanceof_<className>__, which is called instead of
+__check_instanceof__.
+"""
+
+
+kAncestryArrayName = 'global.__gmidl_ancestry__'
+
+
+def checkScriptName(className):
+    return '__check_instanceof_%s__' % className
+
+
+class ClassOrder(object):
+
+    def __init__(self, ranges=None):
+        # Maps the name of every class to the (first, last) numbers of the
+        # class and its descendants.
+        self.ranges = dict(ranges) if ranges else {}
+
+    def isSubclass(self, className, ancestorName):
+        first, last = self.ranges[ancestorName]
+        return first <= self.ranges[className][0] <= last
+
+    # Returns the names of the descendants of a class, in class order.
+    def descendants(self, className):
+        first, last = self.ranges[className]
+        return sorted(
+                (name for name in self.ranges
+                    if first < self.ranges[name][0] <= last),
+                key=lambda name: self.ranges[name][0])
+
+    # Returns the types that a class uses that have a generated check script.
+    def checkedTypes(self, classDefinition):
+        types = set([classDefinition.name])
+        types.update(classDefinition.propertyTypes)
+        for method in classDefinition.methods:
+            types.update(method.argTypes)
+        return set(
+                typeName for typeName in types if typeName in self.ranges)
+
+    def toJson(self):
+        return dict(
+                (className, list(self.ranges[className]))
+                for className in sorted(self.ranges))
+
+
+# The class hierarchy must be valid; see gmidl_vtables.buildVtableLayout().
+def numberClasses(classDefinitions):
+    children = {}
+    roots = []
+    for classDefinition in classDefinitions:
+        if classDefinition.parentName is None:
+            roots.append(classDefinition.name)
+        else:
+            children.setdefault(
+                    classDefinition.parentName, []).append(
+                            classDefinition.name)
+    order = ClassOrder()
+    numbers = {}
+    nextNumber = 0
+    # Walks the hierarchy without recursion, so that deep hierarchies do not
+    # hit the recursion limit. Every class is pushed twice: once to number
+    # it, and once more to record the last number of its descendants.
+    stack = [(root, False) for root in reversed(roots)]
+    while stack:
+        className, visited = stack.pop()
+        if visited:
+            order.ranges[className] = (numbers[className], nextNumber - 1)
+            continue
+        numbers[className] = nextNumber
+        nextNumber += 1
+        stack.append((className, True))
+        for child in reversed(children.get(className, [])):
+            stack.append((child, False))
+    return order
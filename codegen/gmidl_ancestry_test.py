@@ -0,0 +1,120 @@
+#!/usr/local/bin/python
+
+import random
+import unittest
+
+import gmidl_ancestry
+import gmidl_classes
+import gmidl_wrappers
+import test_util
+
+
+def makeRandomHierarchy(rng, numberOfClasses):
+    classes = []
+    for i in range(numberOfClasses):
+        parentName = None
+        if i and rng.random() < 0.9:
+            parentName = 'Class%d' % rng.randrange(i)
+        classes.append(
+                gmidl_classes.ClassDefinition('Class%d' % i, parentName))
+    rng.shuffle(classes)
+    return classes
+
+
+def isSubclassByWalking(classes, className, ancestorName):
+    parents = dict(
+            (classDefinition.name, classDefinition.parentName)
+            for classDefinition in classes)
+    while className is not None:
+        if className == ancestorName:
+            return True
+        className = parents[className]
+    return False
+
+
+class NumberClassesTest(test_util.BaseTest):
+
+    def testRanges(self):
+        order = gmidl_ancestry.numberClasses([
+            gmidl_classes.ClassDefinition('Entity'),
+            gmidl_classes.ClassDefinition('Bullet', 'Entity'),
+            gmidl_classes.ClassDefinition('Rocket', 'Bullet'),
+            gmidl_classes.ClassDefinition('Player', 'Entity'),
+            gmidl_classes.ClassDefinition('Level'),
+        ])
+        self.assertEqual(order.ranges, {
+            'Entity': (0, 3),
+            'Bullet': (1, 2),
+            'Rocket': (2, 2),
+            'Player': (3, 3),
+            'Level': (4, 4),
+        })
+        self.assertTrue(order.isSubclass('Rocket', 'Entity'))
+        self.assertFalse(order.isSubclass('Player', 'Bullet'))
+        self.assertEqual(
+                order.descendants('Entity'), ['Bullet', 'Rocket', 'Player'])
+        self.assertEqual(order.descendants('Level'), [])
+
+    def testMatchesWalkOverRandomHierarchies(self):
+        rng = random.Random(1234)
+        for trial in range(20):
+            classes = makeRandomHierarchy(rng, rng.randrange(1, 60))
+            order = gmidl_ancestry.numberClasses(classes)
+            for classDefinition in classes:
+                for ancestor in classes:
+                    self.assertEqual(
+                            order.isSubclass(
+                                    classDefinition.name, ancestor.name),
+                            isSubclassByWalking(
+                                    classes, classDefinition.name,
+                                    ancestor.name))
+
+    def testDeepHierarchy(self):
+        classes = [gmidl_classes.ClassDefinition('Class0')] + [
+            gmidl_classes.ClassDefinition('Class%d' % i, 'Class%d' % (i - 1))
+            for i in range(1, 5000)
+        ]
+        order = gmidl_ancestry.numberClasses(classes)
+        self.assertTrue(order.isSubclass('Class4999', 'Class0'))
+        self.assertFalse(order.isSubclass('Class0', 'Class4999'))
+
+    def testCheckedTypes(self):
+        order = gmidl_ancestry.numberClasses([
+            gmidl_classes.ClassDefinition('Entity'),
+            gmidl_classes.ClassDefinition('Player'),
+        ])
+        self.assertEqual(order.checkedTypes(gmidl_classes.ClassDefinition(
+                'Entity',
+                properties=[('owner', 'Player'), ('x', 'real')],
+                methods=[gmidl_classes.MethodDefinition(
+                        'follow', ['target'], ['Other'])])),
+                set(['Entity', 'Player']))
+
+    def testInstanceCheck(self):
+        (self.expectations.expect(gmidl_wrappers.writeInstanceCheck('Bullet'))
+            .shouldContain('///__check_instanceof_Bullet__(value Bullet)\n')
+            .shouldContain(
+                    'var number = '
+                    'global.__gmidl_ancestry__[__type__(argument0), 0];\n')
+            .shouldContain(
+                    'if (number < global.__gmidl_ancestry__[Bullet, 0]\n'
+                    '        || number > global.__gmidl_ancestry__[Bullet, 1]'
+                    ') {\n'))
+
+    def testAncestryEntries(self):
+        classOrder = gmidl_ancestry.numberClasses([
+            gmidl_classes.ClassDefinition('Entity'),
+            gmidl_classes.ClassDefinition('Bullet', 'Entity'),
+        ])
+        self.assertEqual(
+                gmidl_wrappers.writeAncestryEntries(classOrder, 'Bullet'),
+                ['global.__gmidl_ancestry__[Bullet, 1] = 1;',
+                    'global.__gmidl_ancestry__[Bullet, 0] = 1;'])
+        self.assertEqual(
+                gmidl_wrappers.writeAncestryEntries(classOrder, 'Entity'),
+                ['global.__gmidl_ancestry__[Entity, 1] = 1;',
+                    'global.__gmidl_ancestry__[Entity, 0] = 0;'])
+
+
+if __name__ == '__main__':
+    unittest.main()
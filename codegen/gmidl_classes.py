@@ -0,0 +1,145 @@
+#!/usr/local/bin/python
+
+"""Definitions of the classes that GMIDL generates scripts for.
+
+Class definitions can be loaded from a JSON file holding a list of classes:
+
+    [
+        {
+            "name": "Bullet",
+            "parent": "Entity",
+            "properties": [["speed", "real"], ["owner", "Player"]],
+            "methods": [
+                {
+                    "name": "update",
+                    "argNames": ["dt"],
+                    "argTypes": ["real"],
+                    "returnType": "bool"
+                }
+            ],
+            "attributes": {"pooled": true}
+        }
+    ]
+
+A class with the pooled attribute reuses destroyed instances: it gets a
+destructor that returns instances to a pool, and a script to fill the pool
+ahead of time. Instances in the pool hold no instances of class types: the
+destructor destroys the ones that properties default to, and the
+constructor creates new ones when it takes an instance out of the pool. The
+destructor hands an instance of a subclass to the destructor of its own
+class, so only instances of the class itself enter its pool.
+
+A class with the columns attribute stores its properties in one global array
+per property, and its instances are integer handles; see gmidl_columns. The
+struct class style ignores the attribute.
+
+A class with the lazy attribute does not create the data structures and
+instances that its properties default to when it is constructed. Those
+properties start out undefined, and their getters create the default value
+on the first read, so implementation scripts must read them through their
+getters. Destructors only free the data structures that were created. The
+attribute applies to the properties that the class itself declares,
+including in its subclasses, and the struct class style ignores it.
+
+A class with the dirty attribute records which of its properties were set
+since they were last synced or saved, in a bitmask in every instance; see
+gmidl_dirty. The struct class style ignores the attribute too.
+"""
+
+import json
+
+
+class MethodDefinition(object):
+
+    def __init__(self, name, argNames=None, argTypes=None, returnType=None,
+            description='', longDescription='', returnDescription=''):
+        self.name = name
+        self.argNames = list(argNames) if argNames else []
+        self.argTypes = (list(argTypes) if argTypes
+                else ['any'] * len(self.argNames))
+        assert len(self.argNames) == len(self.argTypes)
+        self.returnType = returnType
+        self.description = description
+        self.longDescription = longDescription
+        self.returnDescription = returnDescription
+
+    def toJson(self):
+        return {
+            'name': self.name,
+            'argNames': self.argNames,
+            'argTypes': self.argTypes,
+            'returnType': self.returnType,
+            'description': self.description,
+            'longDescription': self.longDescription,
+            'returnDescription': self.returnDescription,
+        }
+
+    @classmethod
+    def fromJson(cls, data):
+        return cls(
+                data['name'],
+                data.get('argNames'),
+                data.get('argTypes'),
+                data.get('returnType'),
+                data.get('description', ''),
+                data.get('longDescription', ''),
+                data.get('returnDescription', ''))
+
+
+class ClassDefinition(object):
+
+    def __init__(self, name, parentName=None, properties=None, methods=None,
+            attributes=None):
+        self.name = name
+        self.parentName = parentName
+        self.properties = [tuple(prop) for prop in properties or []]
+        self.methods = list(methods) if methods else []
+        self.attributes = dict(attributes) if attributes else {}
+
+    @property
+    def propertyNames(self):
+        return [name for name, propertyType in self.properties]
+
+    @property
+    def propertyTypes(self):
+        return [propertyType for name, propertyType in self.properties]
+
+    @property
+    def pooled(self):
+        return bool(self.attributes.get('pooled'))
+
+    @property
+    def columns(self):
+        return bool(self.attributes.get('columns'))
+
+    @property
+    def lazy(self):
+        return bool(self.attributes.get('lazy'))
+
+    @property
+    def dirty(self):
+        return bool(self.attributes.get('dirty'))
+
+    def toJson(self):
+        return {
+            'name': self.name,
+            'parent': self.parentName,
+            'properties': [list(prop) for prop in self.properties],
+            'methods': [method.toJson() for method in self.methods],
+            'attributes': self.attributes,
+        }
+
+    @classmethod
+    def fromJson(cls, data):
+        return cls(
+                data['name'],
+                data.get('parent'),
+                data.get('properties'),
+                [MethodDefinition.fromJson(method)
+                    for method in data.get('methods', [])],
+                data.get('attributes'))
+
+
+def loadClassDefinitions(path):
+    with open(path) as file:
+        return [ClassDefinition.fromJson(data) for data in json.load(file)]
@@ -0,0 +1,72 @@
+#!/usr/local/bin/python
+
+import json
+import os
+import tempfile
+import unittest
+
+import gmidl_classes
+
+
+class ClassDefinitionTest(unittest.TestCase):
+
+    def testPropertyNamesAndTypes(self):
+        classDefinition = gmidl_classes.ClassDefinition(
+                'Foo', properties=[('bar', 'real'), ('baz', 'string')])
+        self.assertEqual(classDefinition.propertyNames, ['bar', 'baz'])
+        self.assertEqual(classDefinition.propertyTypes, ['real', 'string'])
+
+    def testMethodArgTypesDefaultToAny(self):
+        method = gmidl_classes.MethodDefinition('run', ['a', 'b'])
+        self.assertEqual(method.argTypes, ['any', 'any'])
+
+    def testPooled(self):
+        self.assertFalse(gmidl_classes.ClassDefinition('Foo').pooled)
+        self.assertTrue(gmidl_classes.ClassDefinition(
+                'Foo', attributes={'pooled': True}).pooled)
+
+    def testColumns(self):
+        self.assertFalse(gmidl_classes.ClassDefinition('Foo').columns)
+        self.assertTrue(gmidl_classes.ClassDefinition(
+                'Foo', attributes={'columns': True}).columns)
+
+    def testLazy(self):
+        self.assertFalse(gmidl_classes.ClassDefinition('Foo').lazy)
+        self.assertTrue(gmidl_classes.ClassDefinition(
+                'Foo', attributes={'lazy': True}).lazy)
+
+    def testDirty(self):
+        self.assertFalse(gmidl_classes.ClassDefinition('Foo').dirty)
+        self.assertTrue(gmidl_classes.ClassDefinition(
+                'Foo', attributes={'dirty': True}).dirty)
+
+    def testJsonRoundTrip(self):
+        classDefinition = gmidl_classes.ClassDefinition(
+                'Bullet',
+                'Entity',
+                [('speed', 'real')],
+                [gmidl_classes.MethodDefinition(
+                        'update', ['dt'], ['real'], 'bool', 'Moves it.')],
+                {'pooled': True})
+        data = classDefinition.toJson()
+        self.assertEqual(
+                gmidl_classes.ClassDefinition.fromJson(data).toJson(), data)
+
+    def testLoadClassDefinitions(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as file:
+            json.dump([
+                {'name': 'Entity', 'properties': [['x', 'real']]},
+                {'name': 'Bullet', 'parent': 'Entity'},
+            ], file)
+        try:
+            classes = gmidl_classes.loadClassDefinitions(path)
+        finally:
+            os.remove(path)
+        self.assertEqual([c.name for c in classes], ['Entity', 'Bullet'])
+        self.assertEqual(classes[0].properties, [('x', 'real')])
+        self.assertEqual(classes[1].parentName, 'Entity')
+
+
+if __name__ == '__main__':
+    unittest.main()
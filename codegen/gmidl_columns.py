@@ -0,0 +1,66 @@
+#!/usr/local/bin/python
+
+"""Structure-of-arrays storage for classes with the columns attribute.
+
+Instances of most classes are arrays or ds_maps of their own. A class with
+the columns attribute instead stores every property in a global array of its
+own, a column, and its instances are integer handles into the columns:
+
+    global.__gmidl_column_Particle_x__[particle] = 0;
+
+Handles of destroyed instances are reused, and a column of booleans records
+which handles are live, so that the batch scripts can loop over whole
+columns:
+
+    Particle_fillx(0);
+    Particle_forEachupdate(dt);
+
+The columns, the live column, the number of handles handed out and the list
+of free handles are created by one generated script, __gmidl_init_columns.
+
+A handle carries no type, so a class with the columns attribute can have no
+parent and no subclasses, and its methods are always called directly.
+"""
+
+
+kInitScriptName = '__gmidl_init_columns'
+
+
+class ColumnLayoutError(ValueError):
+    pass
+
+
+def columnName(className, propertyName):
+    return 'global.__gmidl_column_%s_%s__' % (className, propertyName)
+
+
+def liveColumnName(className):
+    return 'global.__gmidl_live_%s__' % className
+
+
+def countName(className):
+    return 'global.__gmidl_count_%s__' % className
+
+
+def freeListName(className):
+    return 'global.__gmidl_free_%s__' % className
+
+
+# Raises a ColumnLayoutError if a class with the columns attribute is in a
+# class hierarchy.
+def checkColumnClasses(classDefinitions):
+    columnClasses = set(
+            classDefinition.name for classDefinition in classDefinitions
+            if classDefinition.columns)
+    for classDefinition in classDefinitions:
+        if classDefinition.name in columnClasses and (
+                classDefinition.parentName is not None):
+            raise ColumnLayoutError(
+                    '%s has the columns attribute, so it cannot inherit '
+                    'from %s' % (
+                            classDefinition.name, classDefinition.parentName))
+        if classDefinition.parentName in columnClasses:
+            raise ColumnLayoutError(
+                    '%s has the columns attribute, so %s cannot inherit '
+                    'from it' % (
+                            classDefinition.parentName, classDefinition.name))
@@ -0,0 +1,112 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_classes
+import gmidl_columns
+import gmidl_flags
+import gmidl_wrappers
+import test_util
+
+
+def makeParticle(parentName=None):
+    return gmidl_classes.ClassDefinition(
+            'Particle', parentName, [('x', 'real'), ('trail', 'ds_list')],
+            [gmidl_classes.MethodDefinition('update', ['dt'], ['real'])],
+            {'columns': True})
+
+
+class CheckColumnClassesTest(test_util.BaseTest):
+
+    def testColumnClassWithoutHierarchy(self):
+        gmidl_columns.checkColumnClasses([
+            makeParticle(),
+            gmidl_classes.ClassDefinition('Entity'),
+        ])
+
+    def testColumnClassCannotInherit(self):
+        with self.assertRaises(gmidl_columns.ColumnLayoutError):
+            gmidl_columns.checkColumnClasses([
+                gmidl_classes.ClassDefinition('Entity'),
+                makeParticle('Entity'),
+            ])
+
+    def testColumnClassCannotBeInherited(self):
+        with self.assertRaises(gmidl_columns.ColumnLayoutError):
+            gmidl_columns.checkColumnClasses([
+                makeParticle(),
+                gmidl_classes.ClassDefinition('Spark', 'Particle'),
+            ])
+
+
+class ColumnScriptsTest(test_util.BaseTest):
+
+    def testConstructorAllocatesHandle(self):
+        (self.expectations.expect(gmidl_wrappers.writeConstructor(
+                'Particle', ['x', 'trail'], ['real', 'ds_list'],
+                columns=True))
+            .shouldContain(
+                    'if (ds_stack_empty(global.__gmidl_free_Particle__)) {\n'
+                    '    newInstance = global.__gmidl_count_Particle__;\n'
+                    '    global.__gmidl_count_Particle__ += 1;\n')
+            .shouldContain('global.__gmidl_live_Particle__[newInstance] = '
+                    'true;\n')
+            .shouldContain('global.__gmidl_column_Particle_trail__'
+                    '[newInstance] = ds_list_create();\n')
+            .shouldNotContain('GMIDL_CLASS_STYLE'))
+
+    def testGetterIndexesColumn(self):
+        (self.expectations.expect(gmidl_wrappers.writeGetter(
+                'Particle', 'x', 'real', columns=True))
+            .shouldContain(
+                    'return global.__gmidl_column_Particle_x__[argument0];\n')
+            .shouldNotContain('GMIDL_CLASS_STYLE'))
+
+    def testSetterIndexesColumn(self):
+        (self.expectations.expect(gmidl_wrappers.writeSetter(
+                'Particle', 'x', 'real', flags=gmidl_flags.kReleaseProfile,
+                columns=True))
+            .shouldContain(
+                    'global.__gmidl_column_Particle_x__[argument0] = '
+                    'argument1;\n'))
+
+    def testDestructorFreesHandle(self):
+        (self.expectations.expect(gmidl_wrappers.writeColumnDestructor(
+                'Particle', ['x', 'trail'], ['real', 'ds_list']))
+            .shouldContain(
+                    'ds_list_destroy('
+                    'global.__gmidl_column_Particle_trail__[self]);\n'
+                    'global.__gmidl_live_Particle__[self] = false;\n'
+                    'ds_stack_push(global.__gmidl_free_Particle__, self);\n'))
+
+    def testFillLoopsOverColumn(self):
+        (self.expectations.expect(gmidl_wrappers.writeColumnFill(
+                'Particle', 'x', 'real'))
+            .shouldContain('for (i = global.__gmidl_count_Particle__ - 1; '
+                    'i >= 0; i -= 1) {\n'
+                    '    global.__gmidl_column_Particle_x__[i] = value;\n'))
+
+    def testForEachCallsLiveInstances(self):
+        (self.expectations.expect(gmidl_wrappers.writeColumnForEach(
+                'Particle', 'update', ['dt'], ['real']))
+            .shouldContain('///Particle_forEachupdate(dt real)\n')
+            .shouldContain('    if (global.__gmidl_live_Particle__[i]) {\n'
+                    '        _IMPL_Particle_update(i, argument0);\n'))
+
+    def testInstanceCheckChecksHandle(self):
+        (self.expectations.expect(gmidl_wrappers.writeInstanceCheck(
+                'Particle', columns=True))
+            .shouldContain('handle >= global.__gmidl_count_Particle__')
+            .shouldNotContain('__type__'))
+
+    def testColumnInitializer(self):
+        (self.expectations.expect(gmidl_wrappers.writeColumnInitializer(
+                [('Particle', ['x'])]))
+            .shouldContain('global.__gmidl_count_Particle__ = 0;\n'
+                    'global.__gmidl_free_Particle__ = ds_stack_create();\n'
+                    'global.__gmidl_live_Particle__[0] = false;\n'
+                    'global.__gmidl_column_Particle_x__[0] = 0;\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
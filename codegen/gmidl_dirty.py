@@ -0,0 +1,48 @@
+#!/usr/local/bin/python
+
+"""Dirty bits, so that syncing and saving scale with the number of changes.
+
+An instance of a class with the dirty attribute has one more slot, __dirty,
+that the class lays out before its own properties; see gmidl_properties. It
+holds a bitmask with a bit for every property that was set since the mask
+was last cleared. The bit of the property in slot i is 1 << (i - 1), a
+constant, so the setter of a property marks it with one more array write:
+
+    self[@__Bullet_properties.speed] = value;
+    self[@__Bullet_properties.__dirty] = self[__Bullet_properties.__dirty] | 8;
+
+The in-place mutators of array and ds_* properties mark them too.
+
+Every class with the attribute gets three scripts:
+
+    Bullet_getDirty(bullet) returns the mask.
+    Bullet_clearDirty(bullet) clears it.
+    Bullet_forEachDirty(bullet, script) calls script(bullet, slot) for the
+        slot of every marked property, in slot order.
+
+The name of the property in a slot is in the type tables of gmidl_types.
+
+Subclasses inherit the slot, and the properties that they declare are
+tracked too. A class with the attribute does not track the properties that
+it inherits from a class without it, since their setters belong to the
+parent. Reals only hold integers exactly up to 2 ** 53, so the properties of
+a class with the slot must fit in kMaxBits slots.
+"""
+
+import gmidl_columns
+import gmidl_properties
+
+
+kSlotName = gmidl_properties.kDirtySlotName
+kMaxBits = gmidl_properties.kMaxDirtyBits
+
+# The scripts that every class with the attribute gets, after its name.
+kHelperNames = ['getDirty', 'clearDirty', 'forEachDirty']
+
+
+def slotIndex(className):
+    return gmidl_properties.propertyIndex(className, kSlotName)
+
+
+def columnName(className):
+    return gmidl_columns.columnName(className, kSlotName)
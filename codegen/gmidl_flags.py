@@ -0,0 +1,116 @@
+#!/usr/local/bin/python
+
+"""Flag profiles for specializing the GMIDL_* feature flags at build time.
+
+The generated scripts check the GMIDL_PROFILE_TIME, GMIDL_TRACK_SCOPE,
+GMIDL_ENFORCE_TYPES and GMIDL_CLASS_STYLE constants. A FlagProfile fixes
+some or all of them when the scripts are generated, so the branches that can
+never be taken are left out of the output. A flag that is None is still
+checked at runtime.
+
+The runtime profile leaves every flag to be checked at runtime, and is the
+default. The debug, profile and release profiles fix every flag.
+
+Type checks can also be sampled, so that they stay on without checking every
+call: with typeCheckFirstCalls, a script checks the types of its arguments
+for its first that many calls, and with typeCheckRate, for 1 in that many
+calls, chosen at random. The qa profile does both. The first calls are
+counted in an array indexed by script id, which __gmidl_init_call_counts
+creates, and the count stops once it reaches typeCheckFirstCalls.
+
+The struct class style can only be fixed at build time, since its scripts
+need GameMaker 2.3 or later, and it is only used by the struct profile. A
+class style that is checked at runtime is either the array or the ds_map
+style.
+"""
+
+
+kClassStyleArray = 'GMIDL_CLASS_STYLE_ARRAY'
+kClassStyleDsMap = 'GMIDL_CLASS_STYLE_DSMAP'
+kClassStyleStruct = 'GMIDL_CLASS_STYLE_STRUCT'
+kClassStyles = [kClassStyleArray, kClassStyleDsMap, kClassStyleStruct]
+
+
+class FlagProfile(object):
+
+    def __init__(self, name, profileTime=None, trackScope=None,
+            enforceTypes=None, classStyle=None, typeCheckFirstCalls=None,
+            typeCheckRate=None):
+        assert classStyle is None or classStyle in kClassStyles
+        assert typeCheckRate is None or typeCheckRate >= 1
+        # Structs are generated by gmidl_structs, whose scripts check no
+        # flags.
+        assert classStyle != kClassStyleStruct or (
+                profileTime is trackScope is enforceTypes is False)
+        self.name = name
+        self.profileTime = profileTime
+        self.trackScope = trackScope
+        self.enforceTypes = enforceTypes
+        self.classStyle = classStyle
+        self.typeCheckFirstCalls = typeCheckFirstCalls
+        self.typeCheckRate = typeCheckRate
+
+    def toJson(self):
+        return {
+            'name': self.name,
+            'profileTime': self.profileTime,
+            'trackScope': self.trackScope,
+            'enforceTypes': self.enforceTypes,
+            'classStyle': self.classStyle,
+            'typeCheckFirstCalls': self.typeCheckFirstCalls,
+            'typeCheckRate': self.typeCheckRate,
+        }
+
+    def __repr__(self):
+        return 'FlagProfile(%r)' % self.name
+
+
+kRuntimeProfile = FlagProfile('runtime')
+kDebugProfile = FlagProfile(
+        'debug',
+        profileTime=False,
+        trackScope=True,
+        enforceTypes=True,
+        classStyle=kClassStyleArray)
+kProfileProfile = FlagProfile(
+        'profile',
+        profileTime=True,
+        trackScope=False,
+        enforceTypes=False,
+        classStyle=kClassStyleArray)
+kQaProfile = FlagProfile(
+        'qa',
+        profileTime=False,
+        trackScope=False,
+        enforceTypes=True,
+        classStyle=kClassStyleArray,
+        typeCheckFirstCalls=100,
+        typeCheckRate=16)
+kReleaseProfile = FlagProfile(
+        'release',
+        profileTime=False,
+        trackScope=False,
+        enforceTypes=False,
+        classStyle=kClassStyleArray)
+kStructProfile = FlagProfile(
+        'struct',
+        profileTime=False,
+        trackScope=False,
+        enforceTypes=False,
+        classStyle=kClassStyleStruct)
+
+kProfiles = dict((profile.name, profile) for profile in [
+    kRuntimeProfile,
+    kDebugProfile,
+    kProfileProfile,
+    kQaProfile,
+    kReleaseProfile,
+    kStructProfile,
+])
+
+
+def getProfile(name):
+    if name not in kProfiles:
+        raise ValueError('Unknown flag profile %r; expected one of %s' % (
+                name, ', '.join(sorted(kProfiles))))
+    return kProfiles[name]
@@ -0,0 +1,50 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_flags
+
+
+class FlagProfileTest(unittest.TestCase):
+
+    def testGetProfile(self):
+        self.assertIs(
+                gmidl_flags.getProfile('release'),
+                gmidl_flags.kReleaseProfile)
+        self.assertIs(
+                gmidl_flags.getProfile('runtime'),
+                gmidl_flags.kRuntimeProfile)
+
+    def testUnknownProfile(self):
+        with self.assertRaises(ValueError):
+            gmidl_flags.getProfile('fast')
+
+    def testRuntimeProfileFixesNoFlags(self):
+        profile = gmidl_flags.kRuntimeProfile
+        self.assertEqual(
+                [profile.profileTime, profile.trackScope,
+                    profile.enforceTypes, profile.classStyle],
+                [None, None, None, None])
+
+    def testBuildProfilesFixEveryFlag(self):
+        for profile in [
+                gmidl_flags.kDebugProfile,
+                gmidl_flags.kProfileProfile,
+                gmidl_flags.kQaProfile,
+                gmidl_flags.kReleaseProfile,
+                gmidl_flags.kStructProfile]:
+            self.assertNotIn(None, [
+                profile.profileTime,
+                profile.trackScope,
+                profile.enforceTypes,
+                profile.classStyle,
+            ])
+
+    def testStructStyleChecksNoFlags(self):
+        with self.assertRaises(AssertionError):
+            gmidl_flags.FlagProfile(
+                    'structs', classStyle=gmidl_flags.kClassStyleStruct)
+
+
+if __name__ == '__main__':
+    unittest.main()
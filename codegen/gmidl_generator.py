@@ -0,0 +1,569 @@
+#!/usr/local/bin/python
+
+"""Generates the wrapper scripts for a whole project.
+
+Each class gets a constructor, a destructor, a getter and a setter for every
+property, in-place mutators for every array and ds_* property, and a wrapper
+for every method. Classes with the dirty attribute also get scripts to read,
+clear and walk the dirty bits that their setters mark; see gmidl_dirty.
+Methods are dispatched through vtables that are laid out for the whole class
+hierarchy. Methods that are never overridden are called directly. Instances
+of classes are type-checked in constant time by a check script for every
+class, using an ancestry table. The vtables, the ancestry table and the rest
+of the type metadata are baked into one more script, __gmidl_init_types; see
+gmidl_types. Properties are stored in slots that subclasses inherit,
+declared as enums in __gmidl_property_slots. Pooled classes also get a
+preallocator. The pools of pooled classes, and the pool of maps that the
+ds_map class style reuses, are created by __gmidl_init_pools. Classes with
+the columns attribute store their properties in columns instead, which are
+created by __gmidl_init_columns, and get scripts that loop over whole
+columns; see gmidl_columns. Unless time profiling is off, the scripts of the
+sampling profiler are generated too; see gmidl_profiler. Unless scope
+tracking is off, so are the scripts of its ring buffer; see gmidl_scopes.
+Both identify the wrappers by the ids in __gmidl_declare_script_ids. When
+type checks are sampled by call count, every script that checks types gets
+an id too, and __gmidl_init_call_counts creates the counts.
+
+With --flags struct, classes are native GameMaker structs instead, and none
+of the scripts shared by all classes are needed; see gmidl_structs.
+
+Every script is written to <outputDirectory>/<scriptName>.gml.
+
+Generation is incremental: a manifest in the output directory records a
+content hash for every class, and only the classes whose hash changed are
+re-rendered. Of their scripts, only the ones whose text changed are written,
+so unchanged files keep their modification times. Scripts that are no longer
+generated by any class are deleted.
+
+Classes are rendered lazily, and their scripts stream through a
+gmidl_pipeline pipeline to the output files one at a time, so memory use does
+not grow with the size of the project.
+
+With --jobs N, the classes are rendered by N worker processes. The output is
+the same as when rendering serially.
+
+To run:
+
+  python gmidl_generator.py classes.json outputDirectory \
+      [--flags release] [--jobs 4]
+"""
+
+import argparse
+import collections
+import logging
+import multiprocessing
+import os
+import sys
+
+import gmidl_ancestry
+import gmidl_classes
+import gmidl_columns
+import gmidl_dirty
+import gmidl_flags
+import gmidl_manifest
+import gmidl_pipeline
+import gmidl_profiler
+import gmidl_properties
+import gmidl_scopes
+import gmidl_script_components
+import gmidl_script_ids
+import gmidl_types
+import gmidl_structs
+import gmidl_vtables
+import gmidl_wrappers
+
+
+# Bump this whenever a change to the generator changes its output, so that
+# every class is regenerated.
+kGeneratorVersion = 21
+kManifestName = '.gmidl_manifest.json'
+kScriptExtension = gmidl_pipeline.kScriptExtension
+
+
+# vtableSlots maps the name of every method of the class to its slot in the
+# vtable of the class, or to None if the method is never overridden and its
+# implementation is called directly. Without it, methods look up their
+# implementation at runtime.
+#
+# checkedTypes are the types that have a generated instanceof check. If it is
+# given, the class gets a check script of its own.
+#
+# properties are all the properties of the class, including inherited ones,
+# for the constructor to initialize. They default to the properties of the
+# class itself. lazyNames are the names of the ones that are created lazily,
+# which default to the properties of the class itself if it has the lazy
+# attribute. dirtyBits maps the names of the properties whose changes are
+# tracked to their dirty bits. Without properties, a class with the dirty
+# attribute lays out its dirty slot before its own properties, and tracks
+# all of them.
+#
+# subclassNames are the names of all the descendants of the class, which the
+# destructor of a pooled class hands their instances to.
+def generateClassScripts(classDefinition, flags=gmidl_flags.kRuntimeProfile,
+        vtableSlots=None, checkedTypes=None, properties=None,
+        lazyNames=None, dirtyBits=None, subclassNames=None):
+    if flags.classStyle == gmidl_flags.kClassStyleStruct:
+        return gmidl_structs.generateClassScripts(
+                classDefinition, vtableSlots, properties)
+    className = classDefinition.name
+    if properties is None:
+        properties = classDefinition.properties
+        if classDefinition.dirty:
+            properties = [(gmidl_dirty.kSlotName, 'real')] + properties
+    if dirtyBits is None:
+        dirtyBits = gmidl_properties.dirtyBits(
+                properties,
+                classDefinition.propertyNames if classDefinition.dirty
+                    else [])
+    propertyNames = [name for name, propertyType in properties]
+    propertyTypes = [propertyType for name, propertyType in properties]
+    if lazyNames is None:
+        lazyNames = (
+                classDefinition.propertyNames if classDefinition.lazy else [])
+    # The handles of a class with the columns attribute are always reused, so
+    # the class is not pooled too.
+    columns = classDefinition.columns
+    scripts = [(
+        '%s_create' % className,
+        gmidl_wrappers.writeConstructor(
+                className, propertyNames, propertyTypes, flags=flags,
+                pooled=classDefinition.pooled, columns=columns,
+                lazyNames=lazyNames),
+    )]
+    if columns:
+        scripts.append((
+            '%s_destroy' % className,
+            gmidl_wrappers.writeColumnDestructor(
+                    className, propertyNames, propertyTypes, lazyNames),
+        ))
+    elif classDefinition.pooled:
+        scripts.append((
+            '%s_destroy' % className,
+            gmidl_wrappers.writePooledDestructor(
+                    className, propertyNames, propertyTypes, flags=flags,
+                    lazyNames=lazyNames, subclassNames=subclassNames or ()),
+        ))
+        scripts.append((
+            '%s_preallocate' % className,
+            gmidl_wrappers.writePreallocator(
+                    className, propertyNames, propertyTypes, flags=flags,
+                    lazyNames=lazyNames),
+        ))
+    else:
+        scripts.append((
+            '%s_destroy' % className,
+            gmidl_wrappers.writeDestructor(
+                    className, propertyNames, propertyTypes, flags=flags,
+                    lazyNames=lazyNames),
+        ))
+    for propertyName, propertyType in classDefinition.properties:
+        scripts.append((
+            '%s_get%s' % (className, propertyName),
+            gmidl_wrappers.writeGetter(
+                    className, propertyName, propertyType, flags=flags,
+                    columns=columns, lazy=classDefinition.lazy),
+        ))
+        scripts.append((
+            '%s_set%s' % (className, propertyName),
+            gmidl_wrappers.writeSetter(
+                    className, propertyName, propertyType, flags=flags,
+                    checkedTypes=checkedTypes, columns=columns,
+                    dirtyBit=dirtyBits.get(propertyName)),
+        ))
+        for mutatorName in gmidl_script_components.mutatorNames(
+                propertyType):
+            scripts.append((
+                '%s_%s%s' % (className, mutatorName, propertyName),
+                gmidl_wrappers.writeMutator(
+                        className, propertyName, propertyType, mutatorName,
+                        flags=flags, checkedTypes=checkedTypes,
+                        columns=columns, lazy=classDefinition.lazy,
+                        dirtyBit=dirtyBits.get(propertyName)),
+            ))
+        if columns and not gmidl_script_components.isDataStructureType(
+                propertyType):
+            scripts.append((
+                '%s_fill%s' % (className, propertyName),
+                gmidl_wrappers.writeColumnFill(
+                        className, propertyName, propertyType),
+            ))
+    if classDefinition.dirty:
+        for helperName in gmidl_dirty.kHelperNames:
+            scripts.append((
+                '%s_%s' % (className, helperName),
+                gmidl_wrappers.writeDirtyHelper(
+                        className, helperName, flags=flags,
+                        checkedTypes=checkedTypes, columns=columns),
+            ))
+    for method in classDefinition.methods:
+        scriptName = '%s_%s' % (className, method.name)
+        # Handles carry no type to dispatch on.
+        if columns:
+            virtual, vtableSlot = False, None
+        elif vtableSlots is None:
+            virtual, vtableSlot = True, None
+        else:
+            vtableSlot = vtableSlots[method.name]
+            virtual = vtableSlot is not None
+        scripts.append((
+            scriptName,
+            gmidl_wrappers.writeScriptWrapper(
+                    scriptName,
+                    ['self'] + method.argNames,
+                    [className] + method.argTypes,
+                    method.returnType,
+                    method.description,
+                    method.longDescription,
+                    method.returnDescription,
+                    virtual=virtual,
+                    flags=flags,
+                    vtableSlot=vtableSlot,
+                    checkedTypes=checkedTypes),
+        ))
+        if columns and gmidl_script_components.usesDirectArguments(
+                len(method.argNames) + 1):
+            scripts.append((
+                '%s_forEach%s' % (className, method.name),
+                gmidl_wrappers.writeColumnForEach(
+                        className, method.name, method.argNames,
+                        method.argTypes),
+            ))
+    if checkedTypes is not None:
+        scripts.append((
+            gmidl_ancestry.checkScriptName(className),
+            gmidl_wrappers.writeInstanceCheck(className, columns=columns),
+        ))
+    return scripts
+
+
+def hashClass(classDefinition, flags, layout=None, classOrder=None,
+        propertyLayout=None):
+    return gmidl_manifest.hashInputs(
+            kGeneratorVersion, flags.toJson(), classDefinition.toJson(),
+            layout.classJson(classDefinition.name) if layout else None,
+            sorted(classOrder.checkedTypes(classDefinition))
+                if classOrder else None,
+            propertyLayout.classJson(classDefinition.name)
+                if propertyLayout else None,
+            propertyLayout.lazyNames(classDefinition.name)
+                if propertyLayout else None,
+            propertyLayout.dirtyBits(classDefinition.name)
+                if propertyLayout else None,
+            # Only the destructor of a pooled class depends on its
+            # subclasses.
+            classOrder.descendants(classDefinition.name)
+                if classOrder and classDefinition.pooled else None)
+
+
+def scriptPath(outputDirectory, scriptName):
+    return gmidl_pipeline.scriptPath(outputDirectory, scriptName)
+
+
+class GenerationResult(object):
+
+    def __init__(self):
+        self.renderedClasses = 0
+        self.skippedClasses = 0
+        self.writtenScripts = 0
+        self.unchangedScripts = 0
+        self.removedScripts = 0
+        # The number of entries that __gmidl_init_types stores at startup.
+        self.initStatements = 0
+
+    def __repr__(self):
+        return ('GenerationResult(renderedClasses=%d, skippedClasses=%d, '
+                'writtenScripts=%d, unchangedScripts=%d, '
+                'removedScripts=%d, initStatements=%d)') % (
+                        self.renderedClasses,
+                        self.skippedClasses,
+                        self.writtenScripts,
+                        self.unchangedScripts,
+                        self.removedScripts,
+                        self.initStatements)
+
+
+def _generateClassScriptsTask(task):
+    return generateClassScripts(*task)
+
+
+def _makeTask(classDefinition, flags, layout, classOrder, propertyLayout):
+    return (
+        classDefinition,
+        flags,
+        layout.dispatchSlots(classDefinition.name) if layout else None,
+        classOrder.checkedTypes(classDefinition) if classOrder else None,
+        propertyLayout.properties[classDefinition.name]
+            if propertyLayout else None,
+        propertyLayout.lazyNames(classDefinition.name)
+            if propertyLayout else None,
+        propertyLayout.dirtyBits(classDefinition.name)
+            if propertyLayout else None,
+        classOrder.descendants(classDefinition.name) if classOrder else None,
+    )
+
+
+# Renders the classes lazily and in order, yielding the scripts of one class
+# at a time. With more than one job, the classes are rendered by a pool of
+# worker processes, and the results still come back in the order of the
+# classes, so the output does not depend on the number of jobs. With a
+# VtableLayout, methods are dispatched through the vtables, with a
+# ClassOrder, types are checked by the generated instanceof checks, and with
+# a PropertyLayout, constructors initialize inherited properties too.
+def renderClasses(classDefinitions, flags=gmidl_flags.kRuntimeProfile,
+        jobs=1, chunkSize=16, layout=None, classOrder=None,
+        propertyLayout=None):
+    if jobs <= 1:
+        for classDefinition in classDefinitions:
+            yield generateClassScripts(*_makeTask(
+                    classDefinition, flags, layout, classOrder,
+                    propertyLayout))
+        return
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for scripts in pool.imap(
+                _generateClassScriptsTask,
+                (_makeTask(classDefinition, flags, layout, classOrder,
+                        propertyLayout)
+                    for classDefinition in classDefinitions),
+                chunkSize):
+            yield scripts
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# Yields a (scriptName, text) pair for every script of every class, to be fed
+# into gmidl_pipeline.runPipeline().
+def generateScripts(classDefinitions, flags=gmidl_flags.kRuntimeProfile,
+        jobs=1, layout=None, classOrder=None, propertyLayout=None):
+    for scripts in renderClasses(
+            classDefinitions, flags, jobs, layout=layout,
+            classOrder=classOrder, propertyLayout=propertyLayout):
+        for script in scripts:
+            yield script
+
+
+# Returns whether type checks are sampled by call count, which needs the
+# call counts and the script ids.
+def _countsCalls(flags):
+    return (flags.typeCheckFirstCalls is not None
+            and flags.enforceTypes is not False)
+
+
+# Returns the names of the scripts of the classes, other than the method
+# wrappers, that check types: the setters, the mutators and the dirty
+# helpers. With sampled type checks, they need script ids too.
+def _checkedAccessors(classDefinitions):
+    scriptNames = []
+    for classDefinition in classDefinitions:
+        className = classDefinition.name
+        for propertyName, propertyType in classDefinition.properties:
+            scriptNames.append('%s_set%s' % (className, propertyName))
+            scriptNames.extend(
+                    '%s_%s%s' % (className, mutatorName, propertyName)
+                    for mutatorName in gmidl_script_components.mutatorNames(
+                            propertyType))
+        if classDefinition.dirty:
+            scriptNames.extend(
+                    '%s_%s' % (className, helperName)
+                    for helperName in gmidl_dirty.kHelperNames)
+    return scriptNames
+
+
+# Returns the name of every script that is shared by all classes, with
+# everything that goes into it, and a function that writes it. scriptIds are
+# the names of the scripts that get ids, in the order of their ids.
+def _projectScripts(flags, metadata, pooledClasses, columnClasses,
+        scriptIds):
+    # Structs need none of the tables of the other class styles.
+    if flags.classStyle == gmidl_flags.kClassStyleStruct:
+        return []
+    scripts = [
+        (gmidl_properties.kSlotsScriptName, metadata.propertyLayout.toJson(),
+            lambda: gmidl_wrappers.writePropertySlots(
+                    metadata.propertyLayout)),
+        (gmidl_types.kInitScriptName, metadata.toJson(),
+            lambda: gmidl_wrappers.writeTypeInitializer(metadata)),
+    ]
+    # Instances of the ds_map class style reuse maps from a pool of their own.
+    mapPool = flags.classStyle in [None, gmidl_flags.kClassStyleDsMap]
+    if pooledClasses or mapPool:
+        scripts.append((
+            gmidl_wrappers.kPoolInitializerScriptName,
+            {'classes': pooledClasses, 'mapPool': mapPool},
+            lambda: gmidl_wrappers.writePoolInitializer(
+                    pooledClasses, mapPool=mapPool)))
+    if columnClasses:
+        scripts.append((
+            gmidl_columns.kInitScriptName, columnClasses,
+            lambda: gmidl_wrappers.writeColumnInitializer(columnClasses)))
+    if (flags.profileTime is not False or flags.trackScope is not False
+            or _countsCalls(flags)):
+        scripts.append((
+            gmidl_script_ids.kScriptName, scriptIds,
+            lambda: gmidl_wrappers.writeScriptIds(scriptIds)))
+    if flags.profileTime is not False:
+        scripts.extend([
+            (gmidl_profiler.kInitScriptName, scriptIds,
+                lambda: gmidl_wrappers.writeProfilerInitializer(scriptIds)),
+            (gmidl_profiler.kSampleScriptName, None,
+                gmidl_wrappers.writeProfileSampler),
+            (gmidl_profiler.kDumpScriptName, None,
+                gmidl_wrappers.writeProfileDump),
+        ])
+    if flags.trackScope is not False:
+        scripts.extend([
+            (gmidl_scopes.kInitScriptName, None,
+                gmidl_wrappers.writeScopeInitializer),
+            (gmidl_scopes.kDumpScriptName, None,
+                gmidl_wrappers.writeScopeDump),
+        ])
+    if _countsCalls(flags):
+        scripts.append((
+            gmidl_script_components.kCallCountsInitScriptName, None,
+            gmidl_wrappers.writeCallCountsInitializer))
+    return scripts
+
+
+# The scripts go through the stages and into the sink, which defaults to a
+# ScriptFileSink for the output directory. Another sink must also provide
+# remove() and the counters of ScriptFileSink.
+#
+# The vtables and property slots are laid out for the whole class hierarchy
+# first, so a VtableLayoutError, a PropertyLayoutError or a ColumnLayoutError
+# is raised before anything is written if they conflict.
+def generateProject(classDefinitions, outputDirectory,
+        flags=gmidl_flags.kRuntimeProfile, manifestPath=None, jobs=1,
+        stages=(), sink=None):
+    classDefinitions = list(classDefinitions)
+    layout = gmidl_vtables.buildVtableLayout(classDefinitions)
+    classOrder = gmidl_ancestry.numberClasses(classDefinitions)
+    propertyLayout = gmidl_properties.buildPropertyLayout(classDefinitions)
+    gmidl_columns.checkColumnClasses(classDefinitions)
+    pooledClasses = sorted(
+            classDefinition.name for classDefinition in classDefinitions
+            if classDefinition.pooled and not classDefinition.columns)
+    # The columns include the dirty slot.
+    columnClasses = sorted(
+            (classDefinition.name, [
+                name for name, propertyType
+                in propertyLayout.properties[classDefinition.name]])
+            for classDefinition in classDefinitions
+            if classDefinition.columns)
+    scriptIds = gmidl_script_ids.wrappedScripts(classDefinitions)
+    if _countsCalls(flags):
+        scriptIds += _checkedAccessors(classDefinitions)
+    metadata = gmidl_types.buildTypeMetadata(
+            classDefinitions, layout, classOrder, propertyLayout)
+    if manifestPath is None:
+        manifestPath = os.path.join(outputDirectory, kManifestName)
+    if not os.path.isdir(outputDirectory):
+        os.makedirs(outputDirectory)
+    if sink is None:
+        sink = gmidl_pipeline.ScriptFileSink(outputDirectory)
+    previousManifest = gmidl_manifest.loadManifest(manifestPath)
+    manifest = gmidl_manifest.Manifest(kGeneratorVersion)
+    result = GenerationResult()
+    staleClasses = collections.deque()
+
+    def isUpToDate(name, hash):
+        previousEntry = previousManifest.entries.get(name)
+        if (previousEntry is not None
+                and previousEntry.hash == hash
+                and all(os.path.exists(scriptPath(outputDirectory, script))
+                    for script in previousEntry.scripts)):
+            manifest.entries[name] = previousEntry
+            return True
+        return False
+
+    def findStaleClasses():
+        for classDefinition in classDefinitions:
+            classHash = hashClass(
+                    classDefinition, flags, layout, classOrder,
+                    propertyLayout)
+            if isUpToDate(classDefinition.name, classHash):
+                result.skippedClasses += 1
+            else:
+                staleClasses.append((classDefinition.name, classHash))
+                yield classDefinition
+
+    # Records each rendered class in the manifest as its scripts stream by.
+    def renderStaleClasses():
+        for scripts in renderClasses(
+                findStaleClasses(), flags, jobs, layout=layout,
+                classOrder=classOrder, propertyLayout=propertyLayout):
+            className, classHash = staleClasses.popleft()
+            manifest.entries[className] = gmidl_manifest.ManifestEntry(
+                    classHash, [scriptName for scriptName, text in scripts])
+            result.renderedClasses += 1
+            for script in scripts:
+                yield script
+        # The scripts shared by all classes are recorded in the manifest
+        # under their own names.
+        for scriptName, inputs, writeScript in _projectScripts(
+                flags, metadata, pooledClasses, columnClasses, scriptIds):
+            scriptHash = gmidl_manifest.hashInputs(kGeneratorVersion, inputs)
+            if not isUpToDate(scriptName, scriptHash):
+                manifest.entries[scriptName] = gmidl_manifest.ManifestEntry(
+                        scriptHash, [scriptName])
+                yield scriptName, writeScript()
+
+    gmidl_pipeline.runPipeline(renderStaleClasses(), stages, sink)
+    for orphan in sorted(
+            previousManifest.allScripts() - manifest.allScripts()):
+        sink.remove(orphan)
+    result.writtenScripts = sink.writtenScripts
+    result.unchangedScripts = sink.unchangedScripts
+    result.removedScripts = sink.removedScripts
+    if flags.classStyle != gmidl_flags.kClassStyleStruct:
+        result.initStatements = metadata.countStatements()
+    manifest.save(manifestPath)
+    return result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+            description='Generates GMIDL wrapper scripts.')
+    parser.add_argument('classes',
+            help='JSON file with the class definitions')
+    parser.add_argument('outputDirectory',
+            help='directory to write the scripts to')
+    parser.add_argument('--flags', default=gmidl_flags.kRuntimeProfile.name,
+            choices=sorted(gmidl_flags.kProfiles),
+            help='flag profile to specialize the scripts for')
+    parser.add_argument('--manifest', default=None,
+            help='manifest path (default: in the output directory)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+            help='number of worker processes to render classes with')
+    parser.add_argument('--verbose', '-v', action='store_true',
+            help='log how every method is dispatched')
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+            format='%(message)s',
+            level=logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        result = generateProject(
+                gmidl_classes.loadClassDefinitions(args.classes),
+                args.outputDirectory,
+                gmidl_flags.getProfile(args.flags),
+                args.manifest,
+                args.jobs)
+    except (gmidl_vtables.VtableLayoutError,
+            gmidl_properties.PropertyLayoutError,
+            gmidl_columns.ColumnLayoutError) as error:
+        sys.stderr.write('error: %s\n' % error)
+        return 1
+    print('%d classes rendered, %d unchanged; '
+            '%d scripts written, %d unchanged, %d removed; '
+            '%d type entries stored at startup' % (
+                    result.renderedClasses,
+                    result.skippedClasses,
+                    result.writtenScripts,
+                    result.unchangedScripts,
+                    result.removedScripts,
+                    result.initStatements))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,134 @@
+#!/usr/local/bin/python
+
+"""Benchmarks for generating the scripts of a synthetic project.
+
+The incremental benchmark times a full generation into an empty directory,
+a regeneration with nothing changed, and a regeneration after one class was
+edited.
+
+The scaling benchmark times a full generation with 1, 2, 4 and 8 worker
+processes, and checks that every run writes the same files.
+
+The streaming benchmark measures the peak memory of streaming the scripts of
+a hundredth of the classes and of all of them through the pipeline, which
+should be about the same.
+
+To run:
+
+  python gmidl_generator_benchmark.py [numberOfClasses]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import gmidl_classes
+import gmidl_generator
+import gmidl_pipeline
+
+
+kDefaultNumberOfClasses = 5000
+
+
+def generateSyntheticClasses(numberOfClasses):
+    for i in range(numberOfClasses):
+        yield gmidl_classes.ClassDefinition(
+                'Class%d' % i,
+                'Class%d' % (i // 4) if i else None,
+                [('value%d_%d' % (i, j), 'real') for j in range(4)]
+                        + [('items%d' % i, 'ds_list')],
+                [gmidl_classes.MethodDefinition(
+                        'method%d' % j, ['a', 'b'], ['real', 'string'], 'real')
+                    for j in range(3)])
+
+
+def buildSyntheticClasses(numberOfClasses):
+    return list(generateSyntheticClasses(numberOfClasses))
+
+
+def _timeGeneration(classes, outputDirectory, **kwargs):
+    start = time.perf_counter()
+    result = gmidl_generator.generateProject(
+            classes, outputDirectory, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def runIncrementalBenchmark(numberOfClasses):
+    print('Generating %d classes:' % numberOfClasses)
+    classes = buildSyntheticClasses(numberOfClasses)
+    outputDirectory = tempfile.mkdtemp()
+    try:
+        result, elapsed = _timeGeneration(classes, outputDirectory)
+        print('  full generation     %8.3fs (%d scripts written)' % (
+                elapsed, result.writtenScripts))
+        print('  boot cost           %8d type entries stored at startup' % (
+                result.initStatements))
+        result, elapsed = _timeGeneration(classes, outputDirectory)
+        print('  nothing changed     %8.3fs (%d scripts written)' % (
+                elapsed, result.writtenScripts))
+        classes[numberOfClasses // 2].properties.append(('extra', 'real'))
+        result, elapsed = _timeGeneration(classes, outputDirectory)
+        print('  one class changed   %8.3fs (%d scripts written)' % (
+                elapsed, result.writtenScripts))
+    finally:
+        shutil.rmtree(outputDirectory)
+
+
+def _readDirectory(directory):
+    contents = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as file:
+            contents[name] = file.read()
+    return contents
+
+
+def runScalingBenchmark(numberOfClasses):
+    print('Generating %d classes (%d CPUs):' % (
+            numberOfClasses, os.cpu_count()))
+    classes = buildSyntheticClasses(numberOfClasses)
+    serialContents = None
+    serialTime = None
+    for jobs in [1, 2, 4, 8]:
+        outputDirectory = tempfile.mkdtemp()
+        try:
+            result, elapsed = _timeGeneration(
+                    classes, outputDirectory, jobs=jobs)
+            contents = _readDirectory(outputDirectory)
+        finally:
+            shutil.rmtree(outputDirectory)
+        if serialContents is None:
+            serialContents = contents
+            serialTime = elapsed
+        assert contents == serialContents
+        print('  --jobs %d   %8.3fs (%.2fx)' % (
+                jobs, elapsed, serialTime / elapsed))
+
+
+def runStreamingBenchmark(numberOfClasses):
+    print('Streaming scripts into a counting sink:')
+    for numberOfClasses in [max(1, numberOfClasses // 100), numberOfClasses]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            sink = gmidl_pipeline.runPipeline(
+                    gmidl_generator.generateScripts(
+                            generateSyntheticClasses(numberOfClasses)),
+                    [], gmidl_pipeline.CountingSink())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        print('  %6d classes  %8d scripts  %8.3fs  peak %8.1f KiB' % (
+                numberOfClasses, sink.scripts,
+                time.perf_counter() - start, peak / 1024.0))
+
+
+if __name__ == '__main__':
+    numberOfClasses = (
+            int(sys.argv[1]) if len(sys.argv) > 1
+            else kDefaultNumberOfClasses)
+    runIncrementalBenchmark(numberOfClasses)
+    runScalingBenchmark(numberOfClasses)
+    runStreamingBenchmark(numberOfClasses)
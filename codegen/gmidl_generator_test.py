@@ -0,0 +1,647 @@
+#!/usr/local/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import gmidl_ancestry
+import gmidl_classes
+import gmidl_columns
+import gmidl_flags
+import gmidl_generator
+import gmidl_pipeline
+import gmidl_properties
+import gmidl_script_ids
+import gmidl_vtables
+
+
+def makeClasses():
+    return [
+        gmidl_classes.ClassDefinition(
+                'Entity',
+                properties=[('x', 'real'), ('y', 'real')],
+                methods=[gmidl_classes.MethodDefinition(
+                        'update', ['dt'], ['real'])]),
+        gmidl_classes.ClassDefinition(
+                'Bullet',
+                'Entity',
+                properties=[('speed', 'real')]),
+    ]
+
+
+class GenerateClassScriptsTest(unittest.TestCase):
+
+    def testScriptNames(self):
+        self.assertEqual(
+                [scriptName for scriptName, text in
+                    gmidl_generator.generateClassScripts(makeClasses()[0])],
+                [
+                    'Entity_create',
+                    'Entity_destroy',
+                    'Entity_getx',
+                    'Entity_setx',
+                    'Entity_gety',
+                    'Entity_sety',
+                    'Entity_update',
+                ])
+
+    def testScriptsAreSpecialized(self):
+        for scriptName, text in gmidl_generator.generateClassScripts(
+                makeClasses()[0], gmidl_flags.kReleaseProfile):
+            self.assertNotIn('GMIDL_CLASS_STYLE', text)
+
+
+class StructGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def testStructProfileGeneratesStructs(self):
+        result = gmidl_generator.generateProject(
+                makeClasses(), self.outputDirectory,
+                gmidl_flags.kStructProfile)
+        self.assertEqual(result.writtenScripts, 13)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, 'Bullet')) as file:
+            self.assertIn('function Bullet() : Entity() constructor {',
+                    file.read())
+        self.assertNotIn('__gmidl_init_types.gml',
+                os.listdir(self.outputDirectory))
+
+    def testSwitchingToStructsRemovesTables(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        result = gmidl_generator.generateProject(
+                makeClasses(), self.outputDirectory,
+                gmidl_flags.kStructProfile)
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertEqual(result.removedScripts, 11)
+
+    def testStructDestructorDestroysChildren(self):
+        classes = makeClasses() + [gmidl_classes.ClassDefinition('Node')]
+        classes[0].properties.extend([('tags', 'ds_list'), ('child', 'Node')])
+        gmidl_generator.generateProject(
+                classes, self.outputDirectory, gmidl_flags.kStructProfile)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, 'Entity_destroy')) as file:
+            self.assertIn('    ds_list_destroy(instance.tags);\n'
+                    '    Node_destroy(instance.child);\n', file.read())
+
+
+class IncrementalGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def generate(self, classes, flags=gmidl_flags.kRuntimeProfile):
+        return gmidl_generator.generateProject(
+                classes, self.outputDirectory, flags)
+
+    def listScripts(self):
+        return sorted(
+                name for name in os.listdir(self.outputDirectory)
+                if name.endswith(gmidl_generator.kScriptExtension))
+
+    def testFirstRunRendersEverything(self):
+        result = self.generate(makeClasses())
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertEqual(result.skippedClasses, 0)
+        self.assertEqual(result.writtenScripts, 22)
+        self.assertEqual(len(self.listScripts()), 22)
+        with open(os.path.join(
+                self.outputDirectory, 'Bullet_getspeed.gml')) as file:
+            self.assertIn('__Bullet_properties.speed', file.read())
+
+    def testUnchangedClassesAreSkipped(self):
+        self.generate(makeClasses())
+        result = self.generate(makeClasses())
+        self.assertEqual(result.renderedClasses, 0)
+        self.assertEqual(result.skippedClasses, 2)
+        self.assertEqual(result.writtenScripts, 0)
+        self.assertEqual(len(self.listScripts()), 22)
+
+    def testOnlyChangedClassIsRendered(self):
+        self.generate(makeClasses())
+        classes = makeClasses()
+        classes[1].properties.append(('damage', 'real'))
+        result = self.generate(classes)
+        self.assertEqual(result.renderedClasses, 1)
+        self.assertEqual(result.skippedClasses, 1)
+        self.assertIn('Bullet_getdamage.gml', self.listScripts())
+
+    def testOrphanedScriptsAreRemoved(self):
+        self.generate(makeClasses())
+        classes = makeClasses()
+        classes[0].methods = []
+        result = self.generate(classes[:1])
+        self.assertEqual(result.removedScripts, 6)
+        self.assertNotIn('Entity_update.gml', self.listScripts())
+        self.assertNotIn('Bullet_create.gml', self.listScripts())
+        self.assertEqual(len(self.listScripts()), 16)
+
+    def testChangingFlagsRendersEverything(self):
+        self.generate(makeClasses())
+        result = self.generate(makeClasses(), gmidl_flags.kReleaseProfile)
+        self.assertEqual(result.renderedClasses, 2)
+
+    def testChangingGeneratorVersionRendersEverything(self):
+        self.generate(makeClasses())
+        version = gmidl_generator.kGeneratorVersion
+        gmidl_generator.kGeneratorVersion = version + 1
+        try:
+            result = self.generate(makeClasses())
+        finally:
+            gmidl_generator.kGeneratorVersion = version
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertEqual(result.writtenScripts, 0)
+        self.assertEqual(result.unchangedScripts, 22)
+
+    def testDeletedScriptIsRegenerated(self):
+        self.generate(makeClasses())
+        os.remove(os.path.join(self.outputDirectory, 'Entity_getx.gml'))
+        result = self.generate(makeClasses())
+        self.assertEqual(result.renderedClasses, 1)
+        self.assertIn('Entity_getx.gml', self.listScripts())
+
+    def testProfilerScriptsOnlyWithTimeProfiling(self):
+        self.generate(makeClasses(), gmidl_flags.kProfileProfile)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, '__gmidl_declare_script_ids')) as file:
+            self.assertIn('    Entity_update = 0,\n', file.read())
+        result = self.generate(makeClasses(), gmidl_flags.kReleaseProfile)
+        self.assertEqual(result.removedScripts, 4)
+        self.assertNotIn('__gmidl_profile_dump.gml', self.listScripts())
+
+    def testScopeScriptsOnlyWithScopeTracking(self):
+        self.generate(makeClasses(), gmidl_flags.kDebugProfile)
+        self.assertIn('__gmidl_init_scopes.gml', self.listScripts())
+        self.assertIn('__gmidl_declare_script_ids.gml', self.listScripts())
+        self.assertNotIn('__gmidl_init_profiler.gml', self.listScripts())
+        result = self.generate(makeClasses(), gmidl_flags.kReleaseProfile)
+        self.assertEqual(result.removedScripts, 3)
+        self.assertNotIn('__gmidl_scope_dump.gml', self.listScripts())
+
+    def testSampledTypeChecksGetCallCounts(self):
+        self.generate(makeClasses(), gmidl_flags.kQaProfile)
+        self.assertIn('__gmidl_init_call_counts.gml', self.listScripts())
+        symbols = gmidl_script_ids.loadSymbolTable(
+                gmidl_generator.scriptPath(
+                        self.outputDirectory,
+                        gmidl_script_ids.kScriptName))
+        self.assertIn('Bullet_setspeed', symbols.values())
+        result = self.generate(makeClasses(), gmidl_flags.kReleaseProfile)
+        self.assertEqual(result.removedScripts, 2)
+        self.assertNotIn('__gmidl_init_call_counts.gml', self.listScripts())
+
+    def testClassesCanBeStreamed(self):
+        result = self.generate(iter(makeClasses()))
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertEqual(len(self.listScripts()), 22)
+
+    def testStagesRunBeforeTheSink(self):
+        hashes = {}
+        gmidl_generator.generateProject(
+                makeClasses(), self.outputDirectory,
+                stages=[gmidl_pipeline.hashScripts(hashes)])
+        self.assertEqual(len(hashes), 22)
+        self.assertIn('Bullet_create', hashes)
+
+
+class VtableGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def readScript(self, scriptName):
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, scriptName)) as file:
+            return file.read()
+
+    def testOverriddenMethodsDispatchThroughVtable(self):
+        classes = makeClasses()
+        classes[1].methods.append(gmidl_classes.MethodDefinition(
+                'update', ['dt'], ['real']))
+        gmidl_generator.generateProject(classes, self.outputDirectory)
+        self.assertIn(
+                'global.__gmidl_vtable__[__type__(argument0), 0]',
+                self.readScript('Entity_update'))
+        self.assertIn(
+                'var returnValue = _IMPL_Bullet_update(argument0, argument1);',
+                self.readScript('Bullet_update'))
+        self.assertIn(
+                'global.__gmidl_vtable__[Bullet, 0] = _IMPL_Bullet_update;',
+                self.readScript('__gmidl_init_types'))
+
+    def testMethodsThatAreNotOverriddenAreCalledDirectly(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        self.assertIn(
+                'var returnValue = _IMPL_Entity_update(argument0, argument1);',
+                self.readScript('Entity_update'))
+        self.assertNotIn('script_execute', self.readScript('Entity_update'))
+
+    def testNewOverrideRerendersParent(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        classes = makeClasses()
+        classes[1].methods.append(gmidl_classes.MethodDefinition(
+                'update', ['dt'], ['real']))
+        result = gmidl_generator.generateProject(
+                classes, self.outputDirectory)
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertNotIn(
+                '_IMPL_Entity_update', self.readScript('Entity_update'))
+
+    def testNewParentMethodRerendersVtables(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        classes = makeClasses()
+        classes[0].methods.append(gmidl_classes.MethodDefinition('draw'))
+        result = gmidl_generator.generateProject(
+                classes, self.outputDirectory)
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertIn(
+                'global.__gmidl_vtable__[Bullet, 1] = _IMPL_Entity_draw;',
+                self.readScript('__gmidl_init_types'))
+
+    def testConflictingOverrideFailsGeneration(self):
+        classes = makeClasses()
+        classes[1].methods.append(gmidl_classes.MethodDefinition('update'))
+        with self.assertRaises(gmidl_vtables.VtableLayoutError):
+            gmidl_generator.generateProject(classes, self.outputDirectory)
+        self.assertEqual(os.listdir(self.outputDirectory), [])
+
+
+class PropertySlotGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def readScript(self, scriptName):
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, scriptName)) as file:
+            return file.read()
+
+    def testConstructorInitializesInheritedProperties(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        constructor = self.readScript('Bullet_create')
+        self.assertIn('newInstance[__Bullet_properties.__size] = Bullet;',
+                constructor)
+        self.assertIn('newInstance[__Bullet_properties.x] = 0;', constructor)
+        self.assertIn('newInstance[__Bullet_properties.speed] = 0;',
+                constructor)
+
+    def testTypeTablesAreBakedIntoOneScript(self):
+        result = gmidl_generator.generateProject(
+                makeClasses(), self.outputDirectory)
+        self.assertEqual(result.initStatements, 17)
+        self.assertIn(
+                "global.__gmidl_property_names__"
+                "[Bullet, __Bullet_properties.speed] = 'speed';",
+                self.readScript('__gmidl_init_types'))
+        self.assertIn('\nreturn 17;\n', self.readScript('__gmidl_init_types'))
+        result = gmidl_generator.generateProject(
+                makeClasses(), self.outputDirectory)
+        self.assertEqual(result.writtenScripts, 0)
+        self.assertEqual(result.initStatements, 17)
+
+    def testNewParentPropertyRerendersSubclass(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        classes = makeClasses()
+        classes[0].properties.append(('z', 'real'))
+        result = gmidl_generator.generateProject(
+                classes, self.outputDirectory)
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertIn('newInstance[__Bullet_properties.z] = 0;',
+                self.readScript('Bullet_create'))
+        self.assertIn('    speed = 4,\n',
+                self.readScript('__gmidl_property_slots'))
+
+    def testRedefinedPropertyFailsGeneration(self):
+        classes = makeClasses()
+        classes[1].properties.append(('x', 'real'))
+        with self.assertRaises(gmidl_properties.PropertyLayoutError):
+            gmidl_generator.generateProject(classes, self.outputDirectory)
+
+
+class PooledGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def makePooledClasses(self):
+        classes = makeClasses()
+        classes[1].attributes['pooled'] = True
+        return classes
+
+    def testPooledClassScripts(self):
+        scripts = dict(gmidl_generator.generateClassScripts(
+                self.makePooledClasses()[1],
+                properties=[('x', 'real'), ('speed', 'real')]))
+        self.assertIn('ds_stack_pop(global.__gmidl_pool_Bullet__)',
+                scripts['Bullet_create'])
+        self.assertIn('self[@__Bullet_properties.x] = 0;',
+                scripts['Bullet_destroy'])
+        self.assertIn('repeat (argument0) {', scripts['Bullet_preallocate'])
+
+    def testUnpooledClassIsNotPooled(self):
+        scripts = dict(gmidl_generator.generateClassScripts(
+                makeClasses()[1], gmidl_flags.kReleaseProfile))
+        self.assertNotIn('Bullet_preallocate', scripts)
+        self.assertNotIn('ds_stack_pop', scripts['Bullet_create'])
+        self.assertNotIn('ds_stack_push', scripts['Bullet_destroy'])
+
+    def testPoolsAreInitialized(self):
+        gmidl_generator.generateProject(
+                self.makePooledClasses(), self.outputDirectory)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, '__gmidl_init_pools')) as file:
+            self.assertIn('global.__gmidl_pool_Bullet__ = ds_stack_create();',
+                    file.read())
+        result = gmidl_generator.generateProject(
+                makeClasses(), self.outputDirectory,
+                gmidl_flags.kReleaseProfile)
+        self.assertEqual(result.removedScripts, 8)
+        self.assertNotIn('__gmidl_init_pools.gml',
+                os.listdir(self.outputDirectory))
+
+    def testPooledBaseHandsSubclassesToTheirDestructors(self):
+        classes = makeClasses()
+        classes[0].attributes['pooled'] = True
+        classes[1].properties.append(('trail', 'ds_list'))
+        gmidl_generator.generateProject(
+                classes, self.outputDirectory, gmidl_flags.kReleaseProfile)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, 'Entity_destroy')) as file:
+            destructor = file.read()
+        self.assertIn(
+                'var type = __type__(self);\n'
+                'if (type == Bullet) {\n'
+                '    Bullet_destroy(self);\n'
+                '} else {\n', destructor)
+        self.assertIn(
+                '    ds_stack_push(global.__gmidl_pool_Entity__, self);\n'
+                '}\n', destructor)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, 'Bullet_destroy')) as file:
+            self.assertIn('ds_list_destroy(self[__Bullet_properties.trail]);',
+                    file.read())
+
+    def testNewSubclassRerendersPooledBase(self):
+        classes = makeClasses()[:1]
+        classes[0].attributes['pooled'] = True
+        gmidl_generator.generateProject(classes, self.outputDirectory)
+        classes = makeClasses()
+        classes[0].attributes['pooled'] = True
+        result = gmidl_generator.generateProject(
+                classes, self.outputDirectory)
+        self.assertEqual(result.renderedClasses, 2)
+
+    def testMapPoolIsInitialized(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, '__gmidl_init_pools')) as file:
+            self.assertIn('global.__gmidl_map_pool__ = ds_stack_create();',
+                    file.read())
+
+
+class LazyGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def readScript(self, scriptName):
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, scriptName)) as file:
+            return file.read()
+
+    def makeLazyClasses(self):
+        classes = makeClasses()
+        classes[0].properties.append(('trail', 'ds_list'))
+        classes[0].attributes['lazy'] = True
+        return classes
+
+    def testSubclassCreatesInheritedPropertiesLazily(self):
+        gmidl_generator.generateProject(
+                self.makeLazyClasses(), self.outputDirectory,
+                gmidl_flags.kReleaseProfile)
+        self.assertIn('newInstance[__Bullet_properties.trail] = undefined;',
+                self.readScript('Bullet_create'))
+        self.assertIn('if (!is_undefined(self[__Bullet_properties.trail]))',
+                self.readScript('Bullet_destroy'))
+        self.assertIn('value = ds_list_create();',
+                self.readScript('Entity_gettrail'))
+
+    def testLazyMutatorsReadThroughGetter(self):
+        gmidl_generator.generateProject(
+                self.makeLazyClasses(), self.outputDirectory,
+                gmidl_flags.kReleaseProfile)
+        self.assertIn('var items = Entity_gettrail(argument0);',
+                self.readScript('Entity_pushtrail'))
+        self.assertIn('ds_list_clear(items);',
+                self.readScript('Entity_cleartrail'))
+
+    def testTogglingLazyRerendersSubclasses(self):
+        gmidl_generator.generateProject(makeClasses(), self.outputDirectory)
+        result = gmidl_generator.generateProject(
+                self.makeLazyClasses(), self.outputDirectory)
+        self.assertEqual(result.renderedClasses, 2)
+        classes = self.makeLazyClasses()
+        classes[0].attributes['lazy'] = False
+        result = gmidl_generator.generateProject(
+                classes, self.outputDirectory)
+        self.assertEqual(result.renderedClasses, 2)
+        self.assertIn('= ds_list_create();', self.readScript('Bullet_create'))
+
+
+class DirtyGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def readScript(self, scriptName):
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, scriptName)) as file:
+            return file.read()
+
+    def makeDirtyClasses(self):
+        classes = makeClasses()
+        classes[0].properties.append(('trail', 'ds_list'))
+        classes[0].attributes['dirty'] = True
+        return classes
+
+    def testSettersMarkInheritedSlot(self):
+        gmidl_generator.generateProject(
+                self.makeDirtyClasses(), self.outputDirectory,
+                gmidl_flags.kReleaseProfile)
+        self.assertIn('newInstance[__Bullet_properties.__dirty] = 0;',
+                self.readScript('Bullet_create'))
+        self.assertIn(
+                'argument0[@__Bullet_properties.__dirty] = '
+                'argument0[__Bullet_properties.__dirty] | ',
+                self.readScript('Bullet_setspeed'))
+        self.assertIn('| 8;', self.readScript('Entity_pushtrail'))
+        self.assertIn('return argument0[__Entity_properties.__dirty];',
+                self.readScript('Entity_getDirty'))
+        self.assertTrue(os.path.exists(gmidl_generator.scriptPath(
+                self.outputDirectory, 'Entity_forEachDirty')))
+        self.assertFalse(os.path.exists(gmidl_generator.scriptPath(
+                self.outputDirectory, 'Bullet_getDirty')))
+
+    def testDirtySlotIsNotAConstructorArgument(self):
+        gmidl_generator.generateProject(
+                self.makeDirtyClasses(), self.outputDirectory,
+                gmidl_flags.kReleaseProfile)
+        self.assertNotIn('__dirty real', self.readScript('Entity_create'))
+        self.assertNotIn('__dirty real', self.readScript('Bullet_create'))
+
+    def testClassScriptsWithoutLayout(self):
+        classDefinition = gmidl_classes.ClassDefinition(
+                'Foo', None, [('x', 'real')], attributes={'dirty': True})
+        scripts = dict(gmidl_generator.generateClassScripts(
+                classDefinition, gmidl_flags.kReleaseProfile))
+        self.assertIn('argument0[__Foo_properties.__dirty] | 2;',
+                scripts['Foo_setx'])
+        self.assertIn('Foo_clearDirty', scripts)
+
+    def testDirtyColumns(self):
+        classes = [gmidl_classes.ClassDefinition(
+                'Particle', None, [('x', 'real')],
+                attributes={'columns': True, 'dirty': True})]
+        gmidl_generator.generateProject(classes, self.outputDirectory)
+        self.assertIn('global.__gmidl_column_Particle___dirty__[0] = 0;',
+                self.readScript(gmidl_columns.kInitScriptName))
+
+
+class ColumnGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDirectory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDirectory)
+
+    def makeColumnClasses(self):
+        return [gmidl_classes.ClassDefinition(
+                'Particle', None, [('x', 'real'), ('trail', 'ds_list')],
+                [gmidl_classes.MethodDefinition('update', ['dt'], ['real'])],
+                {'columns': True})]
+
+    def testColumnClassScripts(self):
+        scripts = dict(gmidl_generator.generateClassScripts(
+                self.makeColumnClasses()[0], checkedTypes=set(['Particle'])))
+        self.assertEqual(sorted(scripts), [
+            'Particle_cleartrail',
+            'Particle_create',
+            'Particle_destroy',
+            'Particle_fillx',
+            'Particle_forEachupdate',
+            'Particle_gettrail',
+            'Particle_getx',
+            'Particle_pushtrail',
+            'Particle_setAttrail',
+            'Particle_settrail',
+            'Particle_setx',
+            'Particle_update',
+            '__check_instanceof_Particle__',
+        ])
+        self.assertIn('_IMPL_Particle_update(argument0, argument1)',
+                scripts['Particle_update'])
+
+    def testColumnsAreInitialized(self):
+        gmidl_generator.generateProject(
+                self.makeColumnClasses(), self.outputDirectory)
+        with open(gmidl_generator.scriptPath(
+                self.outputDirectory, '__gmidl_init_columns')) as file:
+            self.assertIn('global.__gmidl_column_Particle_x__[0] = 0;',
+                    file.read())
+
+    def testColumnClassInHierarchyFailsGeneration(self):
+        classes = makeClasses()
+        classes[1].attributes['columns'] = True
+        with self.assertRaises(gmidl_columns.ColumnLayoutError):
+            gmidl_generator.generateProject(classes, self.outputDirectory)
+        self.assertEqual(os.listdir(self.outputDirectory), [])
+
+
+class InstanceCheckGenerationTest(unittest.TestCase):
+
+    def testKnownClassesUseGeneratedChecks(self):
+        classes = makeClasses()
+        classes[0].properties.append(('target', 'Bullet'))
+        order = gmidl_ancestry.numberClasses(classes)
+        scripts = dict(gmidl_generator.generateClassScripts(
+                classes[0],
+                checkedTypes=order.checkedTypes(classes[0])))
+        self.assertIn(
+                '__check_instanceof_Entity__(self);\n'
+                '    __check_instanceof_Bullet__(value);',
+                scripts['Entity_settarget'])
+        self.assertIn(
+                '__check_instanceof__(value, real);', scripts['Entity_setx'])
+        self.assertIn('__check_instanceof_Entity__', scripts)
+
+
+class ParallelGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directories = [tempfile.mkdtemp() for i in range(2)]
+
+    def tearDown(self):
+        for directory in self.directories:
+            shutil.rmtree(directory)
+
+    def makeManyClasses(self):
+        return [
+            gmidl_classes.ClassDefinition(
+                    'Class%d' % i,
+                    properties=[('value', 'real'), ('items', 'ds_list')],
+                    methods=[gmidl_classes.MethodDefinition('run', ['n'])])
+            for i in range(40)
+        ]
+
+    def readDirectory(self, directory):
+        contents = {}
+        for name in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, name), 'rb') as file:
+                contents[name] = file.read()
+        return contents
+
+    def testRenderClassesKeepsOrder(self):
+        classes = self.makeManyClasses()
+        self.assertEqual(
+                list(gmidl_generator.renderClasses(classes, jobs=3)),
+                list(gmidl_generator.renderClasses(classes, jobs=1)))
+
+    def testOutputMatchesSerialGeneration(self):
+        serialDirectory, parallelDirectory = self.directories
+        gmidl_generator.generateProject(
+                self.makeManyClasses(), serialDirectory, jobs=1)
+        result = gmidl_generator.generateProject(
+                self.makeManyClasses(), parallelDirectory, jobs=4)
+        self.assertEqual(result.renderedClasses, 40)
+        self.assertEqual(
+                self.readDirectory(parallelDirectory),
+                self.readDirectory(serialDirectory))
+
+
+if __name__ == '__main__':
+    unittest.main()
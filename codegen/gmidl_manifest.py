@@ -0,0 +1,84 @@
+#!/usr/local/bin/python
+
+"""The on-disk record of a previous generation run.
+
+For every class, the manifest stores a content hash of everything that went
+into generating its scripts, and the names of the scripts that were
+generated. The generator only re-renders classes whose hash changed, and
+deletes scripts that no class produces any more.
+
+The manifest is a JSON file:
+
+    {
+        "generatorVersion": 1,
+        "classes": {
+            "Bullet": {
+                "hash": "3f2a...",
+                "scripts": ["Bullet_create", "Bullet_getspeed", ...]
+            }
+        }
+    }
+"""
+
+import hashlib
+import json
+import os
+
+
+class ManifestEntry(object):
+
+    def __init__(self, hash, scripts):
+        self.hash = hash
+        self.scripts = list(scripts)
+
+
+class Manifest(object):
+
+    def __init__(self, generatorVersion=None, entries=None):
+        self.generatorVersion = generatorVersion
+        self.entries = dict(entries) if entries else {}
+
+    def allScripts(self):
+        return set(
+                script
+                for entry in self.entries.values()
+                for script in entry.scripts)
+
+    def toJson(self):
+        return {
+            'generatorVersion': self.generatorVersion,
+            'classes': dict(
+                (className, {'hash': entry.hash, 'scripts': entry.scripts})
+                for className, entry in self.entries.items()),
+        }
+
+    @classmethod
+    def fromJson(cls, data):
+        return cls(
+                data.get('generatorVersion'),
+                dict(
+                    (className, ManifestEntry(entry['hash'], entry['scripts']))
+                    for className, entry in data.get('classes', {}).items()))
+
+    def save(self, path):
+        temporaryPath = path + '.tmp'
+        with open(temporaryPath, 'w') as file:
+            json.dump(self.toJson(), file, indent=1, sort_keys=True)
+        os.replace(temporaryPath, path)
+
+
+# Returns an empty manifest if there is no manifest at path yet, or if it
+# cannot be read, so that everything is regenerated.
+def loadManifest(path):
+    if not path or not os.path.exists(path):
+        return Manifest()
+    try:
+        with open(path) as file:
+            return Manifest.fromJson(json.load(file))
+    except (ValueError, KeyError):
+        return Manifest()
+
+
+def hashInputs(*inputs):
+    return hashlib.sha256(
+            json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
@@ -0,0 +1,50 @@
+#!/usr/local/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import gmidl_manifest
+
+
+class ManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testMissingManifestIsEmpty(self):
+        manifest = gmidl_manifest.loadManifest(self.path)
+        self.assertEqual(manifest.entries, {})
+
+    def testCorruptManifestIsEmpty(self):
+        with open(self.path, 'w') as file:
+            file.write('{not json')
+        self.assertEqual(gmidl_manifest.loadManifest(self.path).entries, {})
+
+    def testSaveAndLoad(self):
+        manifest = gmidl_manifest.Manifest(3, {
+            'Foo': gmidl_manifest.ManifestEntry('abc', ['Foo_create']),
+        })
+        manifest.save(self.path)
+        loaded = gmidl_manifest.loadManifest(self.path)
+        self.assertEqual(loaded.generatorVersion, 3)
+        self.assertEqual(loaded.entries['Foo'].hash, 'abc')
+        self.assertEqual(loaded.allScripts(), set(['Foo_create']))
+        self.assertEqual(os.listdir(self.directory), ['manifest.json'])
+
+    def testHashInputs(self):
+        self.assertEqual(
+                gmidl_manifest.hashInputs(1, {'a': 1, 'b': 2}),
+                gmidl_manifest.hashInputs(1, {'b': 2, 'a': 1}))
+        self.assertNotEqual(
+                gmidl_manifest.hashInputs(1, {'a': 1}),
+                gmidl_manifest.hashInputs(2, {'a': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
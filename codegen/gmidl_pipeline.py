@@ -0,0 +1,136 @@
+#!/usr/local/bin/python
+
+"""A streaming pipeline for generated scripts.
+
+Scripts flow through the pipeline one at a time as (scriptName, text) pairs,
+so only the script being processed has to be kept in memory, however big the
+project is. A stage is a function that takes an iterator of pairs and
+returns an iterator of pairs, like a minifier or a hasher. A sink is an
+object with a write(scriptName, text) method, and consumes the pairs at the
+end of the pipeline. ScriptFileSink writes the scripts to files, skipping the
+ones whose contents did not change:
+
+    hashes = {}
+    sink = gmidl_pipeline.ScriptFileSink('scripts')
+    gmidl_pipeline.runPipeline(
+            gmidl_generator.generateScripts(classDefinitions),
+            [gmidl_pipeline.hashScripts(hashes)],
+            sink)
+"""
+
+import binascii
+import hashlib
+import os
+
+
+kScriptExtension = '.gml'
+kHashBlockSize = 1 << 16
+
+# Scripts are created with the permissions open() would give them, which the
+# umask then restricts, rather than the private ones of tempfile.mkstemp().
+kScriptMode = 0o666
+_kTemporaryFlags = (
+        os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0))
+
+
+def runPipeline(scripts, stages, sink):
+    for stage in stages:
+        scripts = stage(scripts)
+    for scriptName, text in scripts:
+        sink.write(scriptName, text)
+    return sink
+
+
+# Returns a stage that records the SHA-256 of every script in hashes.
+def hashScripts(hashes):
+    def stage(scripts):
+        for scriptName, text in scripts:
+            hashes[scriptName] = hashlib.sha256(
+                    text.encode('utf-8')).hexdigest()
+            yield scriptName, text
+    return stage
+
+
+def scriptPath(outputDirectory, scriptName):
+    return os.path.join(outputDirectory, scriptName + kScriptExtension)
+
+
+# Writes every script to <outputDirectory>/<scriptName>.gml, but only if it
+# changed: a file with the same size and SHA-256 as the new text is left
+# alone, so its modification time is kept and the GameMaker IDE and git do not
+# see it as changed. Changed files are written to a temporary file in the same
+# directory first, and then renamed over the old one, so a reader never sees
+# a half-written script.
+class ScriptFileSink(object):
+
+    def __init__(self, outputDirectory):
+        self._outputDirectory = outputDirectory
+        self.writtenScripts = 0
+        self.unchangedScripts = 0
+        self.removedScripts = 0
+
+    def write(self, scriptName, text):
+        path = scriptPath(self._outputDirectory, scriptName)
+        data = text.encode('utf-8')
+        if _fileHasContents(path, data):
+            self.unchangedScripts += 1
+            return
+        _replaceFile(path, data)
+        self.writtenScripts += 1
+
+    def remove(self, scriptName):
+        path = scriptPath(self._outputDirectory, scriptName)
+        if os.path.exists(path):
+            os.remove(path)
+            self.removedScripts += 1
+
+
+# Compares the sizes first, so that most changed files are found without
+# reading them.
+def _fileHasContents(path, data):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as file:
+            fileHash = hashlib.sha256()
+            for block in iter(lambda: file.read(kHashBlockSize), b''):
+                fileHash.update(block)
+    except OSError:
+        return False
+    return fileHash.digest() == hashlib.sha256(data).digest()
+
+
+def _replaceFile(path, data):
+    descriptor, temporaryPath = _createTemporaryFile(path)
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.replace(temporaryPath, path)
+    except BaseException:
+        os.remove(temporaryPath)
+        raise
+
+
+# Creates a new file next to path, with a random name that cannot clash with
+# another writer's.
+def _createTemporaryFile(path):
+    directory, name = os.path.split(path)
+    while True:
+        temporaryPath = os.path.join(directory, '.%s.%s.tmp' % (
+                name, binascii.hexlify(os.urandom(8)).decode('ascii')))
+        try:
+            return (os.open(temporaryPath, _kTemporaryFlags, kScriptMode),
+                    temporaryPath)
+        except FileExistsError:
+            continue
+
+
+class CountingSink(object):
+
+    def __init__(self):
+        self.scripts = 0
+        self.characters = 0
+
+    def write(self, scriptName, text):
+        self.scripts += 1
+        self.characters += len(text)
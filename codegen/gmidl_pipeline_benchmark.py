@@ -0,0 +1,82 @@
+#!/usr/local/bin/python
+
+"""Compares rewriting every script with writing only the changed ones.
+
+Writes a synthetic tree of scripts into an empty directory, and then writes
+it again with nothing changed and with 1% of the scripts changed, once with
+a sink that always rewrites every file and once with ScriptFileSink.
+
+To run:
+
+  python gmidl_pipeline_benchmark.py [numberOfScripts]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+import gmidl_pipeline
+
+
+kDefaultNumberOfScripts = 20000
+
+
+class RewritingSink(object):
+
+    def __init__(self, outputDirectory):
+        self._outputDirectory = outputDirectory
+        self.writtenScripts = 0
+        self.unchangedScripts = 0
+
+    def write(self, scriptName, text):
+        path = gmidl_pipeline.scriptPath(self._outputDirectory, scriptName)
+        with open(path, 'w') as file:
+            file.write(text)
+        self.writtenScripts += 1
+
+
+def generateSyntheticScripts(numberOfScripts, changed=0):
+    for i in range(numberOfScripts):
+        text = '\n'.join([
+            '///Class%d_getvalue(self)' % i,
+            'var self = argument0;',
+            'return self[__Class%d_properties_value];' % i,
+            '',
+        ])
+        if changed and i % 100 == 0:
+            text += '// changed\n'
+        yield 'Class%d_getvalue' % i, text
+
+
+def _timeRun(sink, numberOfScripts, changed=0):
+    start = time.perf_counter()
+    gmidl_pipeline.runPipeline(
+            generateSyntheticScripts(numberOfScripts, changed), [], sink)
+    return time.perf_counter() - start
+
+
+def main(numberOfScripts):
+    print('%d scripts' % numberOfScripts)
+    sinks = [
+        ('RewritingSink', RewritingSink),
+        ('ScriptFileSink', gmidl_pipeline.ScriptFileSink),
+    ]
+    for sinkName, makeSink in sinks:
+        outputDirectory = tempfile.mkdtemp()
+        try:
+            for runName, changed in [
+                    ('empty directory', 0),
+                    ('nothing changed', 0),
+                    ('1% changed', 1)]:
+                sink = makeSink(outputDirectory)
+                elapsed = _timeRun(sink, numberOfScripts, changed)
+                print('%-15s %-16s %8.3fs (%d written, %d unchanged)' % (
+                        sinkName, runName, elapsed,
+                        sink.writtenScripts, sink.unchangedScripts))
+        finally:
+            shutil.rmtree(outputDirectory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else kDefaultNumberOfScripts)
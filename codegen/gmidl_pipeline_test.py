@@ -0,0 +1,176 @@
+#!/usr/local/bin/python
+
+import hashlib
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+
+import gmidl_classes
+import gmidl_generator
+import gmidl_pipeline
+
+
+class ListSink(object):
+
+    def __init__(self):
+        self.scripts = []
+
+    def write(self, scriptName, text):
+        self.scripts.append((scriptName, text))
+
+
+def upperCase(scripts):
+    for scriptName, text in scripts:
+        yield scriptName, text.upper()
+
+
+def addSuffix(scripts):
+    for scriptName, text in scripts:
+        yield scriptName + '_x', text
+
+
+def makeClasses(numberOfClasses):
+    for i in range(numberOfClasses):
+        yield gmidl_classes.ClassDefinition(
+                'Class%d' % i,
+                properties=[('value', 'real')],
+                methods=[gmidl_classes.MethodDefinition('run', ['n'])])
+
+
+class PipelineTest(unittest.TestCase):
+
+    def testWithoutStages(self):
+        sink = gmidl_pipeline.runPipeline(
+                [('a', 'foo'), ('b', 'bar')], [], ListSink())
+        self.assertEqual(sink.scripts, [('a', 'foo'), ('b', 'bar')])
+
+    def testStagesAreChainedInOrder(self):
+        sink = gmidl_pipeline.runPipeline(
+                [('a', 'foo')], [upperCase, addSuffix], ListSink())
+        self.assertEqual(sink.scripts, [('a_x', 'FOO')])
+
+    def testHashScripts(self):
+        hashes = {}
+        sink = gmidl_pipeline.runPipeline(
+                [('a', 'foo')],
+                [upperCase, gmidl_pipeline.hashScripts(hashes)],
+                ListSink())
+        self.assertEqual(sink.scripts, [('a', 'FOO')])
+        self.assertEqual(
+                hashes, {'a': hashlib.sha256(b'FOO').hexdigest()})
+
+    def testScriptsStreamOneAtATime(self):
+        consumed = []
+
+        def source():
+            for name in ['a', 'b', 'c']:
+                consumed.append(name)
+                yield name, ''
+
+        class CheckingSink(object):
+            def write(sink, scriptName, text):
+                self.assertEqual(consumed[-1], scriptName)
+
+        gmidl_pipeline.runPipeline(source(), [], CheckingSink())
+        self.assertEqual(consumed, ['a', 'b', 'c'])
+
+    def testCountingSink(self):
+        sink = gmidl_pipeline.runPipeline(
+                [('a', 'foo'), ('b', 'quux')], [],
+                gmidl_pipeline.CountingSink())
+        self.assertEqual(sink.scripts, 2)
+        self.assertEqual(sink.characters, 7)
+
+
+class ScriptFileSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testWritesScripts(self):
+        sink = gmidl_pipeline.runPipeline(
+                [('a', 'foo'), ('b', 'bar')], [],
+                gmidl_pipeline.ScriptFileSink(self.directory))
+        self.assertEqual(sink.writtenScripts, 2)
+        self.assertEqual(
+                sorted(os.listdir(self.directory)), ['a.gml', 'b.gml'])
+        with open(os.path.join(self.directory, 'b.gml')) as file:
+            self.assertEqual(file.read(), 'bar')
+
+    def testSkipsUnchangedScripts(self):
+        gmidl_pipeline.runPipeline(
+                [('a', 'foo'), ('b', 'bar')], [],
+                gmidl_pipeline.ScriptFileSink(self.directory))
+        path = os.path.join(self.directory, 'a.gml')
+        os.utime(path, (0, 0))
+        sink = gmidl_pipeline.runPipeline(
+                [('a', 'foo'), ('b', 'baz')], [],
+                gmidl_pipeline.ScriptFileSink(self.directory))
+        self.assertEqual(sink.writtenScripts, 1)
+        self.assertEqual(sink.unchangedScripts, 1)
+        self.assertEqual(os.path.getmtime(path), 0)
+        with open(os.path.join(self.directory, 'b.gml')) as file:
+            self.assertEqual(file.read(), 'baz')
+
+    def testRewritesScriptOfDifferentSize(self):
+        sink = gmidl_pipeline.ScriptFileSink(self.directory)
+        sink.write('a', 'foo')
+        sink.write('a', 'foobar')
+        self.assertEqual(sink.writtenScripts, 2)
+        with open(os.path.join(self.directory, 'a.gml')) as file:
+            self.assertEqual(file.read(), 'foobar')
+
+    def testLeavesNoTemporaryFiles(self):
+        sink = gmidl_pipeline.ScriptFileSink(self.directory)
+        sink.write('a', 'foo')
+        sink.write('a', 'bar')
+        self.assertEqual(os.listdir(self.directory), ['a.gml'])
+
+    @unittest.skipIf(os.name != 'posix', 'needs POSIX permissions')
+    def testScriptsGetPermissionsOfTheUmask(self):
+        umask = os.umask(0o027)
+        try:
+            gmidl_pipeline.ScriptFileSink(self.directory).write('a', 'foo')
+        finally:
+            os.umask(umask)
+        self.assertEqual(
+                os.stat(os.path.join(self.directory, 'a.gml')).st_mode
+                    & 0o777,
+                0o640)
+
+    def testRemove(self):
+        sink = gmidl_pipeline.ScriptFileSink(self.directory)
+        sink.write('a', 'foo')
+        sink.remove('a')
+        sink.remove('b')
+        self.assertEqual(sink.removedScripts, 1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class StreamingMemoryTest(unittest.TestCase):
+
+    def measurePeakMemory(self, numberOfClasses):
+        tracemalloc.start()
+        try:
+            sink = gmidl_pipeline.runPipeline(
+                    gmidl_generator.generateScripts(
+                            makeClasses(numberOfClasses)),
+                    [], gmidl_pipeline.CountingSink())
+            return sink, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def testPeakMemoryDoesNotGrowWithProject(self):
+        smallSink, smallPeak = self.measurePeakMemory(10)
+        largeSink, largePeak = self.measurePeakMemory(1000)
+        self.assertEqual(largeSink.scripts, 100 * smallSink.scripts)
+        self.assertLess(largePeak, 2 * smallPeak)
+
+
+if __name__ == '__main__':
+    unittest.main()
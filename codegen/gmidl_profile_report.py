@@ -0,0 +1,200 @@
+#!/usr/local/bin/python
+
+"""Reports on a profile dumped by __gmidl_profile_dump.
+
+Prints a table of the hottest scripts. Only 1 in every N calls of a script
+is timed, so the total time of a script is estimated from the time of its
+timed calls, scaled by the number of calls.
+
+With --flamegraph, also writes the profile as collapsed stacks, one stack
+per line, for flamegraph.pl and compatible tools:
+
+    Entity_update;Bullet_hit 1300
+
+The profile only records which script called which, so the time of a script
+is split between the stacks it is called from in proportion to the time of
+each of its callers, like gprof does.
+
+To run:
+
+  python gmidl_profile_report.py profile.csv \\
+      [--sort time|calls|samples] [--limit 20] [--flamegraph stacks.txt]
+"""
+
+import argparse
+import collections
+import sys
+
+import gmidl_profiler
+
+
+class ScriptProfile(object):
+
+    def __init__(self, name, calls=0, samples=0, microseconds=0.0):
+        self.name = name
+        self.calls = calls
+        self.samples = samples
+        self.microseconds = microseconds
+
+    @property
+    def estimatedMicroseconds(self):
+        if not self.samples:
+            return 0.0
+        return self.microseconds * self.calls / self.samples
+
+    @property
+    def microsecondsPerCall(self):
+        if not self.samples:
+            return 0.0
+        return self.microseconds / self.samples
+
+
+class Profile(object):
+
+    def __init__(self, scripts=None, edges=None):
+        # Maps the name of every script to its ScriptProfile.
+        self.scripts = dict(scripts) if scripts else {}
+        # Maps the (caller, script) of every call edge to the time of the
+        # timed calls along it. The caller is None for calls from code that
+        # GMIDL did not generate.
+        self.edges = dict(edges) if edges else {}
+
+
+class ProfileFormatError(ValueError):
+    pass
+
+
+def parseProfile(lines):
+    profile = Profile()
+    lines = iter(line.rstrip('\r\n') for line in lines)
+    if next(lines, None) != gmidl_profiler.kScriptsHeader:
+        raise ProfileFormatError(
+                'Expected %r' % gmidl_profiler.kScriptsHeader)
+    for line in lines:
+        if not line:
+            break
+        try:
+            name, calls, samples, microseconds = line.split(',')
+            profile.scripts[name] = ScriptProfile(
+                    name, int(float(calls)), int(float(samples)),
+                    float(microseconds))
+        except ValueError:
+            raise ProfileFormatError('Bad script row: %r' % line)
+    header = next(lines, None)
+    if header is None:
+        return profile
+    if header != gmidl_profiler.kEdgesHeader:
+        raise ProfileFormatError(
+                'Expected %r' % gmidl_profiler.kEdgesHeader)
+    for line in lines:
+        if not line:
+            continue
+        try:
+            caller, name, microseconds = line.split(',')
+            profile.edges[(caller or None, name)] = float(microseconds)
+        except ValueError:
+            raise ProfileFormatError('Bad edge row: %r' % line)
+    return profile
+
+
+def loadProfile(path):
+    with open(path) as file:
+        return parseProfile(file)
+
+
+_sortKeys = {
+    'time': lambda script: script.estimatedMicroseconds,
+    'calls': lambda script: script.calls,
+    'samples': lambda script: script.samples,
+}
+
+
+def hotScripts(profile, sortBy='time', limit=None):
+    scripts = sorted(
+            profile.scripts.values(),
+            key=lambda script: (-_sortKeys[sortBy](script), script.name))
+    return scripts[:limit] if limit else scripts
+
+
+def formatHotScripts(scripts):
+    width = max([len('script')] + [len(script.name) for script in scripts])
+    lines = ['%-*s %10s %8s %12s %10s' % (
+            width, 'script', 'calls', 'samples', 'est. ms', 'us/call')]
+    for script in scripts:
+        lines.append('%-*s %10d %8d %12.3f %10.2f' % (
+                width, script.name, script.calls, script.samples,
+                script.estimatedMicroseconds / 1000.0,
+                script.microsecondsPerCall))
+    return '\n'.join(lines)
+
+
+# Returns the time of every stack of scripts, as a list of (stack, self
+# time) pairs, where stack is a tuple of script names starting with a script
+# that was called from code that GMIDL did not generate.
+def collapsedStacks(profile):
+    inclusiveTimes = collections.defaultdict(float)
+    callees = collections.defaultdict(list)
+    roots = []
+    for (caller, name), microseconds in sorted(
+            profile.edges.items(),
+            key=lambda item: (item[0][0] or '', item[0][1])):
+        inclusiveTimes[name] += microseconds
+        if caller is None:
+            roots.append(((name,), microseconds))
+        else:
+            callees[caller].append((name, microseconds))
+    stacks = collections.OrderedDict()
+    # Walks the call graph without recursion. A call back into a script that
+    # is already on the stack is left in the time of its caller.
+    pending = list(reversed(roots))
+    while pending:
+        stack, microseconds = pending.pop()
+        name = stack[-1]
+        childTime = 0.0
+        children = []
+        for callee, edgeTime in callees[name]:
+            if callee in stack or not inclusiveTimes[name]:
+                continue
+            share = edgeTime * microseconds / inclusiveTimes[name]
+            childTime += share
+            children.append((stack + (callee,), share))
+        pending.extend(reversed(children))
+        selfTime = microseconds - childTime
+        if selfTime > 0:
+            stacks[stack] = stacks.get(stack, 0.0) + selfTime
+    return list(stacks.items())
+
+
+def formatCollapsedStacks(stacks):
+    return ''.join(
+            '%s %d\n' % (';'.join(stack), round(microseconds))
+            for stack, microseconds in stacks
+            if round(microseconds) > 0)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+            description='Reports on a GMIDL profile.')
+    parser.add_argument('profile',
+            help='CSV file written by %s' % gmidl_profiler.kDumpScriptName)
+    parser.add_argument('--sort', default='time', choices=sorted(_sortKeys),
+            help='what to sort the scripts by')
+    parser.add_argument('--limit', type=int, default=20,
+            help='number of scripts to list, or 0 for all of them')
+    parser.add_argument('--flamegraph', default=None,
+            help='file to write collapsed stacks to')
+    args = parser.parse_args(argv)
+    try:
+        profile = loadProfile(args.profile)
+    except ProfileFormatError as error:
+        sys.stderr.write('error: %s\n' % error)
+        return 1
+    print(formatHotScripts(hotScripts(profile, args.sort, args.limit)))
+    if args.flamegraph:
+        with open(args.flamegraph, 'w') as file:
+            file.write(formatCollapsedStacks(collapsedStacks(profile)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,144 @@
+#!/usr/local/bin/python
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import gmidl_profile_report
+
+
+kProfile = """
+script,calls,samples,microseconds
+Entity_update,1000,10,500.00
+Bullet_hit,400,4,40.00
+Entity_draw,50,0,0.00
+
+caller,script,microseconds
+,Entity_update,500.00
+Entity_update,Bullet_hit,40.00
+""".lstrip('\n')
+
+
+def makeProfile():
+    return gmidl_profile_report.parseProfile(kProfile.splitlines(True))
+
+
+class ParseProfileTest(unittest.TestCase):
+
+    def testScripts(self):
+        profile = makeProfile()
+        script = profile.scripts['Entity_update']
+        self.assertEqual(script.calls, 1000)
+        self.assertEqual(script.samples, 10)
+        self.assertEqual(script.estimatedMicroseconds, 50000.0)
+        self.assertEqual(script.microsecondsPerCall, 50.0)
+        self.assertEqual(
+                profile.scripts['Entity_draw'].estimatedMicroseconds, 0.0)
+
+    def testEdges(self):
+        self.assertEqual(makeProfile().edges, {
+            (None, 'Entity_update'): 500.0,
+            ('Entity_update', 'Bullet_hit'): 40.0,
+        })
+
+    def testBadHeader(self):
+        with self.assertRaises(gmidl_profile_report.ProfileFormatError):
+            gmidl_profile_report.parseProfile(['calls\n'])
+
+    def testBadRow(self):
+        with self.assertRaises(gmidl_profile_report.ProfileFormatError):
+            gmidl_profile_report.parseProfile(
+                    [kProfile.splitlines(True)[0], 'Foo,1\n'])
+
+
+class HotScriptsTest(unittest.TestCase):
+
+    def testSortedByEstimatedTime(self):
+        self.assertEqual(
+                [script.name for script in gmidl_profile_report.hotScripts(
+                        makeProfile())],
+                ['Entity_update', 'Bullet_hit', 'Entity_draw'])
+
+    def testSortedByCallsWithLimit(self):
+        self.assertEqual(
+                [script.name for script in gmidl_profile_report.hotScripts(
+                        makeProfile(), 'calls', 2)],
+                ['Entity_update', 'Bullet_hit'])
+
+    def testTable(self):
+        table = gmidl_profile_report.formatHotScripts(
+                gmidl_profile_report.hotScripts(makeProfile()))
+        self.assertIn('Entity_update       1000       10       50.000',
+                table)
+
+
+class CollapsedStacksTest(unittest.TestCase):
+
+    def testSelfTimeOfEveryStack(self):
+        self.assertEqual(
+                gmidl_profile_report.collapsedStacks(makeProfile()), [
+                    (('Entity_update',), 460.0),
+                    (('Entity_update', 'Bullet_hit'), 40.0),
+                ])
+
+    def testTimeIsSplitBetweenCallers(self):
+        profile = gmidl_profile_report.Profile(edges={
+            (None, 'A'): 100.0,
+            (None, 'B'): 300.0,
+            ('A', 'C'): 50.0,
+            ('B', 'C'): 150.0,
+            ('C', 'D'): 100.0,
+        })
+        stacks = dict(gmidl_profile_report.collapsedStacks(profile))
+        self.assertEqual(stacks[('A', 'C', 'D')], 25.0)
+        self.assertEqual(stacks[('B', 'C', 'D')], 75.0)
+        self.assertEqual(stacks[('A', 'C')], 25.0)
+
+    def testRecursionStaysInCaller(self):
+        profile = gmidl_profile_report.Profile(edges={
+            (None, 'A'): 100.0,
+            ('A', 'A'): 60.0,
+        })
+        self.assertEqual(
+                gmidl_profile_report.collapsedStacks(profile),
+                [(('A',), 100.0)])
+
+    def testFormat(self):
+        self.assertEqual(
+                gmidl_profile_report.formatCollapsedStacks(
+                        gmidl_profile_report.collapsedStacks(makeProfile())),
+                'Entity_update 460\nEntity_update;Bullet_hit 40\n')
+
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testWritesFlameGraph(self):
+        profilePath = os.path.join(self.directory, 'profile.csv')
+        stacksPath = os.path.join(self.directory, 'stacks.txt')
+        with open(profilePath, 'w') as file:
+            file.write(kProfile)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(gmidl_profile_report.main(
+                    [profilePath, '--flamegraph', stacksPath]), 0)
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('script'))
+        self.assertEqual(
+                [line.split()[0] for line in lines[1:]],
+                ['Entity_update', 'Bullet_hit', 'Entity_draw'])
+        self.assertIn('50.000', lines[1])
+        with open(stacksPath) as file:
+            self.assertIn('Entity_update;Bullet_hit 40\n', file.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/local/bin/python
+
+"""A sampling profiler for the method wrappers, generated with the scripts.
+
+With GMIDL_PROFILE_TIME on, a method wrapper counts its calls in a
+preallocated array indexed by its id from gmidl_script_ids, and times 1 in
+every N of them, where N is the sampling rate that __gmidl_init_profiler is
+called with. A timed call adds its time to the script and to the edge from
+the script that called it, which is all that gmidl_profile_report needs to
+build flame graphs.
+
+__gmidl_profile_dump writes everything to a CSV file with two tables. The
+first has a row for every script that was called:
+
+    script,calls,samples,microseconds
+    Entity_update,1200,75,5400
+
+The second, after a blank line, has a row for every caller and callee, with
+an empty caller for calls from code that GMIDL did not generate:
+
+    caller,script,microseconds
+    ,Entity_update,5400
+    Entity_update,Bullet_hit,1300
+"""
+
+
+kInitScriptName = '__gmidl_init_profiler'
+kSampleScriptName = '__gmidl_profile_sample__'
+kDumpScriptName = '__gmidl_profile_dump'
+
+kCallsArrayName = 'global.__gmidl_profile_calls__'
+kSamplesArrayName = 'global.__gmidl_profile_samples__'
+kTimeArrayName = 'global.__gmidl_profile_time__'
+kNamesArrayName = 'global.__gmidl_profile_names__'
+kEdgesMapName = 'global.__gmidl_profile_edges__'
+kCurrentScriptName = 'global.__gmidl_profile_current__'
+kRateName = 'global.__gmidl_profile_rate__'
+
+kScriptsHeader = 'script,calls,samples,microseconds'
+kEdgesHeader = 'caller,script,microseconds'
+
@@ -0,0 +1,66 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_flags
+import gmidl_profiler
+import gmidl_wrappers
+import test_util
+
+
+class ProfilerScriptsTest(test_util.BaseTest):
+
+    def testInitializerPreallocatesArrays(self):
+        (self.expectations.expect(gmidl_wrappers.writeProfilerInitializer(
+                ['Entity_update', 'Bullet_hit']))
+            .shouldContain(
+                    "global.__gmidl_profile_names__"
+                    "[__gmidl_script_ids.Bullet_hit] = 'Bullet_hit';\n"
+                    "global.__gmidl_profile_names__"
+                    "[__gmidl_script_ids.Entity_update] = 'Entity_update';\n")
+            .shouldContain('for (i = __gmidl_script_ids.__count - 1; '
+                    'i >= 0; i -= 1) {\n'
+                    '    global.__gmidl_profile_calls__[i] = 0;\n')
+            .shouldContain('global.__gmidl_profile_rate__ = '
+                    'max(1, argument0);\n'))
+
+    def testSamplerRecordsEdge(self):
+        (self.expectations.expect(gmidl_wrappers.writeProfileSampler())
+            .shouldContain('var edge = (argument1 + 1) * '
+                    '__gmidl_script_ids.__count + script;\n')
+            .shouldContain('global.__gmidl_profile_time__[script] += '
+                    'microseconds;\n'))
+
+    def testDumpWritesBothTables(self):
+        (self.expectations.expect(gmidl_wrappers.writeProfileDump())
+            .shouldContain("'%s'" % gmidl_profiler.kScriptsHeader)
+            .shouldContain("'%s'" % gmidl_profiler.kEdgesHeader)
+            .shouldContain('file_text_close(file);\n'))
+
+    def testWrapperSamplesCalls(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo'],
+                flags=gmidl_flags.kProfileProfile))
+            .shouldContain(
+                    'global.__gmidl_profile_current__ = '
+                    '__gmidl_script_ids.Foo_baz;\n')
+            .shouldContain(
+                    'if (global.__gmidl_profile_calls__'
+                    '[__gmidl_script_ids.Foo_baz] mod '
+                    'global.__gmidl_profile_rate__ == 0) {\n'
+                    '    profileStart = get_timer();\n'
+                    '}\n')
+            .shouldContain(
+                    '// Record the time of a sampled call.\n'
+                    'global.__gmidl_profile_current__ = profileCaller;\n'))
+
+    def testRuntimeProfileGuardsProfiling(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo']))
+            .shouldContain('if (GMIDL_PROFILE_TIME) {\n'
+                    '    // Count the call, and time it if it is sampled.\n'
+                    '    var profileCaller = '))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/local/bin/python
+
+"""Property slots, laid out at generation time.
+
+An instance stores its properties in slots that are numbered from 1, since
+slot 0 holds the GMIDL token. A class starts with the slots of its parent,
+so a property has the same slot in every class that inherits it, and appends
+a slot for every property of its own. The slot after the last property holds
+the type of the instance.
+
+The slots of every class are declared as a GML enum, which compiles to
+integer literals, in one generated script, __gmidl_property_slots:
+
+    enum __Bullet_properties {
+        x = 1,
+        y = 2,
+        speed = 3,
+        __size = 4
+    }
+
+Accessors then index instances with __Bullet_properties.speed.
+
+The layout also records which properties are declared by a class with the
+lazy attribute, so that subclasses create and free them lazily too.
+
+A class with the dirty attribute lays out one more slot, __dirty, before its
+own properties, unless it inherits one. The layout records which properties
+are declared by a class with that slot, and so have a dirty bit; see
+gmidl_dirty.
+"""
+
+
+kSlotsScriptName = '__gmidl_property_slots'
+kSizeName = '__size'
+kDirtySlotName = '__dirty'
+# Slots that the generator lays out itself, which are not user properties.
+kInternalNames = [kSizeName, kDirtySlotName]
+# Slot 0 of every instance holds the GMIDL token.
+kFirstSlot = 1
+# Reals only hold integers exactly up to 2 ** 53.
+kMaxDirtyBits = 53
+
+
+class PropertyLayoutError(ValueError):
+    pass
+
+
+def enumName(className):
+    return '__%s_properties' % className
+
+
+def propertyIndex(className, propertyName):
+    return '%s.%s' % (enumName(className), propertyName)
+
+
+def sizeIndex(className):
+    return propertyIndex(className, kSizeName)
+
+
+# Maps every property in names to its dirty bit, given the (propertyName,
+# propertyType) of every property of a class, in slot order.
+def dirtyBits(properties, names):
+    return dict(
+            (name, 1 << index)
+            for index, (name, propertyType) in enumerate(properties)
+            if name in names)
+
+
+class PropertyLayout(object):
+
+    def __init__(self, properties=None, lazyProperties=None,
+            trackedProperties=None):
+        # Maps the name of every class to the (propertyName, propertyType)
+        # of every property it has, including inherited ones, in slot order.
+        self.properties = dict(properties) if properties else {}
+        # Maps the name of every class to the set of names of its properties
+        # that are declared by a class with the lazy attribute.
+        self.lazyProperties = dict(lazyProperties) if lazyProperties else {}
+        # Maps the name of every class to the set of names of its properties
+        # that are declared by a class with a dirty slot.
+        self.trackedProperties = (
+                dict(trackedProperties) if trackedProperties else {})
+
+    def slotIndex(self, className, propertyName):
+        for index, (name, propertyType) in enumerate(
+                self.properties[className]):
+            if name == propertyName:
+                return kFirstSlot + index
+        raise KeyError('%s has no property %s' % (className, propertyName))
+
+    def size(self, className):
+        return kFirstSlot + len(self.properties[className])
+
+    def lazyNames(self, className):
+        return sorted(self.lazyProperties.get(className, ()))
+
+    def dirtyBits(self, className):
+        return dirtyBits(
+                self.properties[className],
+                self.trackedProperties.get(className, ()))
+
+    def classJson(self, className):
+        return [list(prop) for prop in self.properties[className]]
+
+    def toJson(self):
+        return dict(
+                (className, self.classJson(className))
+                for className in sorted(self.properties))
+
+
+# The class hierarchy must be valid; see gmidl_vtables.buildVtableLayout().
+def buildPropertyLayout(classDefinitions):
+    classes = dict(
+            (classDefinition.name, classDefinition)
+            for classDefinition in classDefinitions)
+    layout = PropertyLayout()
+    for className in classes:
+        # Lays out the ancestors of the class first, without recursion.
+        chain = []
+        while className is not None and className not in layout.properties:
+            chain.append(className)
+            className = classes[className].parentName
+        for className in reversed(chain):
+            classDefinition = classes[className]
+            parentName = classDefinition.parentName
+            properties = list(
+                    layout.properties[parentName] if parentName else [])
+            lazyProperties = set(
+                    layout.lazyProperties.get(parentName, ()))
+            trackedProperties = set(
+                    layout.trackedProperties.get(parentName, ()))
+            names = set(name for name, propertyType in properties)
+            if classDefinition.dirty and kDirtySlotName not in names:
+                names.add(kDirtySlotName)
+                properties.append((kDirtySlotName, 'real'))
+            for name, propertyType in classDefinition.properties:
+                if name in names or name in kInternalNames:
+                    raise PropertyLayoutError(
+                            '%s cannot redefine property %s' % (
+                                    className, name))
+                names.add(name)
+                properties.append((name, propertyType))
+                if classDefinition.lazy:
+                    lazyProperties.add(name)
+                if kDirtySlotName in names:
+                    if len(properties) > kMaxDirtyBits:
+                        raise PropertyLayoutError(
+                                '%s has more than %d properties, so it '
+                                'cannot track changes to %s' % (
+                                        className, kMaxDirtyBits, name))
+                    trackedProperties.add(name)
+            layout.properties[className] = properties
+            if lazyProperties:
+                layout.lazyProperties[className] = lazyProperties
+            if trackedProperties:
+                layout.trackedProperties[className] = trackedProperties
+    return layout
@@ -0,0 +1,117 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_classes
+import gmidl_properties
+import gmidl_wrappers
+import test_util
+
+
+def makeClasses():
+    return [
+        gmidl_classes.ClassDefinition(
+                'Bullet', 'Entity', [('speed', 'real')]),
+        gmidl_classes.ClassDefinition(
+                'Entity', None, [('x', 'real'), ('y', 'real')]),
+        gmidl_classes.ClassDefinition(
+                'Player', 'Entity', [('name', 'string')]),
+    ]
+
+
+class BuildPropertyLayoutTest(test_util.BaseTest):
+
+    def testInheritedPropertiesKeepTheirSlots(self):
+        layout = gmidl_properties.buildPropertyLayout(makeClasses())
+        self.assertEqual(layout.properties['Bullet'],
+                [('x', 'real'), ('y', 'real'), ('speed', 'real')])
+        for className in ['Entity', 'Bullet', 'Player']:
+            self.assertEqual(layout.slotIndex(className, 'x'), 1)
+            self.assertEqual(layout.slotIndex(className, 'y'), 2)
+        self.assertEqual(layout.slotIndex('Bullet', 'speed'), 3)
+        self.assertEqual(layout.slotIndex('Player', 'name'), 3)
+        self.assertEqual(layout.size('Entity'), 3)
+        self.assertEqual(layout.size('Bullet'), 4)
+
+    def testRedefinedProperty(self):
+        classes = makeClasses()
+        classes[0].properties.append(('x', 'real'))
+        with self.assertRaises(gmidl_properties.PropertyLayoutError):
+            gmidl_properties.buildPropertyLayout(classes)
+
+    def testLazyPropertiesAreInherited(self):
+        classes = makeClasses()
+        classes[1].attributes['lazy'] = True
+        layout = gmidl_properties.buildPropertyLayout(classes)
+        self.assertEqual(layout.lazyNames('Entity'), ['x', 'y'])
+        self.assertEqual(layout.lazyNames('Bullet'), ['x', 'y'])
+        classes = makeClasses()
+        classes[0].attributes['lazy'] = True
+        layout = gmidl_properties.buildPropertyLayout(classes)
+        self.assertEqual(layout.lazyNames('Bullet'), ['speed'])
+        self.assertEqual(layout.lazyNames('Entity'), [])
+
+    def testDirtySlotIsInherited(self):
+        classes = makeClasses()
+        classes[1].attributes['dirty'] = True
+        layout = gmidl_properties.buildPropertyLayout(classes)
+        self.assertEqual(layout.properties['Bullet'],
+                [('__dirty', 'real'), ('x', 'real'), ('y', 'real'),
+                    ('speed', 'real')])
+        self.assertEqual(layout.dirtyBits('Entity'), {'x': 2, 'y': 4})
+        self.assertEqual(layout.dirtyBits('Bullet'),
+                {'x': 2, 'y': 4, 'speed': 8})
+
+    def testDirtySubclassOnlyTracksItsOwnProperties(self):
+        classes = makeClasses()
+        classes[0].attributes['dirty'] = True
+        layout = gmidl_properties.buildPropertyLayout(classes)
+        self.assertEqual(layout.slotIndex('Bullet', '__dirty'), 3)
+        self.assertEqual(layout.dirtyBits('Bullet'), {'speed': 8})
+        self.assertEqual(layout.dirtyBits('Entity'), {})
+        self.assertEqual(layout.size('Player'), 4)
+
+    def testTooManyDirtyBits(self):
+        classes = [gmidl_classes.ClassDefinition(
+                'Foo', None,
+                [('value%d' % i, 'real') for i in range(53)],
+                attributes={'dirty': True})]
+        with self.assertRaises(gmidl_properties.PropertyLayoutError):
+            gmidl_properties.buildPropertyLayout(classes)
+        classes[0].properties.pop()
+        layout = gmidl_properties.buildPropertyLayout(classes)
+        self.assertEqual(layout.dirtyBits('Foo')['value51'], 1 << 52)
+
+    def testReservedNames(self):
+        for name in ['__size', '__dirty']:
+            classes = makeClasses()
+            classes[0].properties.append((name, 'real'))
+            with self.assertRaises(gmidl_properties.PropertyLayoutError):
+                gmidl_properties.buildPropertyLayout(classes)
+
+    def testDeepHierarchy(self):
+        classes = [gmidl_classes.ClassDefinition('Class0')] + [
+            gmidl_classes.ClassDefinition(
+                    'Class%d' % i, 'Class%d' % (i - 1),
+                    [('value%d' % i, 'real')])
+            for i in range(1, 3000)
+        ]
+        layout = gmidl_properties.buildPropertyLayout(reversed(classes))
+        self.assertEqual(layout.slotIndex('Class2999', 'value1'), 1)
+        self.assertEqual(layout.size('Class2999'), 3000)
+
+    def testPropertySlots(self):
+        (self.expectations.expect(gmidl_wrappers.writePropertySlots(
+                gmidl_properties.buildPropertyLayout(makeClasses())))
+            .shouldContain('///__gmidl_property_slots()\n')
+            .shouldContain(
+                    'enum __Bullet_properties {\n'
+                    '    x = 1,\n'
+                    '    y = 2,\n'
+                    '    speed = 3,\n'
+                    '    __size = 4\n'
+                    '}\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
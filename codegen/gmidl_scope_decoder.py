@@ -0,0 +1,72 @@
+#!/usr/local/bin/python
+
+"""Decodes a scope dump written by __gmidl_scope_dump into script names.
+
+The dump only has the ids of the scripts on the stack. They are looked up in
+the generated __gmidl_declare_script_ids script, which must come from the
+same build as the game that wrote the dump, since adding a method renumbers
+the ids. The stack is printed innermost first:
+
+    #0 Bullet_hit
+    #1 Entity_update
+
+To run:
+
+  python gmidl_scope_decoder.py scopes.txt \\
+      --symbols scripts/__gmidl_declare_script_ids.gml
+"""
+
+import argparse
+import sys
+
+import gmidl_scopes
+import gmidl_script_ids
+
+
+class ScopeDumpFormatError(ValueError):
+    pass
+
+
+# Returns the lines of the decoded stack. Ids that are not in the symbol
+# table are printed as they are, so a stale symbol table is easy to spot.
+def decodeScopeDump(lines, symbols):
+    lines = [line.strip() for line in lines if line.strip()]
+    if not lines or not lines[0].startswith(gmidl_scopes.kDepthPrefix):
+        raise ScopeDumpFormatError(
+                'Expected %r' % gmidl_scopes.kDepthPrefix)
+    try:
+        depth = int(lines[0][len(gmidl_scopes.kDepthPrefix):])
+        ids = [int(line) for line in lines[1:]]
+    except ValueError:
+        raise ScopeDumpFormatError('Bad scope dump: %r' % lines)
+    decoded = [
+        '#%d %s' % (i, symbols.get(scriptId, '<unknown id %d>' % scriptId))
+        for i, scriptId in enumerate(ids)
+    ]
+    if depth > len(ids):
+        decoded.append('... %d outer scopes were overwritten' % (
+                depth - len(ids)))
+    return decoded
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+            description='Decodes a GMIDL scope dump.')
+    parser.add_argument('dump',
+            help='text file written by %s' % gmidl_scopes.kDumpScriptName)
+    parser.add_argument('--symbols', required=True,
+            help='the generated %s.gml' % gmidl_script_ids.kScriptName)
+    args = parser.parse_args(argv)
+    symbols = gmidl_script_ids.loadSymbolTable(args.symbols)
+    try:
+        with open(args.dump) as file:
+            decoded = decodeScopeDump(file, symbols)
+    except ScopeDumpFormatError as error:
+        sys.stderr.write('error: %s\n' % error)
+        return 1
+    print('\n'.join(decoded))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
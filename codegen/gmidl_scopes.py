@@ -0,0 +1,46 @@
+#!/usr/local/bin/python
+
+"""Scope tracking in a fixed-size ring buffer of script ids.
+
+With GMIDL_TRACK_SCOPE on, a method wrapper pushes its id from
+gmidl_script_ids onto a ring buffer when it starts and pops it when it
+returns. A push is one array write and a pop is one subtraction:
+
+    global.__gmidl_scope_stack__[global.__gmidl_scope_depth__ & 255] =
+            __gmidl_script_ids.Bullet_hit;
+    global.__gmidl_scope_depth__ += 1;
+
+The buffer keeps the innermost kCapacity scripts of the stack; deeper ones
+are overwritten. The arguments of every call are only captured, into a ring
+buffer of argument arrays next to the ids, if __gmidl_init_scopes was told
+to capture them. Then a pop also clears the arguments of its slot, so that
+they are not kept alive until the slot is pushed again.
+
+__gmidl_scope_dump writes the depth and then the ids on the stack,
+innermost first, to a text file:
+
+    depth,2
+    1
+    0
+
+gmidl_scope_decoder turns a dump back into script names, using the
+generated __gmidl_declare_script_ids script as its symbol table.
+"""
+
+
+kInitScriptName = '__gmidl_init_scopes'
+kDumpScriptName = '__gmidl_scope_dump'
+
+# Must be a power of two, so that the index into the buffer is a mask.
+kCapacity = 256
+
+kStackArrayName = 'global.__gmidl_scope_stack__'
+kArgumentsArrayName = 'global.__gmidl_scope_arguments__'
+kDepthName = 'global.__gmidl_scope_depth__'
+kCaptureName = 'global.__gmidl_scope_capture__'
+
+kDepthPrefix = 'depth,'
+
+
+def slotIndex():
+    return '%s & %d' % (kDepthName, kCapacity - 1)
@@ -0,0 +1,106 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_flags
+import gmidl_scope_decoder
+import gmidl_wrappers
+import test_util
+
+
+kSymbols = {0: 'Entity_update', 1: 'Bullet_hit'}
+
+
+class ScopeScriptsTest(test_util.BaseTest):
+
+    def testInitializerPreallocatesRingBuffers(self):
+        (self.expectations.expect(gmidl_wrappers.writeScopeInitializer())
+            .shouldContain('global.__gmidl_scope_depth__ = 0;\n'
+                    'global.__gmidl_scope_capture__ = argument0;\n')
+            .shouldContain('for (i = 256 - 1; i >= 0; i -= 1) {\n'
+                    '    global.__gmidl_scope_stack__[i] = -1;\n'
+                    '    global.__gmidl_scope_arguments__[i] = 0;\n'))
+
+    def testDumpWritesInnermostFirst(self):
+        (self.expectations.expect(gmidl_wrappers.writeScopeDump())
+            .shouldContain("'depth,' + string(global.__gmidl_scope_depth__)")
+            .shouldContain('for (i = global.__gmidl_scope_depth__ - 1; '
+                    'i >= max(0, global.__gmidl_scope_depth__ - 256); '
+                    'i -= 1) {\n')
+            .shouldContain('global.__gmidl_scope_stack__[i & 255]'))
+
+    def testWrapperOnlyCapturesArgumentsWhenAsked(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo'], virtual=False,
+                flags=gmidl_flags.kDebugProfile))
+            .shouldContain(
+                    'var scopeSlot = global.__gmidl_scope_depth__ & 255;\n'
+                    'global.__gmidl_scope_stack__[scopeSlot] = '
+                    '__gmidl_script_ids.Foo_baz;\n'
+                    'global.__gmidl_scope_depth__ += 1;\n'
+                    'if (global.__gmidl_scope_capture__) {\n')
+            .shouldNotContain('__push_scope__'))
+
+    def testRuntimeProfileGuardsScopeTracking(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo']))
+            .shouldContain('if (GMIDL_TRACK_SCOPE) {\n'
+                    '    // Push the script onto the scope ring buffer.\n'
+                    '    var scopeSlot = ')
+            .shouldContain('if (GMIDL_TRACK_SCOPE) {\n'
+                    '    global.__gmidl_scope_depth__ -= 1;\n'
+                    '    if (global.__gmidl_scope_capture__) {\n'))
+
+    def testPopClearsCapturedArguments(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo'], virtual=False,
+                flags=gmidl_flags.kDebugProfile))
+            .shouldContain(
+                    'global.__gmidl_scope_depth__ -= 1;\n'
+                    'if (global.__gmidl_scope_capture__) {\n'
+                    '    // Let go of the arguments, rather than holding '
+                        'them until the slot\n'
+                    '    // is pushed again.\n'
+                    '    global.__gmidl_scope_arguments__['
+                        'global.__gmidl_scope_depth__ & 255] = 0;\n'
+                    '}\n'))
+
+
+class DecodeScopeDumpTest(unittest.TestCase):
+
+    def testDecodesInnermostFirst(self):
+        self.assertEqual(
+                gmidl_scope_decoder.decodeScopeDump(
+                        ['depth,2\n', '1\n', '0\n'], kSymbols),
+                ['#0 Bullet_hit', '#1 Entity_update'])
+
+    def testEmptyStack(self):
+        self.assertEqual(
+                gmidl_scope_decoder.decodeScopeDump(['depth,0\n'], kSymbols),
+                [])
+
+    def testNotesOverwrittenScopes(self):
+        self.assertEqual(
+                gmidl_scope_decoder.decodeScopeDump(
+                        ['depth,300', '1', '0'], kSymbols),
+                ['#0 Bullet_hit', '#1 Entity_update',
+                    '... 298 outer scopes were overwritten'])
+
+    def testUnknownId(self):
+        self.assertEqual(
+                gmidl_scope_decoder.decodeScopeDump(
+                        ['depth,1', '7'], kSymbols),
+                ['#0 <unknown id 7>'])
+
+    def testMissingDepth(self):
+        with self.assertRaises(gmidl_scope_decoder.ScopeDumpFormatError):
+            gmidl_scope_decoder.decodeScopeDump(['1', '0'], kSymbols)
+
+    def testBadId(self):
+        with self.assertRaises(gmidl_scope_decoder.ScopeDumpFormatError):
+            gmidl_scope_decoder.decodeScopeDump(
+                    ['depth,1', 'Bullet_hit'], kSymbols)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,32 @@
 #!/usr/local/bin/python
 
+import re
+import textwrap
+
+import gmidl_ancestry
+import gmidl_columns
+import gmidl_profiler
+import gmidl_properties
+import gmidl_scopes
+import gmidl_script_ids
+import gmidl_vtables
+
 
 kDoNotEditNotice = '// This is a wrapper script created by GMIDL. DO NOT EDIT.'
-kImplScriptNotice = """
+kImplScriptNotice = ("""
 // The above was generated by GMIDL. Put your code beneath this line."""
-        .lstrip('\n')
+        .lstrip('\n'))
+kGmidlToken = 'GMIDL_TOKEN'
+# GameMaker scripts take at most 16 arguments. Implementation scripts with
+# more are passed an argument array instead.
+kMaxDirectArguments = 16
 
 def writeScriptPrototype(scriptName, argNames=None, argTypes=None,
         returnType=None):
     if not argNames:
         argNames = []
     if not argTypes:
-        argTypes = []
+        argTypes = [''] * len(argNames)
     assert len(argNames) == len(argTypes)
     return '///%(scriptName)s(%(args)s%(returnClause)s)' % {
         'scriptName': scriptName,
@@ -39,7 +54,224 @@ def writeScriptHeader(scriptName,
     return _scriptHeaderTemplate % result
 
 
-def writeImplCall(scriptName, argv='argv', virtual=True):
+# Code that is substituted into a template one level deep, like the body of
+# an if block, has every line but the first indented by four spaces. This
+# returns such code without the indentation.
+def _dedentBlock(code):
+    return textwrap.dedent('    ' + code)
+
+
+# The opposite of _dedentBlock: indents every line but the first by four
+# spaces, so that code can be substituted one level deeper.
+def indentBlock(code):
+    return '\n'.join(
+            ('    ' + line if line and i else line)
+            for i, line in enumerate(code.split('\n')))
+
+
+# Removes the blank lines left behind by branches that were specialized away.
+def collapseBlankLines(text):
+    return re.sub(r'\n{3,}', '\n\n', text)
+
+
+# Guards body with a check of the flag named flagName. If the value of the
+# flag is known at build time, the check is left out, and so is body if the
+# flag is off.
+def writeFlagGuard(flagName, value, body):
+    if value is None:
+        return 'if (%s) {\n    %s\n}' % (flagName, body)
+    return _dedentBlock(body) if value else ''
+
+
+_profileStartTemplate = """
+// Count the call, and time it if it is sampled.
+    var profileCaller = %(current)s;
+    %(current)s = %(id)s;
+    %(calls)s[%(id)s] += 1;
+    var profileStart = -1;
+    if (%(calls)s[%(id)s] mod %(rate)s == 0) {
+        profileStart = get_timer();
+    }""".lstrip('\n')
+# Returns the body of the GMIDL_PROFILE_TIME guard at the start of a
+# wrapper; see gmidl_profiler.
+def writeProfileStart(scriptName):
+    return _profileStartTemplate % {
+        'current': gmidl_profiler.kCurrentScriptName,
+        'calls': gmidl_profiler.kCallsArrayName,
+        'rate': gmidl_profiler.kRateName,
+        'id': gmidl_script_ids.scriptId(scriptName),
+    }
+
+
+_profileStopTemplate = """
+// Record the time of a sampled call.
+    %(current)s = profileCaller;
+    if (profileStart >= 0) {
+        %(sample)s(%(id)s, profileCaller, get_timer() - profileStart);
+    }""".lstrip('\n')
+def writeProfileStop(scriptName):
+    return _profileStopTemplate % {
+        'current': gmidl_profiler.kCurrentScriptName,
+        'sample': gmidl_profiler.kSampleScriptName,
+        'id': gmidl_script_ids.scriptId(scriptName),
+    }
+
+
+_scopePushTemplate = """
+// Push the script onto the scope ring buffer.
+    var scopeSlot = %(slot)s;
+    %(stack)s[scopeSlot] = %(id)s;
+    %(depth)s += 1;
+    if (%(capture)s) {
+        %(argumentDeclarations)s%(arguments)s[scopeSlot] = %(argv)s;
+    }""".lstrip('\n')
+# Returns the body of the GMIDL_TRACK_SCOPE guard at the start of a wrapper;
+# see gmidl_scopes. argumentDeclarations build the argument array to capture,
+# unless the wrapper already has one.
+def writeScopePush(scriptName, argv='argv', argumentDeclarations=''):
+    return _scopePushTemplate % {
+        'slot': gmidl_scopes.slotIndex(),
+        'stack': gmidl_scopes.kStackArrayName,
+        'depth': gmidl_scopes.kDepthName,
+        'capture': gmidl_scopes.kCaptureName,
+        'arguments': gmidl_scopes.kArgumentsArrayName,
+        'argumentDeclarations': argumentDeclarations.replace(
+                '\n', '\n        '),
+        'argv': argv,
+        'id': gmidl_script_ids.scriptId(scriptName),
+    }
+
+
+_scopePopTemplate = """
+%(depth)s -= 1;
+    if (%(capture)s) {
+        // Let go of the arguments, rather than holding them until the slot
+        // is pushed again.
+        %(arguments)s[%(slot)s] = 0;
+    }""".lstrip('\n')
+def writeScopePop():
+    return _scopePopTemplate % {
+        'slot': gmidl_scopes.slotIndex(),
+        'depth': gmidl_scopes.kDepthName,
+        'capture': gmidl_scopes.kCaptureName,
+        'arguments': gmidl_scopes.kArgumentsArrayName,
+    }
+
+
+# The in-place mutators of every collection type, with the statement that
+# applies each one to items, the collection. Mutators take the instance
+# first, then the index or key and the value for setAt, and the value for
+# push.
+_dsMutations = {
+    'ds_list': [
+        ('setAt', 'ds_list_replace(items, argument1, argument2);'),
+        ('push', 'ds_list_add(items, argument1);'),
+        ('clear', 'ds_list_clear(items);'),
+    ],
+    'ds_map': [
+        ('setAt', 'ds_map_replace(items, argument1, argument2);'),
+        ('clear', 'ds_map_clear(items);'),
+    ],
+    'ds_stack': [
+        ('push', 'ds_stack_push(items, argument1);'),
+        ('clear', 'ds_stack_clear(items);'),
+    ],
+    'ds_queue': [
+        ('push', 'ds_queue_enqueue(items, argument1);'),
+        ('clear', 'ds_queue_clear(items);'),
+    ],
+}
+_arrayMutators = ['setAt', 'push', 'clear']
+def mutatorNames(propertyType):
+    if propertyType == 'array':
+        return list(_arrayMutators)
+    return [name for name, mutation in _dsMutations.get(propertyType, [])]
+
+
+_arrayWriteTemplate = """
+if (is_array(items)) {
+    items[@%(index)s] = %(value)s;
+} else {
+    // The property still holds its default value, so start a new array.
+    items[%(firstIndex)s] = %(value)s;
+    %(store)s
+}""".lstrip('\n')
+# Returns the statements that apply a mutator to items, the collection read
+# from the property. The @ accessor writes into the array itself, so it is
+# not copied. writeStore returns the statement that stores a value into the
+# property, for array properties that still hold their default value, and
+# for clearing an array property, which does not need items.
+def writeMutation(propertyType, mutatorName, writeStore):
+    if propertyType != 'array':
+        return dict(_dsMutations[propertyType])[mutatorName]
+    if mutatorName == 'clear':
+        return writeStore(_writeDefaultPropertyValue(propertyType))
+    return _arrayWriteTemplate % {
+        'index': {
+            'setAt': 'argument1',
+            'push': 'array_length_1d(items)',
+        }[mutatorName],
+        'firstIndex': 'argument1' if mutatorName == 'setAt' else '0',
+        'value': 'argument2' if mutatorName == 'setAt' else 'argument1',
+        'store': indentBlock(writeStore('items')),
+    }
+
+
+def mutationReadsItems(propertyType, mutatorName):
+    return not (propertyType == 'array' and mutatorName == 'clear')
+
+
+_mutatorArguments = {
+    'setAt': (['index', 'value'], ['real', 'any']),
+    'push': (['value'], ['any']),
+    'clear': ([], []),
+}
+_mutatorDescriptions = {
+    'setAt': 'Sets the element at index of %s of a %s, in place.',
+    'push': 'Adds value to %s of a %s, in place.',
+    'clear': 'Empties %s of a %s, in place.',
+}
+# Returns the names and types of the arguments of a mutator, after the
+# instance, and its description.
+def describeMutator(className, propertyName, propertyType, mutatorName):
+    argNames, argTypes = _mutatorArguments[mutatorName]
+    description = _mutatorDescriptions[mutatorName]
+    if propertyType == 'ds_map' and mutatorName == 'setAt':
+        argNames, argTypes = ['key', 'value'], ['any', 'any']
+        description = 'Sets the value of key in %s of a %s, in place.'
+    return argNames, argTypes, description % (propertyName, className)
+
+
+_classStyleSwitchTemplate = """
+if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY) {
+    %(arrayCode)s
+} else if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_DSMAP) {
+    %(dsMapCode)s
+} else {
+    NOTREACHED('GMIDL_CLASS_STYLE is an invalid value: %%d', GMIDL_CLASS_STYLE);
+}""".lstrip('\n')
+def writeClassStyleSwitch(classStyle, arrayCode, dsMapCode):
+    if classStyle is None:
+        return _classStyleSwitchTemplate % {
+            'arrayCode': arrayCode,
+            'dsMapCode': dsMapCode,
+        }
+    return _dedentBlock({
+        'GMIDL_CLASS_STYLE_ARRAY': arrayCode,
+        'GMIDL_CLASS_STYLE_DSMAP': dsMapCode,
+    }[classStyle])
+
+
+# A virtual call with a vtableSlot reads the implementation script from the
+# vtable of the type of argument0; without one, it is looked up at runtime.
+def writeImplCall(scriptName, argv='argv', virtual=True, vtableSlot=None):
+    if virtual and vtableSlot is not None:
+        return 'script_execute(%(vtable)s[%(type)s, %(slot)d], %(argv)s)' % {
+            'vtable': gmidl_vtables.kVtableArrayName,
+            'type': '__type__(argument0)',
+            'slot': vtableSlot,
+            'argv': argv
+        }
     if virtual:
         return 'script_execute(__type_lookupMethod__(%(type)s), %(argv)s)' % {
             'type': '__type__(argument0)',
@@ -52,27 +284,115 @@ def writeImplCall(scriptName, argv='argv', virtual=True):
         }
 
 
+# Implementation scripts take their arguments directly, as argument0,
+# argument1, ..., unless there are too many, so calling them does not
+# allocate an argument array.
+def usesDirectArguments(argCount):
+    return argCount <= kMaxDirectArguments
+
+
+def writeDirectArguments(argCount):
+    return ', '.join(['argument%d' % i for i in range(argCount)])
+
+
+# Scripts whose type checks are sampled by call count count their calls in
+# a global array indexed by their script id, which the init script fills
+# with zeros.
+kCallCountsInitScriptName = '__gmidl_init_call_counts'
+kCallCountsArrayName = 'global.__gmidl_call_counts__'
+
+
+# Returns whether a value of a type needs to be checked at all. Every value
+# is an instance of any.
+def needsTypeCheck(typeName):
+    return typeName != 'any'
+
+
+# Returns the statements that decide whether a script checks the types of
+# its arguments, and the condition under which it does: for its first
+# firstCalls calls, and then for 1 in rate calls at random. The count stops
+# at firstCalls, so later calls only read it. Returns None if every call is
+# checked.
+def writeSampleCondition(scriptName, firstCalls=None, rate=None):
+    randomCondition = (
+            'irandom(%d) == 0' % (rate - 1) if rate is not None else None)
+    if firstCalls is None:
+        return ([], randomCondition) if randomCondition else None
+    count = '%s[%s]' % (
+            kCallCountsArrayName, gmidl_script_ids.scriptId(scriptName))
+    statements = [
+        'var checkTypes = %s < %d;' % (count, firstCalls),
+        'if (checkTypes) {',
+        '    %s += 1;' % count,
+    ]
+    if randomCondition:
+        statements += [
+            '} else {',
+            '    checkTypes = %s;' % randomCondition,
+        ]
+    return statements + ['}'], 'checkTypes'
+
+
+# Guards typeChecks, a list of statements, with GMIDL_ENFORCE_TYPES and the
+# sample condition from writeSampleCondition().
+def writeTypeCheckGuard(typeChecks, enforceTypes=None, sampleCondition=None):
+    if not typeChecks:
+        return ''
+    if sampleCondition:
+        statements, condition = sampleCondition
+        typeChecks = (statements + ['if (%s) {' % condition]
+                + ['    ' + typeCheck for typeCheck in typeChecks]
+                + ['}'])
+    return writeFlagGuard(
+            'GMIDL_ENFORCE_TYPES', enforceTypes, '\n    '.join(typeChecks))
+
+
+# Types in checkedTypes have a generated check script, which is called
+# instead of __check_instanceof__.
+def writeTypeCheck(value, typeName, checkedTypes=None):
+    if checkedTypes and typeName in checkedTypes:
+        return '%s(%s);' % (gmidl_ancestry.checkScriptName(typeName), value)
+    return '__check_instanceof__(%s, %s);' % (value, typeName)
+
+
+# Checks the types of arguments that are passed to the implementation script
+# directly.
+def writeArgumentTypeChecks(argTypes, enforceTypes=None, checkedTypes=None,
+        sampleCondition=None):
+    if not len(argTypes):
+        return '// No arguments.\n'
+    return writeTypeCheckGuard([
+        writeTypeCheck('argument%d' % i, argType, checkedTypes)
+        for i, argType in enumerate(argTypes)
+        if needsTypeCheck(argType)
+    ], enforceTypes, sampleCondition)
+
+
 _varDeclarationsNonemptyStart = """
 // Declare arguments.
 var %(argv)s;
 // Fill the argument array in reverse order to avoid resizing the array.
 """.lstrip('\n')
-_varDeclarationsEmpty = '// No arguments.\n'
-_varDeclarationTemplate = """
-%(argv)s[%(i)d] = argument[%(i)d];
-__check_instanceof__(%(argv)s[%(i)d], %(type)s);
-""".lstrip('\n')
-def writeVariableDeclarations(argv, argTypes):
-    result = ''
-    if len(argTypes):
-        return (_varDeclarationsNonemptyStart % {'argv': argv}
-                + '\n'.join([_varDeclarationTemplate % {
-                    'argv': argv,
-                    'i': arrayIndex,
-                    'type': argType,
-                } for argType, arrayIndex in reverse(enumerate(argTypes))]))
-    else:
-        return _varDeclarationsEmpty
+_varDeclarationsEmpty = '// No arguments.\nvar %(argv)s = 0;\n'
+_varDeclarationTemplate = '%(argv)s[%(i)d] = argument[%(i)d];\n'
+def writeVariableDeclarations(argv, argTypes, enforceTypes=None,
+        checkedTypes=None, sampleCondition=None):
+    if not len(argTypes):
+        return _varDeclarationsEmpty % {'argv': argv}
+    typeChecks = [
+        writeTypeCheck('%s[%d]' % (argv, arrayIndex), argType, checkedTypes)
+        for arrayIndex, argType in enumerate(argTypes)
+        if needsTypeCheck(argType)
+    ]
+    result = (_varDeclarationsNonemptyStart % {'argv': argv}
+            + ''.join([_varDeclarationTemplate % {
+                'argv': argv,
+                'i': arrayIndex,
+            } for arrayIndex, argType in reversed(list(enumerate(argTypes)))]))
+    guardedTypeChecks = writeTypeCheckGuard(
+            typeChecks, enforceTypes, sampleCondition)
+    if guardedTypeChecks:
+        result += guardedTypeChecks + '\n'
     return result
 
 
@@ -86,53 +406,342 @@ _defaultPrimitiveValues = {
     'ds_stack': 'ds_stack_create()',
     'ds_queue': 'ds_queue_create()',
 }
-def _writeDefaultPropertyValue(propertyType):
+# Properties of a class with the lazy attribute start out as kLazySentinel
+# instead of a new data structure or instance.
+kLazySentinel = 'undefined'
+def isLazyType(propertyType):
+    return isDataStructureType(propertyType) or isClassType(propertyType)
+
+
+# Properties of a class type default to a new instance of the class, which
+# the instance that holds them owns.
+def isClassType(propertyType):
+    return propertyType not in _defaultPrimitiveValues
+
+
+def _writeDefaultPropertyValue(propertyType, lazy=False):
+    if lazy and isLazyType(propertyType):
+        return kLazySentinel
     if propertyType in _defaultPrimitiveValues:
         return _defaultPrimitiveValues[propertyType]
     return '%s_create()' % propertyType
 
 
+_dsClearFunctions = {
+    'ds_list': 'ds_list_clear',
+    'ds_map': 'ds_map_clear',
+    'ds_stack': 'ds_stack_clear',
+    'ds_queue': 'ds_queue_clear',
+}
+# Returns the statement that resets a property of instance to its default
+# value. Data structures are cleared rather than created again, so that they
+# do not leak, and lazy ones only if they were created. Instances of class
+# types are destroyed, and nothing is allocated in their place: the property
+# is left undefined until the constructor takes the instance out of the pool
+# again, or, if it is lazy, until it is first read.
+def _writePropertyReset(instance, propertyIndex, propertyType, dsMap,
+        lazy=False):
+    value = ('%s[? %s]' if dsMap else '%s[%s]') % (instance, propertyIndex)
+    if propertyType in _dsClearFunctions:
+        clear = '%s(%s);' % (_dsClearFunctions[propertyType], value)
+        return _writeIfCreated(value, clear) if lazy else clear
+    if isClassType(propertyType):
+        defaultValue = kLazySentinel
+    else:
+        defaultValue = _writeDefaultPropertyValue(propertyType, lazy)
+    if dsMap:
+        reset = 'ds_map_replace(%s, %s, %s);' % (
+                instance, propertyIndex, defaultValue)
+    else:
+        reset = '%s[@%s] = %s;' % (instance, propertyIndex, defaultValue)
+    if isClassType(propertyType):
+        return _writeDestroy(value, propertyType, lazy) + '\n' + reset
+    return reset
+
+
+def _writeIfCreated(value, statement):
+    return 'if (!is_undefined(%s)) {\n    %s\n}' % (value, statement)
+
+
+_lazyReadTemplate = """
+var value = %(read)s;
+if (is_undefined(value)) {
+    value = %(default)s;
+    %(store)s
+}
+return value;""".lstrip('\n')
+# Returns the body of the getter of a lazy property, which creates its
+# default value on the first read. store is the statement that stores value
+# into the property.
+def writeLazyRead(read, store, propertyType):
+    return _lazyReadTemplate % {
+        'read': read,
+        'default': _writeDefaultPropertyValue(propertyType),
+        'store': store,
+    }
+
+
+# Returns the statements that create the instances that the properties of a
+# pooled instance default to, when the constructor takes it out of the pool.
+# Lazy properties are left to their getters.
+def writePooledChildren(className, instance, propertyNames, propertyTypes,
+        dsMap, lazyNames=()):
+    statements = []
+    for propertyName, propertyType in zip(propertyNames, propertyTypes):
+        if not isClassType(propertyType) or propertyName in lazyNames:
+            continue
+        propertyIndex = gmidl_properties.propertyIndex(
+                className, propertyName)
+        value = _writeDefaultPropertyValue(propertyType)
+        if dsMap:
+            statements.append('ds_map_replace(%s, %s, %s);' % (
+                    instance, propertyIndex, value))
+        else:
+            statements.append('%s[@%s] = %s;' % (
+                    instance, propertyIndex, value))
+    return indentBlock('\n'.join(statements))
+
+
+def writeArrayReset(className, instance, propertyNames, propertyTypes,
+        lazyNames=()):
+    return indentBlock('\n'.join([
+        _writePropertyReset(
+                instance,
+                gmidl_properties.propertyIndex(className, propertyName),
+                propertyType,
+                dsMap=False,
+                lazy=propertyName in lazyNames)
+        for propertyName, propertyType in zip(propertyNames, propertyTypes)
+    ])) or '// No properties.'
+
+
+def writeDsMapReset(className, instance, propertyNames, propertyTypes,
+        lazyNames=()):
+    return indentBlock('\n'.join([
+        _writePropertyReset(
+                instance,
+                gmidl_properties.propertyIndex(className, propertyName),
+                propertyType,
+                dsMap=True,
+                lazy=propertyName in lazyNames)
+        for propertyName, propertyType in zip(propertyNames, propertyTypes)
+    ])) or '// No properties.'
+
+
+# Instances of the ds_map class style reuse the maps of destroyed instances.
+kMapPoolName = 'global.__gmidl_map_pool__'
+
+
+_dsDestroyFunctions = {
+    'ds_list': 'ds_list_destroy',
+    'ds_map': 'ds_map_destroy',
+    'ds_stack': 'ds_stack_destroy',
+    'ds_queue': 'ds_queue_destroy',
+}
+def isDataStructureType(propertyType):
+    return propertyType in _dsDestroyFunctions
+
+
+# Returns whether an instance owns the value of a property of a type, and so
+# must free it.
+def _ownsValue(propertyType):
+    return isDataStructureType(propertyType) or isClassType(propertyType)
+
+
+# Returns the statement that frees a data structure or destroys an instance
+# of a class type, if it was created.
+def _writeDestroy(value, propertyType, lazy):
+    if isDataStructureType(propertyType):
+        destroy = '%s(%s);' % (_dsDestroyFunctions[propertyType], value)
+    else:
+        destroy = '%s_destroy(%s);' % (propertyType, value)
+    return _writeIfCreated(value, destroy) if lazy else destroy
+
+
+# Returns the statements that free the data structures and instances that an
+# instance owns, which are the ones its constructor created as default
+# values, and the lazy ones that its getters created.
+def _writeOwnedValuesCleanup(className, instance, propertyNames,
+        propertyTypes, dsMap, lazyNames):
+    return [
+        _writeDestroy(
+                ('%s[? %s]' if dsMap else '%s[%s]') % (
+                        instance,
+                        gmidl_properties.propertyIndex(
+                                className, propertyName)),
+                propertyType,
+                propertyName in lazyNames)
+        for propertyName, propertyType in zip(propertyNames, propertyTypes)
+        if _ownsValue(propertyType)
+    ]
+
+
+def writeArrayCleanup(className, instance, propertyNames, propertyTypes,
+        lazyNames=()):
+    return indentBlock('\n'.join(_writeOwnedValuesCleanup(
+            className, instance, propertyNames, propertyTypes,
+            dsMap=False, lazyNames=lazyNames))) or '// Nothing to free.'
+
+
+# The map of the instance itself is cleared and returned to the map pool.
+def writeDsMapCleanup(className, instance, propertyNames, propertyTypes,
+        lazyNames=()):
+    return indentBlock('\n'.join(_writeOwnedValuesCleanup(
+            className, instance, propertyNames, propertyTypes, dsMap=True,
+            lazyNames=lazyNames)
+        + [
+            'ds_map_clear(%s);' % instance,
+            'ds_stack_push(%s, %s);' % (kMapPoolName, instance),
+        ]))
+
+
+# Returns the statements that free the data structures and instances that a
+# struct owns. The fields named in lazyNames are only freed if they were
+# created.
+def writeStructCleanup(instance, propertyNames, propertyTypes, lazyNames=()):
+    return '\n'.join([
+        _writeDestroy(
+                '%s.%s' % (instance, propertyName), propertyType,
+                propertyName in lazyNames)
+        for propertyName, propertyType in zip(propertyNames, propertyTypes)
+        if _ownsValue(propertyType)
+    ]) or '// Nothing to free.'
+
+
+# Returns the declarations of the fields of a struct, with their default
+# values.
+def writeStructFields(propertyNames, propertyTypes):
+    return [
+        '%s = %s;' % (propertyName, _writeDefaultPropertyValue(propertyType))
+        for propertyName, propertyType in zip(propertyNames, propertyTypes)
+    ]
+
+
+def writePoolName(className):
+    return 'global.__gmidl_pool_%s__' % className
+
+
 _arrayAllocatorTemplate = """
-    var newInstance;
-    newInstance[__%(className)s_size] = %(className)s;
+    newInstance[%(sizeIndex)s] = %(className)s;
     newInstance[0] = %(gmidlToken)s;
 """.lstrip(' \n')
-def writeArrayAllocator(className, propertyNames=None, propertyTypes=None):
+def writeArrayAllocator(className, propertyNames=None, propertyTypes=None,
+        lazyNames=()):
     if not propertyNames:
         propertyNames = []
     if not propertyTypes:
         propertyTypes = []
-    return _arrayAllocatorTemplate % {
-        'className': className
-    } + '\t' + '\n\t'.join([
-        ('newInstance[__%(className)s_properties_%(propertyName)s] = '
-            + '%(value)s;') % {
-                'className': className,
-                'propertyName': propertyName,
-                'value': _writeDefaultPropertyValue(propertyType)
+    return (_arrayAllocatorTemplate % {
+        'className': className,
+        'sizeIndex': gmidl_properties.sizeIndex(className),
+        'gmidlToken': kGmidlToken,
+    } + ''.join([
+        '    newInstance[%(propertyIndex)s] = %(value)s;\n' % {
+                'propertyIndex': gmidl_properties.propertyIndex(
+                        className, propertyName),
+                'value': _writeDefaultPropertyValue(
+                        propertyType, propertyName in lazyNames)
             }
         for propertyName, propertyType in zip(propertyNames, propertyTypes)
+    ])).rstrip('\n')
+
+
+_columnAllocatorTemplate = """
+if (ds_stack_empty(%(freeList)s)) {
+    newInstance = %(count)s;
+    %(count)s += 1;
+} else {
+    newInstance = ds_stack_pop(%(freeList)s);
+}
+%(live)s[newInstance] = true;""".lstrip('\n')
+# Instances of a class with the columns attribute are handles into its
+# columns. Handles of destroyed instances are reused first.
+def writeColumnAllocator(className, propertyNames=None, propertyTypes=None,
+        lazyNames=()):
+    return '\n'.join([_columnAllocatorTemplate % {
+        'freeList': gmidl_columns.freeListName(className),
+        'count': gmidl_columns.countName(className),
+        'live': gmidl_columns.liveColumnName(className),
+    }] + [
+        '%s[newInstance] = %s;' % (
+                gmidl_columns.columnName(className, propertyName),
+                _writeDefaultPropertyValue(
+                        propertyType, propertyName in lazyNames))
+        for propertyName, propertyType in zip(
+                propertyNames or [], propertyTypes or [])
     ])
 
 
-def writeDsMapAllocator():
-    raise NotImplementedError
+def writeColumnCleanup(className, instance, propertyNames, propertyTypes,
+        lazyNames=()):
+    return '\n'.join([
+        _writeDestroy(
+                '%s[%s]' % (
+                        gmidl_columns.columnName(className, propertyName),
+                        instance),
+                propertyType,
+                propertyName in lazyNames)
+        for propertyName, propertyType in zip(propertyNames, propertyTypes)
+        if _ownsValue(propertyType)
+    ] + [
+        '%s[%s] = false;' % (
+                gmidl_columns.liveColumnName(className), instance),
+        'ds_stack_push(%s, %s);' % (
+                gmidl_columns.freeListName(className), instance),
+    ])
+
+
+# GameMaker cannot reserve space in a map ahead of time, so maps are reused
+# instead.
+_dsMapAllocatorTemplate = """
+    if (ds_stack_empty(%(mapPool)s)) {
+        newInstance = ds_map_create();
+    } else {
+        newInstance = ds_stack_pop(%(mapPool)s);
+    }
+    newInstance[? %(sizeIndex)s] = %(className)s;
+    newInstance[? 0] = %(gmidlToken)s;
+""".lstrip(' \n')
+def writeDsMapAllocator(className, propertyNames=None, propertyTypes=None,
+        lazyNames=()):
+    if not propertyNames:
+        propertyNames = []
+    if not propertyTypes:
+        propertyTypes = []
+    return (_dsMapAllocatorTemplate % {
+        'className': className,
+        'mapPool': kMapPoolName,
+        'sizeIndex': gmidl_properties.sizeIndex(className),
+        'gmidlToken': kGmidlToken,
+    } + ''.join([
+        '    newInstance[? %(propertyIndex)s] = %(value)s;\n' % {
+                'propertyIndex': gmidl_properties.propertyIndex(
+                        className, propertyName),
+                'value': _writeDefaultPropertyValue(
+                        propertyType, propertyName in lazyNames)
+            }
+        for propertyName, propertyType in zip(propertyNames, propertyTypes)
+    ])).rstrip('\n')
 
 
 _initializerArgumentsTemplate = """
 %(dependencyInjection)s
 %(argumentDeclarations)s
-"""
+""".lstrip('\n')
 def writeInitializerArguments(dependencyNames, dependencyTypes,
-        argumentNames, argumentTypes):
+        argumentNames=None, argumentTypes=None, enforceTypes=None):
     return _initializerArgumentsTemplate % {
         'dependencyInjection': '\n'.join(['']),
         'argumentDeclarations': writeVariableDeclarations(
-                argumentNames, argumentTypes)
+                'argv', argumentTypes or [], enforceTypes)
     }
 
 
 def writeImplVariableDeclarations(argNames):
+    if usesDirectArguments(len(argNames)):
+        return '\n'.join([
+            'var %s = argument%d;' % (argName, i)
+            for i, argName in enumerate(argNames)])
     return '\n'.join([
         'var %s = argument0[%d];' % (argName, i)
-        for argName, i in enumerate(argNames)])
+        for i, argName in enumerate(argNames)])
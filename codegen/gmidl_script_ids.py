@@ -0,0 +1,64 @@
+#!/usr/local/bin/python
+
+"""Integer ids for the method wrappers, assigned at generation time.
+
+The profiler and the scope tracker record which wrapper ran as a small
+integer rather than as a script. When type checks are sampled by call
+count, the setters, mutators and dirty helpers, which check types too, get
+ids after the wrappers, to index their call counts.
+
+The ids are declared as members of a GML enum, which compiles to integer
+literals, in one generated script, __gmidl_declare_script_ids:
+
+    enum __gmidl_script_ids {
+        Entity_update = 0,
+        Bullet_hit = 1,
+        __count = 2
+    }
+
+Wrappers refer to their id as __gmidl_script_ids.Entity_update, so adding a
+method renumbers the ids without changing any wrapper. The script is also
+the symbol table that the Python tools read ids back with.
+"""
+
+import re
+
+
+kScriptName = '__gmidl_declare_script_ids'
+kEnumName = '__gmidl_script_ids'
+kCountName = '__count'
+
+_memberPattern = re.compile(r'^\s*(\w+)\s*=\s*(\d+)\s*,?\s*$')
+
+
+def scriptId(scriptName):
+    return '%s.%s' % (kEnumName, scriptName)
+
+
+def countId():
+    return scriptId(kCountName)
+
+
+# Returns the names of the scripts that get ids, in the order of their ids.
+def wrappedScripts(classDefinitions):
+    return [
+        '%s_%s' % (classDefinition.name, method.name)
+        for classDefinition in classDefinitions
+        for method in classDefinition.methods
+    ]
+
+
+# Maps every id that the text of a generated __gmidl_declare_script_ids
+# declares to the name of its script.
+def parseSymbolTable(text):
+    symbols = {}
+    for line in text.splitlines():
+        match = _memberPattern.match(line)
+        if match and match.group(1) != kCountName:
+            symbols[int(match.group(2))] = match.group(1)
+    return symbols
+
+
+def loadSymbolTable(path):
+    with open(path) as file:
+        return parseSymbolTable(file.read())
@@ -0,0 +1,55 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_classes
+import gmidl_script_ids
+import gmidl_wrappers
+import test_util
+
+
+class WrappedScriptsTest(unittest.TestCase):
+
+    def testMethodWrappersInClassOrder(self):
+        self.assertEqual(gmidl_script_ids.wrappedScripts([
+            gmidl_classes.ClassDefinition('Entity', None, [('x', 'real')], [
+                gmidl_classes.MethodDefinition('update'),
+                gmidl_classes.MethodDefinition('draw'),
+            ]),
+            gmidl_classes.ClassDefinition('Bullet', 'Entity', [], [
+                gmidl_classes.MethodDefinition('hit'),
+            ]),
+        ]), ['Entity_update', 'Entity_draw', 'Bullet_hit'])
+
+
+class ScriptIdsTest(test_util.BaseTest):
+
+    def testScriptIds(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptIds(
+                ['Entity_update', 'Bullet_hit']))
+            .shouldContain(
+                    'enum __gmidl_script_ids {\n'
+                    '    Entity_update = 0,\n'
+                    '    Bullet_hit = 1,\n'
+                    '    __count = 2\n'
+                    '}\n'))
+
+
+class SymbolTableTest(unittest.TestCase):
+
+    def testParsesGeneratedScript(self):
+        self.assertEqual(
+                gmidl_script_ids.parseSymbolTable(
+                        gmidl_wrappers.writeScriptIds(
+                                ['Entity_update', 'Bullet_hit'])),
+                {0: 'Entity_update', 1: 'Bullet_hit'})
+
+    def testNoScripts(self):
+        self.assertEqual(
+                gmidl_script_ids.parseSymbolTable(
+                        gmidl_wrappers.writeScriptIds([])),
+                {})
+
+
+if __name__ == '__main__':
+    unittest.main()
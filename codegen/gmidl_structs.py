@@ -0,0 +1,234 @@
+#!/usr/local/bin/python
+
+"""Scripts for the struct class style, GMIDL_CLASS_STYLE_STRUCT.
+
+Instead of arrays or ds_maps, instances of the struct class style are native
+GameMaker structs, made by a constructor function for every class:
+
+    function Bullet() : Entity() constructor {
+        speed = 0;
+        static hit = function(target) {
+            return _IMPL_Bullet_hit(self, target);
+        };
+    }
+
+Fields are read and written with self.speed, and methods are bound in the
+constructor, so GameMaker's own field storage and method dispatch take the
+place of the property slots and vtables of the other class styles. A method
+that a subclass overrides is declared again in the constructor of the
+subclass.
+
+The scripts keep the surface of the other class styles, so code that uses
+Bullet_create(), Bullet_getspeed(), Bullet_pushhits() or Bullet_hit() does
+not change. The implementation scripts do not change either: they still take
+the instance as their first argument.
+
+Structs need GameMaker 2.3 or later, so the class style cannot be chosen at
+runtime, and the scripts check no GMIDL_* flags. Structs are garbage
+collected, so pooled classes are not pooled in this class style.
+"""
+
+import gmidl_script_components
+
+
+_kConstructorTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+function %(className)s()%(inheritance)s constructor {
+    %(body)s
+}
+""".lstrip('\n')
+# The fields are the properties of the class itself; the constructor of its
+# parent declares the rest. Every method is bound to a static function that
+# calls its implementation.
+def writeStructConstructor(className, parentName=None, propertyNames=None,
+        propertyTypes=None, methods=None):
+    body = gmidl_script_components.writeStructFields(
+            propertyNames or [], propertyTypes or [])
+    for method in methods or []:
+        body.append(_writeBoundMethod(className, method.name,
+                method.argNames))
+    return _kConstructorTemplate % {
+        'className': className,
+        'inheritance': ' : %s()' % parentName if parentName else '',
+        'prototype': gmidl_script_components.writeScriptPrototype(className),
+        'header': gmidl_script_components.writeScriptHeader(
+                className, 'Constructs the fields and methods of a %s.' % (
+                        className)),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'body': '\n    '.join(body) or '// No fields or methods.',
+    }
+
+
+_kBoundMethodTemplate = """
+static %(methodName)s = function(%(args)s) {
+        return %(implCall)s;
+    };""".lstrip('\n')
+def _writeBoundMethod(className, methodName, argNames):
+    return _kBoundMethodTemplate % {
+        'methodName': methodName,
+        'args': ', '.join(argNames),
+        'implCall': _writeImplCall(
+                '_IMPL_%s_%s' % (className, methodName),
+                ['self'] + argNames),
+    }
+
+
+# Implementation scripts with too many arguments take an argument array; see
+# gmidl_script_components.writeImplVariableDeclarations().
+def _writeImplCall(implScriptName, args):
+    if gmidl_script_components.usesDirectArguments(len(args)):
+        return '%s(%s)' % (implScriptName, ', '.join(args))
+    return '%s([%s])' % (implScriptName, ', '.join(args))
+
+
+_kFunctionTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+function %(scriptName)s(%(args)s) {
+    %(body)s
+}
+""".lstrip('\n')
+def _writeFunction(scriptName, argNames, argTypes, body, returnType=None,
+        description='', longDescription='', returnDescription=''):
+    return _kFunctionTemplate % {
+        'scriptName': scriptName,
+        'args': ', '.join(argNames),
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, argNames, argTypes, returnType),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName, description, longDescription, returnDescription),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'body': body,
+    }
+
+
+_kCreateBody = """
+var newInstance = new %(className)s();
+    __IMPL_%(className)s_create(newInstance, 0);
+    return newInstance;""".lstrip('\n')
+def writeConstructor(className):
+    return _writeFunction(
+            '%s_create' % className, [], [],
+            _kCreateBody % {'className': className})
+
+
+# Fields named in lazyNames may hold undefined, and are only freed if they
+# hold a value.
+def writeDestructor(className, propertyNames=None, propertyTypes=None,
+        lazyNames=()):
+    return _writeFunction(
+            '%s_destroy' % className, ['instance'], [className],
+            gmidl_script_components.indentBlock(
+                    gmidl_script_components.writeStructCleanup(
+                            'instance', propertyNames or [],
+                            propertyTypes or [], lazyNames)),
+            description='Frees the data structures and instances that a %s '
+                    'owns.' % className)
+
+
+def writeGetter(className, propertyName, propertyType):
+    return _writeFunction(
+            '%s_get%s' % (className, propertyName), ['instance'], [''],
+            'return instance.%s;' % propertyName, propertyType,
+            'Gets the value for %s from a %s' % (propertyName, className))
+
+
+def writeSetter(className, propertyName, propertyType):
+    return _writeFunction(
+            '%s_set%s' % (className, propertyName),
+            ['instance', 'value'], ['', propertyType],
+            'instance.%s = value;' % propertyName,
+            description='Sets the value of %s for a %s' % (
+                    propertyName, className))
+
+
+# Mutators work like those of the other class styles; see
+# gmidl_wrappers.writeMutator(). GameMaker 2.3 still passes the arguments of
+# a function as argument0, argument1 and so on, so the mutations are shared.
+def writeMutator(className, propertyName, propertyType, mutatorName):
+    argNames, argTypes, description = (
+            gmidl_script_components.describeMutator(
+                    className, propertyName, propertyType, mutatorName))
+    body = []
+    if gmidl_script_components.mutationReadsItems(propertyType, mutatorName):
+        body.append('var items = instance.%s;' % propertyName)
+    body.append(gmidl_script_components.writeMutation(
+            propertyType, mutatorName,
+            lambda value: 'instance.%s = %s;' % (propertyName, value)))
+    return _writeFunction(
+            '%s_%s%s' % (className, mutatorName, propertyName),
+            ['instance'] + argNames,
+            [className] + argTypes,
+            gmidl_script_components.indentBlock('\n'.join(body)),
+            description=description)
+
+
+# A virtual method is called through the instance, so that the struct
+# dispatches it to the override of its class. Any other method calls its
+# implementation directly.
+def writeMethod(className, method, virtual=True):
+    args = ['instance'] + method.argNames
+    if virtual:
+        call = 'instance.%s(%s)' % (method.name, ', '.join(method.argNames))
+    else:
+        call = _writeImplCall(
+                '_IMPL_%s_%s' % (className, method.name), args)
+    return _writeFunction(
+            '%s_%s' % (className, method.name),
+            args,
+            [className] + method.argTypes,
+            'return %s;' % call,
+            method.returnType,
+            method.description,
+            method.longDescription,
+            method.returnDescription)
+
+
+# Returns the (scriptName, text) of every script of a class; see
+# gmidl_generator.generateClassScripts().
+def generateClassScripts(classDefinition, vtableSlots=None, properties=None):
+    className = classDefinition.name
+    if properties is None:
+        properties = classDefinition.properties
+    scripts = [
+        (className, writeStructConstructor(
+                className,
+                classDefinition.parentName,
+                [name for name, propertyType in classDefinition.properties],
+                [propertyType
+                    for name, propertyType in classDefinition.properties],
+                classDefinition.methods)),
+        ('%s_create' % className, writeConstructor(className)),
+        ('%s_destroy' % className, writeDestructor(
+                className,
+                [name for name, propertyType in properties],
+                [propertyType for name, propertyType in properties])),
+    ]
+    for propertyName, propertyType in classDefinition.properties:
+        scripts.append((
+            '%s_get%s' % (className, propertyName),
+            writeGetter(className, propertyName, propertyType),
+        ))
+        scripts.append((
+            '%s_set%s' % (className, propertyName),
+            writeSetter(className, propertyName, propertyType),
+        ))
+        for mutatorName in gmidl_script_components.mutatorNames(
+                propertyType):
+            scripts.append((
+                '%s_%s%s' % (className, mutatorName, propertyName),
+                writeMutator(
+                        className, propertyName, propertyType, mutatorName),
+            ))
+    for method in classDefinition.methods:
+        virtual = vtableSlots is None or vtableSlots[method.name] is not None
+        scripts.append((
+            '%s_%s' % (className, method.name),
+            writeMethod(className, method, virtual),
+        ))
+    return scripts
@@ -0,0 +1,87 @@
+#!/usr/local/bin/python
+
+"""Compares the size of the code generated for each class style.
+
+Generates a synthetic project with the release profile, which uses the array
+class style, with the same flags but the ds_map class style, and with the
+struct profile, and prints the number of scripts, lines and bytes that each
+one generates, including the scripts shared by all classes. Nothing is run,
+so this measures only how much code GameMaker has to compile and load.
+
+To run:
+
+  python gmidl_structs_benchmark.py [numberOfClasses]
+"""
+
+import shutil
+import sys
+import tempfile
+
+import gmidl_flags
+import gmidl_generator
+import gmidl_generator_benchmark
+
+
+kDefaultNumberOfClasses = 1000
+
+kStyleProfiles = [
+    gmidl_flags.kReleaseProfile,
+    gmidl_flags.FlagProfile(
+            'release-dsmap',
+            profileTime=False,
+            trackScope=False,
+            enforceTypes=False,
+            classStyle=gmidl_flags.kClassStyleDsMap),
+    gmidl_flags.kStructProfile,
+]
+
+
+# Measures the scripts instead of writing them.
+class SizeSink(object):
+
+    def __init__(self):
+        self.writtenScripts = 0
+        self.unchangedScripts = 0
+        self.removedScripts = 0
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self, scriptName, text):
+        self.writtenScripts += 1
+        self.lines += text.count('\n')
+        self.bytes += len(text.encode('utf-8'))
+
+    def remove(self, scriptName):
+        self.removedScripts += 1
+
+
+def measureStyle(classes, flags):
+    manifestDirectory = tempfile.mkdtemp()
+    try:
+        sink = SizeSink()
+        gmidl_generator.generateProject(
+                classes, manifestDirectory, flags, sink=sink)
+    finally:
+        shutil.rmtree(manifestDirectory)
+    return sink
+
+
+def runSizeComparison(numberOfClasses):
+    print('Generated code for %d classes:' % numberOfClasses)
+    classes = gmidl_generator_benchmark.buildSyntheticClasses(
+            numberOfClasses)
+    arraySize = None
+    for flags in kStyleProfiles:
+        sink = measureStyle(classes, flags)
+        if arraySize is None:
+            arraySize = sink.bytes
+        print('  %-26s %7d scripts %9d lines %11d bytes (%.2fx)' % (
+                flags.classStyle, sink.writtenScripts, sink.lines,
+                sink.bytes, float(sink.bytes) / arraySize))
+
+
+if __name__ == '__main__':
+    numberOfClasses = (
+            int(sys.argv[1]) if len(sys.argv) > 1
+            else kDefaultNumberOfClasses)
+    runSizeComparison(numberOfClasses)
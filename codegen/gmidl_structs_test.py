@@ -0,0 +1,157 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_classes
+import gmidl_structs
+import test_util
+
+
+def makeBullet():
+    return gmidl_classes.ClassDefinition(
+            'Bullet', 'Entity',
+            [('speed', 'real'), ('hits', 'ds_list')],
+            [gmidl_classes.MethodDefinition('hit', ['target'], ['Entity'])])
+
+
+class StructConstructorTest(test_util.BaseTest):
+
+    def testRootClass(self):
+        (self.expectations.expect(gmidl_structs.writeStructConstructor(
+                'Entity', None, ['x'], ['real']))
+            .shouldContain('function Entity() constructor {\n'
+                    '    x = 0;\n'
+                    '}\n'))
+
+    def testSubclassInheritsConstructor(self):
+        (self.expectations.expect(gmidl_structs.writeStructConstructor(
+                'Bullet', 'Entity', ['hits'], ['ds_list']))
+            .shouldContain('function Bullet() : Entity() constructor {\n')
+            .shouldContain('    hits = ds_list_create();\n'))
+
+    def testMethodsAreBoundInConstructor(self):
+        (self.expectations.expect(gmidl_structs.writeStructConstructor(
+                'Bullet', 'Entity', methods=makeBullet().methods))
+            .shouldContain(
+                    '    static hit = function(target) {\n'
+                    '        return _IMPL_Bullet_hit(self, target);\n'
+                    '    };\n'))
+
+    def testEmptyClass(self):
+        (self.expectations.expect(gmidl_structs.writeStructConstructor('Foo'))
+            .shouldContain('    // No fields or methods.\n'))
+
+
+class StructAccessorTest(test_util.BaseTest):
+
+    def testCreateCallsInitializer(self):
+        (self.expectations.expect(gmidl_structs.writeConstructor('Foo'))
+            .shouldContain('function Foo_create() {\n'
+                    '    var newInstance = new Foo();\n'
+                    '    __IMPL_Foo_create(newInstance, 0);\n'
+                    '    return newInstance;\n'
+                    '}\n'))
+
+    def testGetterReadsField(self):
+        (self.expectations.expect(
+                gmidl_structs.writeGetter('Foo', 'bar', 'real'))
+            .shouldContain('///Foo_getbar(instance; -> real)\n')
+            .shouldContain('    return instance.bar;\n'))
+
+    def testSetterWritesField(self):
+        (self.expectations.expect(
+                gmidl_structs.writeSetter('Foo', 'bar', 'real'))
+            .shouldContain('function Foo_setbar(instance, value) {\n'
+                    '    instance.bar = value;\n'))
+
+    def testMutatorChangesFieldInPlace(self):
+        (self.expectations.expect(gmidl_structs.writeMutator(
+                'Bullet', 'hits', 'ds_list', 'push'))
+            .shouldContain('function Bullet_pushhits(instance, value) {\n'
+                    '    var items = instance.hits;\n'
+                    '    ds_list_add(items, argument1);\n'
+                    '}\n'))
+
+    def testArrayMutatorStartsNewArray(self):
+        (self.expectations.expect(gmidl_structs.writeMutator(
+                'Bullet', 'trail', 'array', 'setAt'))
+            .shouldContain(
+                    'function Bullet_setAttrail(instance, index, value) {\n')
+            .shouldContain('        items[@argument1] = argument2;\n')
+            .shouldContain('        instance.trail = items;\n'))
+
+    def testArrayClearStoresDefaultValue(self):
+        (self.expectations.expect(gmidl_structs.writeMutator(
+                'Bullet', 'trail', 'array', 'clear'))
+            .shouldContain('function Bullet_cleartrail(instance) {\n'
+                    '    instance.trail = 0;\n'
+                    '}\n'))
+
+    def testDestructorFreesDataStructures(self):
+        (self.expectations.expect(gmidl_structs.writeDestructor(
+                'Foo', ['items', 'count', 'lookup'],
+                ['ds_list', 'real', 'ds_map']))
+            .shouldContain('    ds_list_destroy(instance.items);\n'
+                    '    ds_map_destroy(instance.lookup);\n')
+            .shouldNotContain('count'))
+
+    def testDestructorDestroysChildInstances(self):
+        (self.expectations.expect(gmidl_structs.writeDestructor(
+                'Entity', ['x', 'tags', 'child'],
+                ['real', 'ds_list', 'Node']))
+            .shouldContain('    ds_list_destroy(instance.tags);\n'
+                    '    Node_destroy(instance.child);\n')
+            .shouldNotContain('instance.x'))
+
+    def testDestructorOnlyDestroysCreatedLazyChildren(self):
+        (self.expectations.expect(gmidl_structs.writeDestructor(
+                'Entity', ['child'], ['Node'], lazyNames=['child']))
+            .shouldContain('    if (!is_undefined(instance.child)) {\n'
+                    '        Node_destroy(instance.child);\n'
+                    '    }\n'))
+
+
+class StructMethodTest(test_util.BaseTest):
+
+    def testVirtualMethodIsCalledThroughInstance(self):
+        (self.expectations.expect(gmidl_structs.writeMethod(
+                'Bullet', makeBullet().methods[0]))
+            .shouldContain('    return instance.hit(target);\n'))
+
+    def testDevirtualizedMethodCallsImplementation(self):
+        (self.expectations.expect(gmidl_structs.writeMethod(
+                'Bullet', makeBullet().methods[0], virtual=False))
+            .shouldContain('    return _IMPL_Bullet_hit(instance, target);\n'))
+
+    def testTooManyArgumentsArePassedAsArray(self):
+        argNames = ['a%d' % i for i in range(16)]
+        method = gmidl_classes.MethodDefinition(
+                'big', argNames, ['real'] * 16)
+        (self.expectations.expect(gmidl_structs.writeStructConstructor(
+                'Foo', methods=[method]))
+            .shouldContain('_IMPL_Foo_big([self, a0, '))
+
+    def testClassScripts(self):
+        scripts = dict(gmidl_structs.generateClassScripts(
+                makeBullet(), {'hit': None},
+                [('x', 'real'), ('speed', 'real'), ('hits', 'ds_list')]))
+        self.assertEqual(sorted(scripts), [
+            'Bullet',
+            'Bullet_clearhits',
+            'Bullet_create',
+            'Bullet_destroy',
+            'Bullet_gethits',
+            'Bullet_getspeed',
+            'Bullet_hit',
+            'Bullet_pushhits',
+            'Bullet_setAthits',
+            'Bullet_sethits',
+            'Bullet_setspeed',
+        ])
+        self.assertNotIn('x = 0;', scripts['Bullet'])
+        self.assertIn('_IMPL_Bullet_hit(instance, target)',
+                scripts['Bullet_hit'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/local/bin/python
+
+"""Type metadata, baked into constant tables at generation time.
+
+Everything the runtime knows about the classes is laid out by the generator,
+so nothing has to be registered while the game boots. One generated script,
+__gmidl_init_types, which the game must call once at startup, stores all of
+it in global arrays indexed by class, as one literal assignment per entry:
+
+    global.__gmidl_class_names__[Bullet] = 'Bullet';
+    global.__gmidl_parents__[Bullet] = Entity;
+    global.__gmidl_sizes__[Bullet] = __Bullet_properties.__size;
+    global.__gmidl_ancestry__[Bullet, 1] = 1;
+    global.__gmidl_ancestry__[Bullet, 0] = 1;
+    global.__gmidl_vtable__[Bullet, 0] = _IMPL_Entity_update;
+    global.__gmidl_property_names__[Bullet, __Bullet_properties.speed] =
+            'speed';
+
+The ancestry table is described in gmidl_ancestry and the vtables in
+gmidl_vtables. The property names of a class include the inherited ones, so
+the name of any slot is one read.
+
+The script returns the number of entries it stored, which is the whole cost
+of booting the type system. The generator reports the same number, from
+countStatements(), so that it can be tracked across builds.
+"""
+
+
+kInitScriptName = '__gmidl_init_types'
+
+kClassNamesArrayName = 'global.__gmidl_class_names__'
+kParentsArrayName = 'global.__gmidl_parents__'
+kSizesArrayName = 'global.__gmidl_sizes__'
+kPropertyNamesArrayName = 'global.__gmidl_property_names__'
+
+# The parent of a class without one.
+kNoParent = '-1'
+
+# The class name, parent, size and both ends of the ancestry range.
+kStatementsPerClass = 5
+
+
+class TypeMetadata(object):
+
+    def __init__(self, parents=None, layout=None, classOrder=None,
+            propertyLayout=None):
+        # Maps the name of every class to the name of its parent, or to None.
+        self.parents = dict(parents) if parents else {}
+        # The gmidl_vtables.VtableLayout, gmidl_ancestry.ClassOrder and
+        # gmidl_properties.PropertyLayout of the same classes.
+        self.layout = layout
+        self.classOrder = classOrder
+        self.propertyLayout = propertyLayout
+
+    @property
+    def classNames(self):
+        return sorted(self.parents)
+
+    # Returns the number of entries that __gmidl_init_types stores.
+    def countStatements(self):
+        return sum(
+                kStatementsPerClass
+                + len(self.layout.vtables[className])
+                + len(self.propertyLayout.properties[className])
+                for className in self.parents)
+
+    def toJson(self):
+        return {
+            'parents': dict(
+                    (className, self.parents[className])
+                    for className in self.classNames),
+            'vtables': self.layout.toJson(),
+            'ancestry': self.classOrder.toJson(),
+            'properties': self.propertyLayout.toJson(),
+        }
+
+
+def buildTypeMetadata(classDefinitions, layout, classOrder, propertyLayout):
+    return TypeMetadata(
+            [(classDefinition.name, classDefinition.parentName)
+                for classDefinition in classDefinitions],
+            layout, classOrder, propertyLayout)
@@ -0,0 +1,83 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_ancestry
+import gmidl_classes
+import gmidl_properties
+import gmidl_types
+import gmidl_vtables
+import gmidl_wrappers
+import test_util
+
+
+def makeClasses():
+    return [
+        gmidl_classes.ClassDefinition(
+                'Entity', None, [('x', 'real'), ('y', 'real')],
+                [gmidl_classes.MethodDefinition('update', ['dt'], ['real'])]),
+        gmidl_classes.ClassDefinition(
+                'Bullet', 'Entity', [('speed', 'real')],
+                [gmidl_classes.MethodDefinition('hit')]),
+    ]
+
+
+def makeMetadata(classes):
+    return gmidl_types.buildTypeMetadata(
+            classes,
+            gmidl_vtables.buildVtableLayout(classes),
+            gmidl_ancestry.numberClasses(classes),
+            gmidl_properties.buildPropertyLayout(classes))
+
+
+class TypeMetadataTest(unittest.TestCase):
+
+    def testParents(self):
+        metadata = makeMetadata(makeClasses())
+        self.assertEqual(metadata.parents,
+                {'Entity': None, 'Bullet': 'Entity'})
+        self.assertEqual(metadata.classNames, ['Bullet', 'Entity'])
+
+    def testCountStatements(self):
+        # Entity: 5 + 1 vtable slot + 2 properties.
+        # Bullet: 5 + 2 vtable slots + 3 properties.
+        self.assertEqual(makeMetadata(makeClasses()).countStatements(), 18)
+
+    def testNoClasses(self):
+        self.assertEqual(makeMetadata([]).countStatements(), 0)
+
+
+class TypeInitializerTest(test_util.BaseTest):
+
+    def testBakesEveryTable(self):
+        (self.expectations.expect(gmidl_wrappers.writeTypeInitializer(
+                makeMetadata(makeClasses())))
+            .shouldContain('///__gmidl_init_types(; -> real)\n')
+            .shouldContain(
+                    '// Bullet\n'
+                    "global.__gmidl_class_names__[Bullet] = 'Bullet';\n"
+                    'global.__gmidl_parents__[Bullet] = Entity;\n'
+                    'global.__gmidl_sizes__[Bullet] = '
+                        '__Bullet_properties.__size;\n'
+                    'global.__gmidl_ancestry__[Bullet, 1] = 1;\n'
+                    'global.__gmidl_ancestry__[Bullet, 0] = 1;\n'
+                    'global.__gmidl_vtable__[Bullet, 1] = _IMPL_Bullet_hit;\n'
+                    'global.__gmidl_vtable__[Bullet, 0] = '
+                        '_IMPL_Entity_update;\n'
+                    'global.__gmidl_property_names__'
+                        "[Bullet, __Bullet_properties.speed] = 'speed';\n")
+            .shouldContain('global.__gmidl_parents__[Entity] = -1;\n')
+            .shouldContain('\nreturn 18;\n'))
+
+    def testReturnsNumberOfEntries(self):
+        metadata = makeMetadata(makeClasses())
+        text = gmidl_wrappers.writeTypeInitializer(metadata)
+        entries = [
+            line for line in text.splitlines()
+            if line.startswith('global.')
+        ]
+        self.assertEqual(len(entries), metadata.countStatements())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+#!/usr/local/bin/python
+
+"""Virtual method tables, laid out at generation time.
+
+Every method of a class gets a fixed slot in the vtable of its class. A
+class starts with the slots of its parent, in the same order, and appends a
+slot for every method that it does not override. A method that overrides a
+method of an ancestor reuses the slot of that method, and points it at its
+own implementation. So the slot of a method is the same in the vtables of
+every class that inherits it, and a virtual call is a single indexed read of
+the vtable of the type of the instance:
+
+    script_execute(global.__gmidl_vtable__[__type__(argument0), 2],
+            argument0, argument1)
+
+The vtables themselves are filled in by __gmidl_init_types, with the rest
+of the type metadata; see gmidl_types.
+
+Most methods are never overridden, though. A method that no subclass of its
+class overrides, which includes every method of a class without subclasses,
+always runs the same implementation, so its wrapper calls the implementation
+directly instead of going through the vtable:
+
+    _IMPL_Bullet_hit(argument0)
+"""
+
+import logging
+
+
+kVtableArrayName = 'global.__gmidl_vtable__'
+
+_logger = logging.getLogger(__name__)
+
+
+class VtableLayoutError(ValueError):
+    pass
+
+
+class VtableSlot(object):
+
+    def __init__(self, methodName, argCount, implClassName):
+        self.methodName = methodName
+        self.argCount = argCount
+        self.implClassName = implClassName
+
+    @property
+    def implScriptName(self):
+        return '_IMPL_%s_%s' % (self.implClassName, self.methodName)
+
+    def toJson(self):
+        return [self.methodName, self.argCount, self.implClassName]
+
+
+class VtableLayout(object):
+
+    def __init__(self, vtables=None, overriddenMethods=None):
+        # Maps the name of every class to the list of its VtableSlots.
+        self.vtables = dict(vtables) if vtables else {}
+        # The (className, methodName) of every method that is overridden in
+        # a subclass of its class.
+        self.overriddenMethods = (
+                set(overriddenMethods) if overriddenMethods else set())
+
+    def slotIndex(self, className, methodName):
+        for index, slot in enumerate(self.vtables[className]):
+            if slot.methodName == methodName:
+                return index
+        raise KeyError('%s has no method %s' % (className, methodName))
+
+    def isVirtual(self, className, methodName):
+        return (className, methodName) in self.overriddenMethods
+
+    # Maps the name of every method that a class defines to its slot, or to
+    # None if the method is called directly.
+    def dispatchSlots(self, className):
+        return dict(
+                (slot.methodName,
+                    index if self.isVirtual(className, slot.methodName)
+                    else None)
+                for index, slot in enumerate(self.vtables[className])
+                if slot.implClassName == className)
+
+    # Returns everything about the layout that the scripts of a class depend
+    # on, for hashing.
+    def classJson(self, className):
+        return {
+            'vtable': [slot.toJson() for slot in self.vtables[className]],
+            'dispatch': self.dispatchSlots(className),
+        }
+
+    # Returns a summary of how many method wrappers call their
+    # implementation directly.
+    def devirtualizationReport(self):
+        methods = sum(
+                len(self.dispatchSlots(className))
+                for className in self.vtables)
+        virtualMethods = len(self.overriddenMethods)
+        return '%d of %d methods devirtualized, %d dispatched virtually' % (
+                methods - virtualMethods, methods, virtualMethods)
+
+    # Maps the name of every method of a class to its slot.
+    def slotIndices(self, className):
+        return dict(
+                (slot.methodName, index)
+                for index, slot in enumerate(self.vtables[className]))
+
+    def toJson(self):
+        return dict(
+                (className, self.classJson(className))
+                for className in sorted(self.vtables))
+
+    # Raises a VtableLayoutError unless every class keeps the slots of its
+    # parent, in the same order and with the same number of arguments, and
+    # has at most one slot for every method.
+    def check(self, classDefinitions):
+        for classDefinition in classDefinitions:
+            vtable = self.vtables[classDefinition.name]
+            methodNames = [slot.methodName for slot in vtable]
+            if len(set(methodNames)) != len(methodNames):
+                raise VtableLayoutError(
+                        '%s has more than one slot for a method: %s' % (
+                                classDefinition.name,
+                                ', '.join(methodNames)))
+            if classDefinition.parentName is None:
+                continue
+            parentVtable = self.vtables[classDefinition.parentName]
+            for index, parentSlot in enumerate(parentVtable):
+                if (index >= len(vtable)
+                        or vtable[index].methodName != parentSlot.methodName
+                        or vtable[index].argCount != parentSlot.argCount):
+                    raise VtableLayoutError(
+                            'Slot %d of %s does not match slot %d of its '
+                            'parent %s (%s)' % (
+                                    index, classDefinition.name, index,
+                                    classDefinition.parentName,
+                                    parentSlot.methodName))
+
+
+def buildVtableLayout(classDefinitions):
+    classes = {}
+    for classDefinition in classDefinitions:
+        if classDefinition.name in classes:
+            raise VtableLayoutError(
+                    'Class %s is defined twice' % classDefinition.name)
+        classes[classDefinition.name] = classDefinition
+    layout = VtableLayout()
+
+    for className in classes:
+        # Lays out the ancestors of the class first, without recursion, so
+        # that deep hierarchies do not hit the recursion limit.
+        chain = []
+        chainNames = set()
+        while className not in layout.vtables:
+            if className in chainNames:
+                raise VtableLayoutError('Inheritance cycle: %s' % (
+                        ' -> '.join(chain[chain.index(className):]
+                                + [className])))
+            chain.append(className)
+            chainNames.add(className)
+            parentName = classes[className].parentName
+            if parentName is None:
+                break
+            if parentName not in classes:
+                raise VtableLayoutError(
+                        '%s inherits from unknown class %s' % (
+                                className, parentName))
+            className = parentName
+        for className in reversed(chain):
+            _layOutClass(layout, classes[className])
+    layout.check(classes.values())
+    _findOverriddenMethods(layout, classes)
+    return layout
+
+
+# Lays out the vtable of a class, whose parent must be laid out already.
+def _layOutClass(layout, classDefinition):
+    className = classDefinition.name
+    parentName = classDefinition.parentName
+    vtable = list(layout.vtables[parentName]) if parentName else []
+    methodNames = [method.name for method in classDefinition.methods]
+    if len(set(methodNames)) != len(methodNames):
+        raise VtableLayoutError('%s defines a method twice: %s' % (
+                className, ', '.join(methodNames)))
+    for method in classDefinition.methods:
+        slot = VtableSlot(method.name, len(method.argNames), className)
+        for index, inheritedSlot in enumerate(vtable):
+            if inheritedSlot.methodName == method.name:
+                if inheritedSlot.argCount != slot.argCount:
+                    raise VtableLayoutError(
+                            '%s.%s takes %d arguments, but overrides '
+                            '%s.%s, which takes %d' % (
+                                    className, method.name, slot.argCount,
+                                    inheritedSlot.implClassName,
+                                    method.name, inheritedSlot.argCount))
+                vtable[index] = slot
+                break
+        else:
+            vtable.append(slot)
+    layout.vtables[className] = vtable
+
+
+# Marks a method of a class as overridden if a class below it in the
+# hierarchy has another implementation in the same slot. The first class on
+# the way down that has another implementation differs from its own parent,
+# so comparing every class with its parent finds them all.
+def _findOverriddenMethods(layout, classes):
+    for className, vtable in layout.vtables.items():
+        parentName = classes[className].parentName
+        if parentName is None:
+            continue
+        for index, parentSlot in enumerate(layout.vtables[parentName]):
+            if vtable[index].implClassName != parentSlot.implClassName:
+                layout.overriddenMethods.add(
+                        (parentSlot.implClassName, parentSlot.methodName))
+    for className in sorted(layout.vtables):
+        for methodName, slot in sorted(
+                layout.dispatchSlots(className).items()):
+            if slot is None:
+                _logger.debug('%s.%s is not overridden; calling it directly',
+                        className, methodName)
+            else:
+                _logger.debug('%s.%s is overridden; dispatching through '
+                        'slot %d', className, methodName, slot)
+    _logger.info(layout.devirtualizationReport())
@@ -0,0 +1,159 @@
+#!/usr/local/bin/python
+
+import unittest
+
+import gmidl_classes
+import gmidl_vtables
+import gmidl_wrappers
+import test_util
+
+
+def makeClass(name, parentName=None, methods=()):
+    return gmidl_classes.ClassDefinition(
+            name, parentName,
+            methods=[gmidl_classes.MethodDefinition(methodName, argNames)
+                for methodName, argNames in methods])
+
+
+def makeClasses():
+    return [
+        makeClass('Bullet', 'Entity', [('update', ['dt']), ('hit', [])]),
+        makeClass('Entity', None, [('update', ['dt']), ('draw', [])]),
+        makeClass('Player', 'Entity', [('jump', [])]),
+    ]
+
+
+def describe(layout, className):
+    return [(slot.methodName, slot.implScriptName)
+        for slot in layout.vtables[className]]
+
+
+class BuildVtableLayoutTest(test_util.BaseTest):
+
+    def testRootClass(self):
+        layout = gmidl_vtables.buildVtableLayout(makeClasses())
+        self.assertEqual(describe(layout, 'Entity'), [
+            ('update', '_IMPL_Entity_update'),
+            ('draw', '_IMPL_Entity_draw'),
+        ])
+
+    def testOverrideKeepsSlotOfParent(self):
+        layout = gmidl_vtables.buildVtableLayout(makeClasses())
+        self.assertEqual(describe(layout, 'Bullet'), [
+            ('update', '_IMPL_Bullet_update'),
+            ('draw', '_IMPL_Entity_draw'),
+            ('hit', '_IMPL_Bullet_hit'),
+        ])
+        self.assertEqual(layout.slotIndex('Bullet', 'hit'), 2)
+
+    def testSiblingsShareSlotsOfParent(self):
+        layout = gmidl_vtables.buildVtableLayout(makeClasses())
+        self.assertEqual(layout.slotIndices('Player'),
+                {'update': 0, 'draw': 1, 'jump': 2})
+
+    def testOverrideWithDifferentArgumentCount(self):
+        classes = makeClasses()
+        classes[0].methods[0].argNames.append('scale')
+        classes[0].methods[0].argTypes.append('real')
+        with self.assertRaises(gmidl_vtables.VtableLayoutError):
+            gmidl_vtables.buildVtableLayout(classes)
+
+    def testUnknownParent(self):
+        with self.assertRaises(gmidl_vtables.VtableLayoutError):
+            gmidl_vtables.buildVtableLayout([makeClass('Bullet', 'Entity')])
+
+    def testInheritanceCycle(self):
+        with self.assertRaises(gmidl_vtables.VtableLayoutError):
+            gmidl_vtables.buildVtableLayout([
+                makeClass('A', 'B'),
+                makeClass('B', 'A'),
+            ])
+
+    def testCycleIsReportedFromWhereItStarts(self):
+        with self.assertRaisesRegex(
+                gmidl_vtables.VtableLayoutError,
+                'Inheritance cycle: B -> C -> B'):
+            gmidl_vtables.buildVtableLayout([
+                makeClass('A', 'B'),
+                makeClass('B', 'C'),
+                makeClass('C', 'B'),
+            ])
+
+    def testDeepHierarchy(self):
+        classes = [makeClass('Class0', None, [('update', [])])] + [
+            makeClass('Class%d' % i, 'Class%d' % (i - 1))
+            for i in range(1, 2999)
+        ] + [makeClass('Class2999', 'Class2998', [('update', [])])]
+        layout = gmidl_vtables.buildVtableLayout(reversed(classes))
+        self.assertEqual(layout.slotIndex('Class2999', 'update'), 0)
+        self.assertEqual(
+                layout.vtables['Class2998'][0].implClassName, 'Class0')
+        self.assertTrue(layout.isVirtual('Class0', 'update'))
+
+    def testMethodDefinedTwice(self):
+        with self.assertRaises(gmidl_vtables.VtableLayoutError):
+            gmidl_vtables.buildVtableLayout([
+                makeClass('A', None, [('f', []), ('f', [])]),
+            ])
+
+    def testClassDefinedTwice(self):
+        with self.assertRaises(gmidl_vtables.VtableLayoutError):
+            gmidl_vtables.buildVtableLayout([makeClass('A'), makeClass('A')])
+
+    def testCheckFindsConflictingSlots(self):
+        classes = makeClasses()
+        layout = gmidl_vtables.buildVtableLayout(classes)
+        bulletVtable = layout.vtables['Bullet']
+        bulletVtable[0], bulletVtable[1] = bulletVtable[1], bulletVtable[0]
+        with self.assertRaises(gmidl_vtables.VtableLayoutError):
+            layout.check(classes)
+
+    def testOverriddenMethods(self):
+        layout = gmidl_vtables.buildVtableLayout(makeClasses())
+        self.assertEqual(layout.overriddenMethods, set([('Entity', 'update')]))
+        self.assertEqual(layout.dispatchSlots('Entity'),
+                {'update': 0, 'draw': None})
+        self.assertEqual(layout.dispatchSlots('Bullet'),
+                {'update': None, 'hit': None})
+
+    def testOverrideFurtherDown(self):
+        classes = makeClasses() + [
+            makeClass('Rocket', 'Bullet', [('draw', [])]),
+        ]
+        layout = gmidl_vtables.buildVtableLayout(classes)
+        self.assertEqual(layout.overriddenMethods, set([
+            ('Entity', 'update'),
+            ('Entity', 'draw'),
+        ]))
+        self.assertEqual(layout.dispatchSlots('Bullet'),
+                {'update': None, 'hit': None})
+
+    def testDevirtualizationReport(self):
+        layout = gmidl_vtables.buildVtableLayout(makeClasses())
+        self.assertEqual(layout.devirtualizationReport(),
+                '4 of 5 methods devirtualized, 1 dispatched virtually')
+
+    def testVtableEntries(self):
+        layout = gmidl_vtables.buildVtableLayout(makeClasses())
+        self.assertEqual(
+                gmidl_wrappers.writeVtableEntries(layout, 'Bullet'), [
+                    'global.__gmidl_vtable__[Bullet, 2] = _IMPL_Bullet_hit;',
+                    'global.__gmidl_vtable__[Bullet, 1] = _IMPL_Entity_draw;',
+                    'global.__gmidl_vtable__[Bullet, 0] = '
+                        '_IMPL_Bullet_update;',
+                ])
+        self.assertIn(
+                'global.__gmidl_vtable__[Player, 2] = _IMPL_Player_jump;',
+                gmidl_wrappers.writeVtableEntries(layout, 'Player'))
+
+    def testScriptWrapperDispatchesThroughVtable(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Bullet_hit', ['self'], ['Bullet'], vtableSlot=2))
+            .shouldContain('var returnValue = script_execute('
+                    'global.__gmidl_vtable__[__type__(argument0), 2], '
+                    'argument0);')
+            .shouldNotContain('__type_lookupMethod__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
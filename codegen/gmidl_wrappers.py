@@ -1,7 +1,20 @@
 #!/usr/local/bin/python
 
 
+import gmidl_ancestry
+import gmidl_columns
+import gmidl_dirty
+import gmidl_flags
+import gmidl_profiler
+import gmidl_properties
+import gmidl_scopes
 import gmidl_script_components
+import gmidl_script_ids
+import gmidl_types
+import gmidl_vtables
+
+
+kPoolInitializerScriptName = '__gmidl_init_pools'
 
 
 _kConstructorTemplate = """
@@ -10,11 +23,7 @@ _kConstructorTemplate = """
 
 var %(instanceName)s;
 
-if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY) {
-    %(arrayAllocator)s
-} else if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_DSMAP) {
-    %(dsMapAllocator)s
-}
+%(allocation)s
 
 %(argumentDeclarations)s
 
@@ -22,80 +31,581 @@ __IMPL_%(className)s_create(%(instanceName)s, argv);
 
 return %(instanceName)s;
 """.lstrip('\n')
+_kPooledAllocationTemplate = """
+// Reuse a destroyed instance if there is one.
+if (ds_stack_empty(%(pool)s)) {
+    %(allocator)s
+} else {
+    newInstance = ds_stack_pop(%(pool)s);%(children)s
+}""".lstrip('\n')
+# A pooled class takes its instances from the pool that its destructor
+# returns them to, and only allocates a new one if the pool is empty. Pooled
+# instances give up the instances that their properties default to, so a
+# reused one gets new ones. A class with the columns attribute allocates a
+# handle into its columns instead.
 def writeConstructor(className, propertyNames=None, propertyTypes=None,
-        dependencyNames=None, dependencyTypes=None):
-    return _kConstructorTemplate % {
+        dependencyNames=None, dependencyTypes=None,
+        flags=gmidl_flags.kRuntimeProfile, pooled=False, columns=False,
+        lazyNames=()):
+    scriptName = '%s_create' % className
+    if columns:
+        allocator = gmidl_script_components.writeColumnAllocator(
+                className, propertyNames, propertyTypes, lazyNames)
+    else:
+        allocator = _writeAllocator(
+                className, propertyNames, propertyTypes, flags, lazyNames)
+    if pooled and not columns:
+        children = _writePooledChildren(
+                className, propertyNames, propertyTypes, flags, lazyNames)
+        allocation = _kPooledAllocationTemplate % {
+            'pool': gmidl_script_components.writePoolName(className),
+            'allocator': gmidl_script_components.indentBlock(allocator),
+            'children': '\n    ' + gmidl_script_components.indentBlock(
+                    children) if children else '',
+        }
+    else:
+        allocation = allocator
+    userProperties = [
+        (name, propertyType)
+        for name, propertyType in zip(
+                propertyNames or [], propertyTypes or [])
+        if name not in gmidl_properties.kInternalNames]
+    return gmidl_script_components.collapseBlankLines(
+            _kConstructorTemplate % {
         'className': className,
-        'prototype': writeScriptPrototype(),
-        'header': gmidl_script_components.writeScriptHeader(),
-        'arrayAllocator': gmidl_script_components.writeArrayAllocator(),
-        'dsMapAllocator': gmidl_script_components.writeDsMapAllocator(),
-        'argumentDeclarations': writeInitializerArguments(),
-    }
+        'instanceName': 'newInstance',
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName,
+                [name for name, propertyType in userProperties],
+                [propertyType for name, propertyType in userProperties]),
+        'header': gmidl_script_components.writeScriptHeader(scriptName),
+        'allocation': allocation,
+        'argumentDeclarations':
+                gmidl_script_components.writeInitializerArguments(
+                        dependencyNames or [], dependencyTypes or [],
+                        enforceTypes=flags.enforceTypes),
+    })
 
 
-_kSetterTemplate = """
+def _writePooledChildren(className, propertyNames, propertyTypes, flags,
+        lazyNames):
+    arrayCode = gmidl_script_components.writePooledChildren(
+            className, 'newInstance', propertyNames or [],
+            propertyTypes or [], dsMap=False, lazyNames=lazyNames)
+    if not arrayCode:
+        return ''
+    return gmidl_script_components.writeClassStyleSwitch(
+            flags.classStyle,
+            arrayCode,
+            gmidl_script_components.writePooledChildren(
+                    className, 'newInstance', propertyNames,
+                    propertyTypes, dsMap=True, lazyNames=lazyNames))
+
+
+def _writeAllocator(className, propertyNames, propertyTypes, flags,
+        lazyNames=()):
+    return gmidl_script_components.writeClassStyleSwitch(
+            flags.classStyle,
+            gmidl_script_components.writeArrayAllocator(
+                    className, propertyNames, propertyTypes, lazyNames),
+            gmidl_script_components.writeDsMapAllocator(
+                    className, propertyNames, propertyTypes, lazyNames))
+
+
+_kDestructorTemplate = """
 %(prototype)s
 %(header)s
 %(notice)s
 
 var self = argument0;
-var value = argument1;
-if (GMIDL_ENFORCE_TYPES) {
-    __check_instanceof__(self, %(className)s);
-    __check_instanceof__(value, %(propertyType)s);
-}
 
-if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY) {
-    self[@__%(className)s_properties_%(propertyName)s] = value;
-} else if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_DSMAP) {
-    ds_map_set(self, __%(className)s_properties_%(propertyName)s, value);
+%(cleanup)s
 """.lstrip('\n')
-def writeSetter(className, propertyName, propertyType):
-    return _kSetterTemplate % {
+def writeDestructor(className, propertyNames=None, propertyTypes=None,
+        flags=gmidl_flags.kRuntimeProfile, lazyNames=()):
+    scriptName = '%s_destroy' % className
+    propertyNames = propertyNames or []
+    propertyTypes = propertyTypes or []
+    return gmidl_script_components.collapseBlankLines(
+            _kDestructorTemplate % {
         'prototype': gmidl_script_components.writeScriptPrototype(
-                '%s_set%s' % (className, propertyName),
-                ['self', propertyName],
-                ['', propertyType]),
+                scriptName, ['self'], [className]),
         'header': gmidl_script_components.writeScriptHeader(
-            scriptName,
-            'Sets the value of %s for a %s' % (propertyName, className))
-        'className': className,
-        'propertyName': propertyName,
-        'propertyType': propertyType,
+                scriptName,
+                'Frees the data structures and instances that a %s '
+                        'owns.' % className),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'cleanup': gmidl_script_components.writeClassStyleSwitch(
+                flags.classStyle,
+                gmidl_script_components.writeArrayCleanup(
+                        className, 'self', propertyNames, propertyTypes,
+                        lazyNames),
+                gmidl_script_components.writeDsMapCleanup(
+                        className, 'self', propertyNames, propertyTypes,
+                        lazyNames)),
+    })
+
+
+def writeColumnDestructor(className, propertyNames=None,
+        propertyTypes=None, lazyNames=()):
+    scriptName = '%s_destroy' % className
+    return _kDestructorTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['self'], [className]),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Frees the data structures and instances that a %s '
+                        'owns and its handle.' % className),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'cleanup': gmidl_script_components.writeColumnCleanup(
+                className, 'self', propertyNames or [], propertyTypes or [],
+                lazyNames),
     }
 
 
-_kGetterTemplate = """
+_kPooledDestructorTemplate = """
 %(prototype)s
 %(header)s
 %(notice)s
 
-var %(instanceName)s = argument0;
+var self = argument0;
 
-if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY) {
-    return %(instanceName)s[__%(className)s_properties_%(propertyName)s];
-} else if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_DSMAP) {
-    return %(instanceName)s[? __%(className)s_properties_%(propertyName)s];
-} else {
-    NOTREACHED('GMIDL_CLASS_STYLE is an invalid value: %d', GMIDL_CLASS_STYLE);
+%(release)s
+""".lstrip('\n')
+_kPooledReleaseTemplate = """
+%(reset)s
+
+ds_stack_push(%(pool)s, self);""".lstrip('\n')
+_kSubclassDispatchTemplate = """
+// An instance of a subclass goes to the destructor of its own class, so that
+// its own properties are freed and it never enters the pool of this class.
+var type = __type__(self);
+%(branches)s else {
+    %(release)s
+}""".lstrip('\n')
+# subclassNames are the names of all the descendants of the class. Without
+# them, the destructor assumes that the instance is of the class itself.
+def writePooledDestructor(className, propertyNames=None, propertyTypes=None,
+        flags=gmidl_flags.kRuntimeProfile, lazyNames=(), subclassNames=()):
+    scriptName = '%s_destroy' % className
+    propertyNames = propertyNames or []
+    propertyTypes = propertyTypes or []
+    release = _kPooledReleaseTemplate % {
+        'reset': gmidl_script_components.writeClassStyleSwitch(
+                flags.classStyle,
+                gmidl_script_components.writeArrayReset(
+                        className, 'self', propertyNames, propertyTypes,
+                        lazyNames),
+                gmidl_script_components.writeDsMapReset(
+                        className, 'self', propertyNames, propertyTypes,
+                        lazyNames)),
+        'pool': gmidl_script_components.writePoolName(className),
+    }
+    if subclassNames:
+        release = _kSubclassDispatchTemplate % {
+            'branches': ' else '.join(
+                    'if (type == %s) {\n    %s_destroy(self);\n}' % (
+                            subclassName, subclassName)
+                    for subclassName in subclassNames),
+            'release': gmidl_script_components.indentBlock(release),
+        }
+    return gmidl_script_components.collapseBlankLines(
+            _kPooledDestructorTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['self'], [className]),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Resets a %s to its default values and returns it to the '
+                        'pool.' % className),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'release': release,
+    })
+
+
+_kPreallocatorTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var newInstance;
+repeat (argument0) {
+    // Start from a fresh array rather than writing into the last one.
+    newInstance = 0;
+    %(allocator)s
+    ds_stack_push(%(pool)s, newInstance);
 }
 """.lstrip('\n')
-def writeGetter(className, propertyName, propertyType):
+# Instances in the pool hold no instances of class types, which the
+# constructor creates when it takes them out, so the preallocated ones are
+# left without them too.
+def writePreallocator(className, propertyNames=None, propertyTypes=None,
+        flags=gmidl_flags.kRuntimeProfile, lazyNames=()):
+    scriptName = '%s_preallocate' % className
+    lazyNames = list(lazyNames) + [
+        propertyName
+        for propertyName, propertyType in zip(
+                propertyNames or [], propertyTypes or [])
+        if gmidl_script_components.isClassType(propertyType)
+    ]
+    return gmidl_script_components.collapseBlankLines(
+            _kPreallocatorTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['count'], ['real']),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Fills the pool of %s instances with count new ones.' % (
+                        className)),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'allocator': gmidl_script_components.indentBlock(_writeAllocator(
+                className, propertyNames, propertyTypes, flags, lazyNames)),
+        'pool': gmidl_script_components.writePoolName(className),
+    })
+
+
+_kPoolInitializerTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(pools)s
+""".lstrip('\n')
+def writePoolInitializer(classNames, mapPool=True):
+    scriptName = kPoolInitializerScriptName
+    pools = [
+        gmidl_script_components.writePoolName(className)
+        for className in sorted(classNames)
+    ]
+    if mapPool:
+        pools.insert(0, gmidl_script_components.kMapPoolName)
+    return _kPoolInitializerTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(scriptName),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Creates the instance pools. Call this once at game start.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'pools': '\n'.join(
+                ['%s = ds_stack_create();' % pool for pool in pools]),
+    }
+
+
+def _writeSampleCondition(scriptName, flags):
+    return gmidl_script_components.writeSampleCondition(
+            scriptName, flags.typeCheckFirstCalls, flags.typeCheckRate)
+
+
+_kSetterTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(declarations)s
+%(typeChecks)s
+
+%(assignment)s
+""".lstrip('\n')
+_kSetterDeclarations = """
+var self = argument0;
+var value = argument1;
+""".strip('\n')
+# A setter with a dirtyBit also marks the property in the dirty bits of the
+# instance; see gmidl_dirty.
+def writeSetter(className, propertyName, propertyType,
+        flags=gmidl_flags.kRuntimeProfile, checkedTypes=None, columns=False,
+        dirtyBit=None):
     scriptName = '%s_set%s' % (className, propertyName)
-    return _kGetterTemplate % {
+    # Without type checks, a setter specialized for one class style assigns
+    # its arguments directly.
+    if flags.enforceTypes is False and (
+            flags.classStyle is not None or columns):
+        declarations = ''
+        instanceName = 'argument0'
+        valueName = 'argument1'
+    else:
+        declarations = _kSetterDeclarations
+        instanceName = 'self'
+        valueName = 'value'
+    propertyIndex = gmidl_properties.propertyIndex(className, propertyName)
+    arrayCode = ['%s[@%s] = %s;' % (instanceName, propertyIndex, valueName)]
+    dsMapCode = ['ds_map_replace(%s, %s, %s);' % (
+            instanceName, propertyIndex, valueName)]
+    columnCode = ['%s[%s] = %s;' % (
+            gmidl_columns.columnName(className, propertyName),
+            instanceName, valueName)]
+    if dirtyBit is not None:
+        for code, mark in zip([arrayCode, dsMapCode, columnCode],
+                _writeMarkDirty(className, instanceName, dirtyBit)):
+            code.append(mark)
+    return gmidl_script_components.collapseBlankLines(_kSetterTemplate % {
         'prototype': gmidl_script_components.writeScriptPrototype(
                 scriptName,
                 ['self', propertyName],
                 ['', propertyType]),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Sets the value of %s for a %s' % (propertyName, className)),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'declarations': declarations,
+        'typeChecks': gmidl_script_components.writeTypeCheckGuard(
+                [gmidl_script_components.writeTypeCheck(
+                        value, typeName, checkedTypes)
+                    for value, typeName in [
+                        ('self', className), ('value', propertyType)]
+                    if gmidl_script_components.needsTypeCheck(typeName)],
+                flags.enforceTypes,
+                _writeSampleCondition(scriptName, flags)),
+        'assignment': '\n'.join(columnCode) if columns
+            else gmidl_script_components.writeClassStyleSwitch(
+                flags.classStyle,
+                gmidl_script_components.indentBlock('\n'.join(arrayCode)),
+                gmidl_script_components.indentBlock('\n'.join(dsMapCode))),
+    })
+
+
+# Returns the statements that set dirtyBit in the dirty bits of an instance
+# of the array class style, of the ds_map class style and of a class with
+# the columns attribute.
+def _writeMarkDirty(className, instanceName, dirtyBit):
+    slotIndex = gmidl_dirty.slotIndex(className)
+    column = gmidl_dirty.columnName(className)
+    return [
+        '%s[@%s] = %s[%s] | %d;' % (
+                instanceName, slotIndex, instanceName, slotIndex, dirtyBit),
+        'ds_map_replace(%s, %s, %s[? %s] | %d);' % (
+                instanceName, slotIndex, instanceName, slotIndex, dirtyBit),
+        '%s[%s] = %s[%s] | %d;' % (
+                column, instanceName, column, instanceName, dirtyBit),
+    ]
+
+
+_kGetterTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(declarations)s
+
+%(read)s
+""".lstrip('\n')
+# The getter of a lazy property creates its default value on the first read.
+def writeGetter(className, propertyName, propertyType,
+        flags=gmidl_flags.kRuntimeProfile, columns=False, lazy=False):
+    scriptName = '%s_get%s' % (className, propertyName)
+    # A getter specialized for one class style is a single indexed read,
+    # unless the property is lazy.
+    if flags.classStyle is not None or columns:
+        declarations = ''
+        instanceName = 'argument0'
+    else:
+        declarations = 'var self = argument0;'
+        instanceName = 'self'
+    propertyIndex = gmidl_properties.propertyIndex(className, propertyName)
+    column = gmidl_columns.columnName(className, propertyName)
+    if lazy and gmidl_script_components.isLazyType(propertyType):
+        read = _writeLazyRead(
+                instanceName, propertyIndex, propertyType, flags, columns,
+                column)
+    elif columns:
+        read = 'return %s[%s];' % (column, instanceName)
+    else:
+        read = gmidl_script_components.writeClassStyleSwitch(
+                flags.classStyle,
+                'return %s[%s];' % (instanceName, propertyIndex),
+                'return %s[? %s];' % (instanceName, propertyIndex))
+    return gmidl_script_components.collapseBlankLines(_kGetterTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['self'], [''], propertyType),
         'header': gmidl_script_components.writeScriptHeader(
                 scriptName,
                 'Gets the value for %s from a %s' % (propertyName, className)),
         'notice': gmidl_script_components.kDoNotEditNotice,
-        'className': className,
-        'propertyName': propertyName,
-        'instanceName': 'self'
+        'declarations': declarations,
+        'read': read,
+    })
+
+
+def _writeLazyRead(instanceName, propertyIndex, propertyType, flags, columns,
+        column):
+    if columns:
+        return gmidl_script_components.writeLazyRead(
+                '%s[%s]' % (column, instanceName),
+                '%s[%s] = value;' % (column, instanceName),
+                propertyType)
+    return gmidl_script_components.writeClassStyleSwitch(
+            flags.classStyle,
+            gmidl_script_components.indentBlock(
+                    gmidl_script_components.writeLazyRead(
+                            '%s[%s]' % (instanceName, propertyIndex),
+                            '%s[@%s] = value;' % (
+                                    instanceName, propertyIndex),
+                            propertyType)),
+            gmidl_script_components.indentBlock(
+                    gmidl_script_components.writeLazyRead(
+                            '%s[? %s]' % (instanceName, propertyIndex),
+                            'ds_map_replace(%s, %s, value);' % (
+                                    instanceName, propertyIndex),
+                            propertyType)))
+
+
+_kMutatorTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(typeChecks)s
+
+%(read)s
+%(mutation)s
+""".lstrip('\n')
+# Writes a script that changes an array or ds_* property without reading it
+# out through the getter, which would copy an array that is then changed.
+# The property of a lazy class is read through its getter, which creates it.
+# A mutator with a dirtyBit marks the property like its setter does.
+def writeMutator(className, propertyName, propertyType, mutatorName,
+        flags=gmidl_flags.kRuntimeProfile, checkedTypes=None, columns=False,
+        lazy=False, dirtyBit=None):
+    scriptName = '%s_%s%s' % (className, mutatorName, propertyName)
+    argNames, argTypes, description = (
+            gmidl_script_components.describeMutator(
+                    className, propertyName, propertyType, mutatorName))
+    propertyIndex = gmidl_properties.propertyIndex(className, propertyName)
+    column = gmidl_columns.columnName(className, propertyName)
+
+    def writeStore(value):
+        if columns:
+            return '%s[argument0] = %s;' % (column, value)
+        return gmidl_script_components.writeClassStyleSwitch(
+                flags.classStyle,
+                'argument0[@%s] = %s;' % (propertyIndex, value),
+                'ds_map_replace(argument0, %s, %s);' % (
+                        propertyIndex, value))
+
+    if not gmidl_script_components.mutationReadsItems(
+            propertyType, mutatorName):
+        read = ''
+    elif lazy and gmidl_script_components.isLazyType(propertyType):
+        read = 'var items = %s_get%s(argument0);' % (className, propertyName)
+    elif columns:
+        read = 'var items = %s[argument0];' % column
+    else:
+        read = gmidl_script_components.writeClassStyleSwitch(
+                flags.classStyle,
+                'items = argument0[%s];' % propertyIndex,
+                'items = argument0[? %s];' % propertyIndex)
+        # A mutator specialized for one class style declares and reads items
+        # in one statement.
+        read = ('var ' + read if flags.classStyle is not None
+                else 'var items;\n' + read)
+    mutation = gmidl_script_components.writeMutation(
+            propertyType, mutatorName, writeStore)
+    if dirtyBit is not None:
+        arrayMark, dsMapMark, columnMark = _writeMarkDirty(
+                className, 'argument0', dirtyBit)
+        mutation += '\n' + (columnMark if columns
+                else gmidl_script_components.writeClassStyleSwitch(
+                        flags.classStyle, arrayMark, dsMapMark))
+    return gmidl_script_components.collapseBlankLines(_kMutatorTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['self'] + argNames, [className] + argTypes),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName, description),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'typeChecks': gmidl_script_components.writeTypeCheckGuard(
+                [gmidl_script_components.writeTypeCheck(
+                        'argument0', className, checkedTypes)],
+                flags.enforceTypes,
+                _writeSampleCondition(scriptName, flags)),
+        'read': read,
+        'mutation': mutation,
+    })
+
+
+_kDirtyHelperTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(typeChecks)s
+
+%(body)s
+""".lstrip('\n')
+_kForEachDirtyBody = """
+%(read)s
+var slot = %(firstSlot)d;
+while (dirty != 0) {
+    if (dirty & 1) {
+        script_execute(argument1, argument0, slot);
     }
+    dirty = dirty >> 1;
+    slot += 1;
+}
+""".strip('\n')
+_kDirtyHelperDescriptions = {
+    'getDirty': 'Returns the dirty bits of a %s.',
+    'clearDirty': 'Clears the dirty bits of a %s.',
+    'forEachDirty':
+        'Calls script(self, slot) for every marked property of a %s.',
+}
+# Writes <className>_getDirty, <className>_clearDirty or
+# <className>_forEachDirty, for a class with a dirty slot; see gmidl_dirty.
+def writeDirtyHelper(className, helperName,
+        flags=gmidl_flags.kRuntimeProfile, checkedTypes=None, columns=False):
+    scriptName = '%s_%s' % (className, helperName)
+    slotIndex = gmidl_dirty.slotIndex(className)
+    column = gmidl_dirty.columnName(className)
+    # The dirty bits of an instance of the array class style, of the ds_map
+    # class style and of a class with the columns attribute.
+    reads = [
+        'argument0[%s]' % slotIndex,
+        'argument0[? %s]' % slotIndex,
+        '%s[argument0]' % column,
+    ]
+    clears = [
+        'argument0[@%s] = 0;' % slotIndex,
+        'ds_map_replace(argument0, %s, 0);' % slotIndex,
+        '%s[argument0] = 0;' % column,
+    ]
+
+    def writeSlotCode(arrayCode, dsMapCode, columnCode):
+        if columns:
+            return columnCode
+        return gmidl_script_components.writeClassStyleSwitch(
+                flags.classStyle, arrayCode, dsMapCode)
+
+    if helperName == 'getDirty':
+        body = writeSlotCode(*['return %s;' % read for read in reads])
+    elif helperName == 'clearDirty':
+        body = writeSlotCode(*clears)
+    else:
+        # A script specialized for one class style declares and reads the
+        # dirty bits in one statement.
+        declaration = 'var ' if flags.classStyle is not None or columns else ''
+        read = writeSlotCode(*[
+                '%sdirty = %s;' % (declaration, read) for read in reads])
+        body = _kForEachDirtyBody % {
+            'read': read if declaration else 'var dirty;\n' + read,
+            'firstSlot': gmidl_properties.kFirstSlot,
+        }
+    argNames, argTypes = ['self'], [className]
+    returnType = None
+    if helperName == 'getDirty':
+        returnType = 'real'
+    elif helperName == 'forEachDirty':
+        argNames, argTypes = ['self', 'script'], [className, 'real']
+    return gmidl_script_components.collapseBlankLines(
+            _kDirtyHelperTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, argNames, argTypes, returnType),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName, _kDirtyHelperDescriptions[helperName] % (
+                        className)),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'typeChecks': gmidl_script_components.writeTypeCheckGuard(
+                [gmidl_script_components.writeTypeCheck(
+                        'argument0', className, checkedTypes)],
+                flags.enforceTypes,
+                _writeSampleCondition(scriptName, flags)),
+        'body': body,
+    })
 
 
 _kScriptWrapperTemplate = """
@@ -103,34 +613,20 @@ _kScriptWrapperTemplate = """
 %(scriptHeader)s
 %(notice)s
 
-if (GMIDL_PROFILE_TIME) {
-    // If time profiling is on, get the time that the script started running.
-    __profile_time_push__(%(scriptName)s);
-}
+%(profileTimePush)s
 
-// Arguments are passed as an array to the implementation script.
-var %(argv)s;
 %(variableDeclarations)s
 
-if (GMIDL_TRACK_SCOPE) {
-    __push_scope__(%(scriptName)s, %(argv)s);
-}
+%(pushScope)s
 
 // Call the script implementation
 var returnValue = %(implCall)s;
 
-if (GMIDL_TRACK_SCOPE) {
-    __pop_scope__();
-}
+%(popScope)s
 
-// Free the argument array
-%(argv)s = 0;
+%(freeArgv)s
 
-if (GMIDL_PROFILE_TIME) {
-    // If time profiling is on, get the time that the script scope exited.
-    // The difference between the start and end times is then logged.
-    __profile_time_pop__();
-}
+%(profileTimePop)s
 
 return returnValue;
 """.lstrip('\n')
@@ -142,19 +638,569 @@ def writeScriptWrapper(
         description='',
         longDescription='',
         returnDescription='',
-        virtual=True):
+        virtual=True,
+        flags=gmidl_flags.kRuntimeProfile,
+        vtableSlot=None,
+        checkedTypes=None):
     argv = 'argv'
-    return _scriptWrapperTemplate % {
+    if not argNames:
+        argNames = []
+    if not argTypes:
+        argTypes = ['any'] * len(argNames)
+    # Arguments are forwarded to the implementation script as they are. An
+    # argument array is only built if scope tracking captures arguments, or
+    # if there are too many arguments to forward.
+    sampleCondition = _writeSampleCondition(scriptName, flags)
+    if gmidl_script_components.usesDirectArguments(len(argTypes)):
+        variableDeclarations = (
+                '// Arguments are passed directly to the implementation '
+                        'script.\n'
+                + gmidl_script_components.writeArgumentTypeChecks(
+                        argTypes, flags.enforceTypes, checkedTypes,
+                        sampleCondition))
+        scopeArgumentDeclarations = (
+                gmidl_script_components.writeVariableDeclarations(
+                        argv, argTypes, enforceTypes=False))
+        implArguments = gmidl_script_components.writeDirectArguments(
+                len(argTypes))
+        freeArgv = ''
+    else:
+        variableDeclarations = (
+                '// Arguments are passed as an array to the implementation '
+                        'script.\n'
+                + gmidl_script_components.writeVariableDeclarations(
+                        argv, argTypes, flags.enforceTypes, checkedTypes,
+                        sampleCondition))
+        scopeArgumentDeclarations = ''
+        implArguments = argv
+        freeArgv = '// Free the argument array\n%s = 0;' % argv
+    return gmidl_script_components.collapseBlankLines(
+            _kScriptWrapperTemplate % {
         'scriptName': scriptName,
-        'prototype': writeScriptPrototype(
+        'prototype': gmidl_script_components.writeScriptPrototype(
                 scriptName, argNames, argTypes, returnType),
         'notice': gmidl_script_components.kDoNotEditNotice,
         'scriptHeader': gmidl_script_components.writeScriptHeader(
                 scriptName, description, longDescription, returnDescription),
-        'variableDeclarations': writeVariableDeclarations(
-                argv, argNames, argTypes),
-        'implCall': _writeImplCall(virtual),
-        'argv': argv,
+        'profileTimePush': gmidl_script_components.writeFlagGuard(
+                'GMIDL_PROFILE_TIME',
+                flags.profileTime,
+                gmidl_script_components.writeProfileStart(scriptName)),
+        'variableDeclarations': variableDeclarations,
+        'pushScope': gmidl_script_components.writeFlagGuard(
+                'GMIDL_TRACK_SCOPE',
+                flags.trackScope,
+                gmidl_script_components.writeScopePush(
+                        scriptName, argv, scopeArgumentDeclarations)),
+        'implCall': gmidl_script_components.writeImplCall(
+                scriptName, implArguments, virtual, vtableSlot),
+        'popScope': gmidl_script_components.writeFlagGuard(
+                'GMIDL_TRACK_SCOPE',
+                flags.trackScope,
+                gmidl_script_components.writeScopePop()),
+        'freeArgv': freeArgv,
+        'profileTimePop': gmidl_script_components.writeFlagGuard(
+                'GMIDL_PROFILE_TIME',
+                flags.profileTime,
+                gmidl_script_components.writeProfileStop(scriptName)),
+    })
+
+
+_kCallCountsInitializerTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var i;
+for (i = %(count)s - 1; i >= 0; i -= 1) {
+    %(counts)s[i] = 0;
+}
+""".lstrip('\n')
+# Preallocates the call counts of sampled type checks, one for every script
+# id, so that the scripts never check whether the array exists.
+def writeCallCountsInitializer():
+    scriptName = gmidl_script_components.kCallCountsInitScriptName
+    return _kCallCountsInitializerTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(scriptName),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Sets up the call counts of sampled type checks. Call this '
+                        'once at game start.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'count': gmidl_script_ids.countId(),
+        'counts': gmidl_script_components.kCallCountsArrayName,
+    }
+
+
+_kPropertySlotsTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(enums)s
+""".lstrip('\n')
+def writePropertySlots(layout):
+    scriptName = gmidl_properties.kSlotsScriptName
+    enums = []
+    for className in sorted(layout.properties):
+        members = [
+            '    %s = %d' % (propertyName, gmidl_properties.kFirstSlot + i)
+            for i, (propertyName, propertyType) in enumerate(
+                    layout.properties[className])
+        ] + ['    %s = %d' % (
+                gmidl_properties.kSizeName, layout.size(className))]
+        enums.append('enum %s {\n%s\n}' % (
+                gmidl_properties.enumName(className), ',\n'.join(members)))
+    return _kPropertySlotsTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(scriptName),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Declares the property slots of every class. This script '
+                        'does not need to be called.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'enums': '\n\n'.join(enums),
+    }
+
+
+# Fills in the vtable of a class in reverse order, to avoid resizing the
+# array.
+def writeVtableEntries(layout, className):
+    return [
+        '%s[%s, %d] = %s;' % (
+                gmidl_vtables.kVtableArrayName, className, index,
+                slot.implScriptName)
+        for index, slot in reversed(list(enumerate(layout.vtables[className])))
+    ]
+
+
+_kInstanceCheckTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var number = %(ancestry)s[__type__(argument0), 0];
+if (number < %(ancestry)s[%(className)s, 0]
+        || number > %(ancestry)s[%(className)s, 1]) {
+    NOTREACHED('Expected an instance of %(className)s');
+}
+""".lstrip('\n')
+_kHandleCheckTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var handle = argument0;
+if (!is_real(handle) || handle < 0 || handle >= %(count)s
+        || !%(live)s[handle]) {
+    NOTREACHED('Expected an instance of %(className)s');
+}
+""".lstrip('\n')
+# Instances of a class with the columns attribute are checked to be live
+# handles.
+def writeInstanceCheck(className, columns=False):
+    scriptName = gmidl_ancestry.checkScriptName(className)
+    template = _kHandleCheckTemplate if columns else _kInstanceCheckTemplate
+    return template % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['value'], [className]),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Checks that the value is an instance of %s' % className),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'ancestry': gmidl_ancestry.kAncestryArrayName,
+        'count': gmidl_columns.countName(className),
+        'live': gmidl_columns.liveColumnName(className),
+        'className': className,
+    }
+
+
+# Fills in the ancestry of a class in reverse order, to avoid resizing the
+# array.
+def writeAncestryEntries(classOrder, className):
+    first, last = classOrder.ranges[className]
+    return [
+        '%s[%s, 1] = %d;' % (
+                gmidl_ancestry.kAncestryArrayName, className, last),
+        '%s[%s, 0] = %d;' % (
+                gmidl_ancestry.kAncestryArrayName, className, first),
+    ]
+
+
+_kTypeInitializerTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(assignments)s
+
+return %(count)d;
+""".lstrip('\n')
+def writeTypeInitializer(metadata):
+    scriptName = gmidl_types.kInitScriptName
+    assignments = []
+    for className in metadata.classNames:
+        parentName = metadata.parents[className]
+        properties = metadata.propertyLayout.properties[className]
+        assignments.append('// %s' % className)
+        assignments.append('%s[%s] = \'%s\';' % (
+                gmidl_types.kClassNamesArrayName, className, className))
+        assignments.append('%s[%s] = %s;' % (
+                gmidl_types.kParentsArrayName, className,
+                parentName or gmidl_types.kNoParent))
+        assignments.append('%s[%s] = %s;' % (
+                gmidl_types.kSizesArrayName, className,
+                gmidl_properties.sizeIndex(className)))
+        assignments.extend(
+                writeAncestryEntries(metadata.classOrder, className))
+        assignments.extend(writeVtableEntries(metadata.layout, className))
+        # Fill the property names in reverse order to avoid resizing the
+        # array.
+        for propertyName, propertyType in reversed(properties):
+            assignments.append('%s[%s, %s] = \'%s\';' % (
+                    gmidl_types.kPropertyNamesArrayName, className,
+                    gmidl_properties.propertyIndex(className, propertyName),
+                    propertyName))
+    return gmidl_script_components.collapseBlankLines(
+            _kTypeInitializerTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, returnType='real'),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Fills in the type tables of every class. Call this once at '
+                        'game start.',
+                returnDescription='The number of entries stored.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'assignments': '\n'.join(assignments) or '// No classes.',
+        'count': metadata.countStatements(),
+    })
+
+
+_kColumnFillTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var value = argument0;
+var i;
+for (i = %(count)s - 1; i >= 0; i -= 1) {
+    %(column)s[i] = value;
+}
+""".lstrip('\n')
+# Sets a property of every instance, live or not, in one pass over its
+# column. Data structures are owned by their instances, so properties that
+# hold them get no fill script.
+def writeColumnFill(className, propertyName, propertyType):
+    scriptName = '%s_fill%s' % (className, propertyName)
+    return _kColumnFillTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, [propertyName], [propertyType]),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Sets the value of %s for every %s' % (
+                        propertyName, className)),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'count': gmidl_columns.countName(className),
+        'column': gmidl_columns.columnName(className, propertyName),
+    }
+
+
+_kColumnForEachTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var i;
+for (i = 0; i < %(count)s; i += 1) {
+    if (%(live)s[i]) {
+        %(implCall)s;
+    }
+}
+""".lstrip('\n')
+# Calls a method on every live instance. The method must take few enough
+# arguments to be forwarded directly; see
+# gmidl_script_components.usesDirectArguments().
+def writeColumnForEach(className, methodName, argNames=None, argTypes=None):
+    scriptName = '%s_forEach%s' % (className, methodName)
+    argNames = argNames or []
+    return _kColumnForEachTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, argNames, argTypes),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Calls %s on every %s' % (methodName, className)),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'count': gmidl_columns.countName(className),
+        'live': gmidl_columns.liveColumnName(className),
+        'implCall': '_IMPL_%s_%s(%s)' % (
+                className, methodName,
+                ', '.join(['i'] + [
+                    'argument%d' % i for i in range(len(argNames))])),
+    }
+
+
+_kColumnInitializerTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(assignments)s
+""".lstrip('\n')
+# columnClasses are the (className, propertyNames) of every class with the
+# columns attribute.
+def writeColumnInitializer(columnClasses):
+    scriptName = gmidl_columns.kInitScriptName
+    assignments = []
+    for className, propertyNames in columnClasses:
+        assignments.append('// %s' % className)
+        assignments.append('%s = 0;' % gmidl_columns.countName(className))
+        assignments.append('%s = ds_stack_create();' % (
+                gmidl_columns.freeListName(className)))
+        assignments.append('%s[0] = false;' % (
+                gmidl_columns.liveColumnName(className)))
+        for propertyName in propertyNames:
+            assignments.append('%s[0] = 0;' % (
+                    gmidl_columns.columnName(className, propertyName)))
+    return _kColumnInitializerTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(scriptName),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Creates the columns of every class with the columns '
+                        'attribute. Call this once at game start.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'assignments': '\n'.join(assignments),
+    }
+
+
+_kScriptIdsTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+enum %(enumName)s {
+%(members)s
+}
+""".lstrip('\n')
+def writeScriptIds(scriptNames):
+    scriptName = gmidl_script_ids.kScriptName
+    members = ['    %s = %d' % (name, i) for i, name in enumerate(
+            list(scriptNames) + [gmidl_script_ids.kCountName])]
+    return _kScriptIdsTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(scriptName),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Declares the id of every wrapper script. This '
+                        'script does not need to be called.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'enumName': gmidl_script_ids.kEnumName,
+        'members': ',\n'.join(members),
+    }
+
+
+_kProfilerInitializerTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(rate)s = max(1, argument0);
+%(current)s = -1;
+%(edges)s = ds_map_create();
+
+// Fill the arrays in reverse order to avoid resizing them.
+%(names)s
+
+var i;
+for (i = %(count)s - 1; i >= 0; i -= 1) {
+    %(calls)s[i] = 0;
+    %(samples)s[i] = 0;
+    %(time)s[i] = 0;
+}
+""".lstrip('\n')
+def writeProfilerInitializer(scriptNames):
+    scriptName = gmidl_profiler.kInitScriptName
+    return _kProfilerInitializerTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['rate'], ['real']),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Sets up the profiler to time 1 in every rate calls of '
+                        'every script. Call this once at game start.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'rate': gmidl_profiler.kRateName,
+        'current': gmidl_profiler.kCurrentScriptName,
+        'edges': gmidl_profiler.kEdgesMapName,
+        'names': '\n'.join([
+            '%s[%s] = \'%s\';' % (
+                    gmidl_profiler.kNamesArrayName,
+                    gmidl_script_ids.scriptId(name), name)
+            for name in reversed(list(scriptNames))]) or '// No scripts.',
+        'count': gmidl_script_ids.countId(),
+        'calls': gmidl_profiler.kCallsArrayName,
+        'samples': gmidl_profiler.kSamplesArrayName,
+        'time': gmidl_profiler.kTimeArrayName,
+    }
+
+
+_kProfileSampleTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var script = argument0;
+var microseconds = argument2;
+%(samples)s[script] += 1;
+%(time)s[script] += microseconds;
+
+// Callers are numbered from -1, for calls from code that GMIDL did not
+// generate.
+var edge = (argument1 + 1) * %(count)s + script;
+var edgeTime = ds_map_find_value(%(edges)s, edge);
+if (is_undefined(edgeTime)) {
+    ds_map_add(%(edges)s, edge, microseconds);
+} else {
+    ds_map_replace(%(edges)s, edge, edgeTime + microseconds);
+}
+""".lstrip('\n')
+def writeProfileSampler():
+    scriptName = gmidl_profiler.kSampleScriptName
+    return _kProfileSampleTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName,
+                ['script', 'caller', 'microseconds'],
+                ['real', 'real', 'real']),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Records the time of a sampled call of a script.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'samples': gmidl_profiler.kSamplesArrayName,
+        'time': gmidl_profiler.kTimeArrayName,
+        'count': gmidl_script_ids.countId(),
+        'edges': gmidl_profiler.kEdgesMapName,
+    }
+
+
+_kProfileDumpTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var file = file_text_open_write(argument0);
+var i;
+file_text_write_string(file, '%(scriptsHeader)s');
+file_text_writeln(file);
+for (i = 0; i < %(count)s; i += 1) {
+    if (%(calls)s[i] > 0) {
+        file_text_write_string(file, %(names)s[i]
+                + ',' + string(%(calls)s[i])
+                + ',' + string(%(samples)s[i])
+                + ',' + string(%(time)s[i]));
+        file_text_writeln(file);
+    }
+}
+
+file_text_writeln(file);
+file_text_write_string(file, '%(edgesHeader)s');
+file_text_writeln(file);
+var edge = ds_map_find_first(%(edges)s);
+repeat (ds_map_size(%(edges)s)) {
+    var caller = edge div %(count)s - 1;
+    var callerName = '';
+    if (caller >= 0) {
+        callerName = %(names)s[caller];
+    }
+    file_text_write_string(file, callerName
+            + ',' + %(names)s[edge mod %(count)s]
+            + ',' + string(ds_map_find_value(%(edges)s, edge)));
+    file_text_writeln(file);
+    edge = ds_map_find_next(%(edges)s, edge);
+}
+file_text_close(file);
+""".lstrip('\n')
+def writeProfileDump():
+    scriptName = gmidl_profiler.kDumpScriptName
+    return _kProfileDumpTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['path'], ['string']),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Writes the profile to a CSV file, for gmidl_profile_report.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'scriptsHeader': gmidl_profiler.kScriptsHeader,
+        'edgesHeader': gmidl_profiler.kEdgesHeader,
+        'count': gmidl_script_ids.countId(),
+        'calls': gmidl_profiler.kCallsArrayName,
+        'samples': gmidl_profiler.kSamplesArrayName,
+        'time': gmidl_profiler.kTimeArrayName,
+        'names': gmidl_profiler.kNamesArrayName,
+        'edges': gmidl_profiler.kEdgesMapName,
+    }
+
+
+_kScopeInitializerTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+%(depth)s = 0;
+%(capture)s = argument0;
+
+// Fill the ring buffers in reverse order to avoid resizing them.
+var i;
+for (i = %(capacity)d - 1; i >= 0; i -= 1) {
+    %(stack)s[i] = -1;
+    %(arguments)s[i] = 0;
+}
+""".lstrip('\n')
+def writeScopeInitializer():
+    scriptName = gmidl_scopes.kInitScriptName
+    return _kScopeInitializerTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['capture'], ['bool']),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Sets up scope tracking, capturing the arguments of every '
+                        'call if capture is true. Call this once at game '
+                        'start.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'depth': gmidl_scopes.kDepthName,
+        'capture': gmidl_scopes.kCaptureName,
+        'capacity': gmidl_scopes.kCapacity,
+        'stack': gmidl_scopes.kStackArrayName,
+        'arguments': gmidl_scopes.kArgumentsArrayName,
+    }
+
+
+_kScopeDumpTemplate = """
+%(prototype)s
+%(header)s
+%(notice)s
+
+var file = file_text_open_write(argument0);
+file_text_write_string(file, '%(depthPrefix)s' + string(%(depth)s));
+file_text_writeln(file);
+
+// Innermost first. Scopes deeper than the ring buffer were overwritten.
+var i;
+for (i = %(depth)s - 1; i >= max(0, %(depth)s - %(capacity)d); i -= 1) {
+    file_text_write_string(file, string(%(stack)s[i & %(mask)d]));
+    file_text_writeln(file);
+}
+file_text_close(file);
+""".lstrip('\n')
+def writeScopeDump():
+    scriptName = gmidl_scopes.kDumpScriptName
+    return _kScopeDumpTemplate % {
+        'prototype': gmidl_script_components.writeScriptPrototype(
+                scriptName, ['path'], ['string']),
+        'header': gmidl_script_components.writeScriptHeader(
+                scriptName,
+                'Writes the ids of the scripts on the scope stack to a text '
+                        'file, for gmidl_scope_decoder.'),
+        'notice': gmidl_script_components.kDoNotEditNotice,
+        'depthPrefix': gmidl_scopes.kDepthPrefix,
+        'depth': gmidl_scopes.kDepthName,
+        'capacity': gmidl_scopes.kCapacity,
+        'stack': gmidl_scopes.kStackArrayName,
+        'mask': gmidl_scopes.kCapacity - 1,
     }
 
 
@@ -170,7 +1216,7 @@ def writeImplBoilerplate(methodName, argNames, description='',
         longDescription=''):
     return _kImplTemplate % {
         'header': gmidl_script_components.writeScriptHeader(methodName, description, longDescription),
-        'declarations': writeImplVariableDeclarations(argNames),
+        'declarations': gmidl_script_components.writeImplVariableDeclarations(
+                argNames),
         'notice': gmidl_script_components.kImplScriptNotice,
     }
-
@@ -2,6 +2,7 @@
 
 import unittest
 
+import gmidl_flags
 import gmidl_wrappers
 import gmidl_script_components
 import test_util
@@ -26,7 +27,7 @@ class ConstructorTest(test_util.BaseTest):
             dependencyTypes = [dep[1]
                     for dep in inputCase.get('dependencies', [])]
 
-            self.expectations.expect(gmidl_wrappers.writeConstructor(
+            (self.expectations.expect(gmidl_wrappers.writeConstructor(
                     className, propertyNames, propertyTypes))
                 .shouldContain(gmidl_script_components.writeScriptPrototype(
                         scriptName, propertyNames, propertyTypes))
@@ -39,7 +40,7 @@ class ConstructorTest(test_util.BaseTest):
                 .shouldContain(
                         gmidl_script_components.writeInitializerArguments(
                                 dependencyNames, dependencyTypes))
-                .shouldContain('return newInstance;\n')
+                .shouldContain('return newInstance;\n'))
         super(test_util.BaseTest, self).tearDown()
 
     def testNoProperties(self):
@@ -97,6 +98,13 @@ class ConstructorTest(test_util.BaseTest):
             },
         ]
 
+    def testDirtySlotIsNotAnArgument(self):
+        (self.expectations.expect(gmidl_wrappers.writeConstructor(
+                'Entity', ['__dirty', 'x', 'tags'],
+                ['real', 'real', 'ds_list']))
+            .shouldContain('///Entity_create(x real, tags ds_list)\n')
+            .shouldNotContain('__dirty real'))
+
     def testOneDependency(self):
         pass
 
@@ -191,5 +199,585 @@ class ImplBoilerplateTest(test_util.BaseTest):
         pass
 
 
+class DirectArgumentsTest(test_util.BaseTest):
+
+    def testReleaseWrapperForwardsArguments(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self', 'count'], ['Foo', 'real'],
+                virtual=False, flags=gmidl_flags.kReleaseProfile))
+            .shouldContain(
+                    'var returnValue = _IMPL_Foo_baz(argument0, argument1);')
+            .shouldNotContain('argv'))
+
+    def testVirtualCallForwardsArguments(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self', 'count'], ['Foo', 'real'],
+                flags=gmidl_flags.kReleaseProfile, vtableSlot=1))
+            .shouldContain('script_execute(global.__gmidl_vtable__['
+                    '__type__(argument0), 1], argument0, argument1);')
+            .shouldNotContain('argv'))
+
+    def testScopeTrackingStillGetsArgumentArray(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self', 'count'], ['Foo', 'real'],
+                virtual=False, flags=gmidl_flags.kDebugProfile))
+            .shouldContain('    argv[1] = argument[1];\n')
+            .shouldContain('    global.__gmidl_scope_arguments__'
+                    '[scopeSlot] = argv;\n')
+            .shouldContain(
+                    'var returnValue = _IMPL_Foo_baz(argument0, argument1);'))
+
+    def testTooManyArgumentsFallBackToArgumentArray(self):
+        argNames = ['arg%d' % i for i in range(17)]
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', argNames, virtual=False,
+                flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('argv[16] = argument[16];\n')
+            .shouldContain('var returnValue = _IMPL_Foo_baz(argv);')
+            .shouldContain('\nargv = 0;\n'))
+
+    def testImplTakesArgumentsDirectly(self):
+        (self.expectations.expect(gmidl_wrappers.writeImplBoilerplate(
+                'Foo_baz', ['self', 'count']))
+            .shouldContain('var self = argument0;\nvar count = argument1;\n'))
+
+    def testImplWithTooManyArgumentsTakesArgumentArray(self):
+        (self.expectations.expect(gmidl_wrappers.writeImplBoilerplate(
+                'Foo_baz', ['arg%d' % i for i in range(17)]))
+            .shouldContain('var arg0 = argument0[0];\n')
+            .shouldContain('var arg16 = argument0[16];\n'))
+
+
+class PoolingTest(test_util.BaseTest):
+
+    def testPooledConstructorReusesInstances(self):
+        (self.expectations.expect(gmidl_wrappers.writeConstructor(
+                'Foo', ['bar'], ['real'],
+                flags=gmidl_flags.kReleaseProfile, pooled=True))
+            .shouldContain(
+                    'if (ds_stack_empty(global.__gmidl_pool_Foo__)) {\n'
+                    '    newInstance[__Foo_properties.__size] = Foo;\n')
+            .shouldContain(
+                    '} else {\n'
+                    '    newInstance = '
+                    'ds_stack_pop(global.__gmidl_pool_Foo__);\n'
+                    '}\n'))
+
+    def testPooledDestructorClearsDataStructures(self):
+        (self.expectations.expect(gmidl_wrappers.writePooledDestructor(
+                'Foo', ['items', 'name'], ['ds_list', 'string'],
+                flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('ds_list_clear(self[__Foo_properties.items]);\n')
+            .shouldContain("self[@__Foo_properties.name] = '';\n")
+            .shouldContain('ds_stack_push(global.__gmidl_pool_Foo__, self);')
+            .shouldNotContain('ds_list_create'))
+
+    def testPooledDestructorDestroysChildInstances(self):
+        (self.expectations.expect(gmidl_wrappers.writePooledDestructor(
+                'Foo', ['child'], ['Bar'], flags=gmidl_flags.kReleaseProfile))
+            .shouldContain(
+                    'Bar_destroy(self[__Foo_properties.child]);\n'
+                    'self[@__Foo_properties.child] = undefined;\n')
+            .shouldNotContain('Bar_create'))
+
+    def testPooledDestructorDispatchesSubclasses(self):
+        (self.expectations.expect(gmidl_wrappers.writePooledDestructor(
+                'Foo', ['items'], ['ds_list'],
+                flags=gmidl_flags.kReleaseProfile,
+                subclassNames=['Bar', 'Baz']))
+            .shouldContain(
+                    'var type = __type__(self);\n'
+                    'if (type == Bar) {\n'
+                    '    Bar_destroy(self);\n'
+                    '} else if (type == Baz) {\n'
+                    '    Baz_destroy(self);\n'
+                    '} else {\n'
+                    '    ds_list_clear(self[__Foo_properties.items]);\n'))
+
+    def testReusedInstanceGetsNewChildren(self):
+        (self.expectations.expect(gmidl_wrappers.writeConstructor(
+                'Foo', ['child', 'owner', 'count'], ['Bar', 'Baz', 'real'],
+                flags=gmidl_flags.kReleaseProfile, pooled=True,
+                lazyNames=['owner']))
+            .shouldContain(
+                    '} else {\n'
+                    '    newInstance = '
+                    'ds_stack_pop(global.__gmidl_pool_Foo__);\n'
+                    '    newInstance[@__Foo_properties.child] = '
+                        'Bar_create();\n'
+                    '}\n')
+            .shouldNotContain('Baz_create'))
+
+    def testPreallocatedInstancesHoldNoChildren(self):
+        (self.expectations.expect(gmidl_wrappers.writePreallocator(
+                'Foo', ['child'], ['Bar'], flags=gmidl_flags.kReleaseProfile))
+            .shouldContain(
+                    'newInstance[__Foo_properties.child] = undefined;\n')
+            .shouldNotContain('Bar_create'))
+
+    def testPooledDestructorForDsMapStyle(self):
+        flags = gmidl_flags.FlagProfile(
+                'maps', classStyle=gmidl_flags.kClassStyleDsMap)
+        (self.expectations.expect(gmidl_wrappers.writePooledDestructor(
+                'Foo', ['items', 'count'], ['ds_list', 'real'], flags=flags))
+            .shouldContain('ds_list_clear(self[? __Foo_properties.items]);\n')
+            .shouldContain('ds_map_replace(self, __Foo_properties.count, 0);'))
+
+
+class DsMapStyleTest(test_util.BaseTest):
+
+    def setUp(self):
+        super(DsMapStyleTest, self).setUp()
+        self.flags = gmidl_flags.FlagProfile(
+                'maps', classStyle=gmidl_flags.kClassStyleDsMap)
+
+    def testConstructorReusesMaps(self):
+        (self.expectations.expect(gmidl_wrappers.writeConstructor(
+                'Foo', ['items'], ['ds_list'], flags=self.flags))
+            .shouldContain(
+                    'if (ds_stack_empty(global.__gmidl_map_pool__)) {\n'
+                    '    newInstance = ds_map_create();\n'
+                    '} else {\n'
+                    '    newInstance = '
+                    'ds_stack_pop(global.__gmidl_map_pool__);\n'
+                    '}\n')
+            .shouldContain('newInstance[? __Foo_properties.items] = '
+                    'ds_list_create();'))
+
+    def testDestructorFreesDataStructuresAndMap(self):
+        (self.expectations.expect(gmidl_wrappers.writeDestructor(
+                'Foo', ['items', 'lookup', 'count'],
+                ['ds_list', 'ds_map', 'real'], flags=self.flags))
+            .shouldContain(
+                    'ds_list_destroy(self[? __Foo_properties.items]);\n'
+                    'ds_map_destroy(self[? __Foo_properties.lookup]);\n'
+                    'ds_map_clear(self);\n'
+                    'ds_stack_push(global.__gmidl_map_pool__, self);\n')
+            .shouldNotContain('count'))
+
+    def testArrayDestructorFreesDataStructures(self):
+        (self.expectations.expect(gmidl_wrappers.writeDestructor(
+                'Foo', ['items', 'count'], ['ds_queue', 'real'],
+                flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('ds_queue_destroy(self[__Foo_properties.items]);')
+            .shouldNotContain('ds_map'))
+
+    def testDestructorDestroysChildInstances(self):
+        (self.expectations.expect(gmidl_wrappers.writeDestructor(
+                'Foo', ['child', 'count'], ['Bar', 'real'], flags=self.flags))
+            .shouldContain(
+                    'Bar_destroy(self[? __Foo_properties.child]);\n'
+                    'ds_map_clear(self);\n'))
+
+    def testArrayDestructorDestroysChildInstances(self):
+        (self.expectations.expect(gmidl_wrappers.writeDestructor(
+                'Foo', ['child'], ['Bar'], flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('Bar_destroy(self[__Foo_properties.child]);\n'))
+
+    def testPoolInitializerCreatesMapPool(self):
+        (self.expectations.expect(gmidl_wrappers.writePoolInitializer([]))
+            .shouldContain('global.__gmidl_map_pool__ = ds_stack_create();'))
+
+
+class LazyPropertiesTest(test_util.BaseTest):
+
+    def testConstructorLeavesLazyPropertiesUndefined(self):
+        (self.expectations.expect(gmidl_wrappers.writeConstructor(
+                'Foo', ['items', 'owner', 'count'],
+                ['ds_list', 'Bar', 'real'],
+                flags=gmidl_flags.kReleaseProfile,
+                lazyNames=['items', 'owner', 'count']))
+            .shouldContain(
+                    'newInstance[__Foo_properties.items] = undefined;\n'
+                    'newInstance[__Foo_properties.owner] = undefined;\n'
+                    'newInstance[__Foo_properties.count] = 0;')
+            .shouldNotContain('ds_list_create()')
+            .shouldNotContain('Bar_create()'))
+
+    def testGetterCreatesValueOnFirstRead(self):
+        (self.expectations.expect(gmidl_wrappers.writeGetter(
+                'Foo', 'items', 'ds_list', flags=gmidl_flags.kReleaseProfile,
+                lazy=True))
+            .shouldContain(
+                    'var value = argument0[__Foo_properties.items];\n'
+                    'if (is_undefined(value)) {\n'
+                    '    value = ds_list_create();\n'
+                    '    argument0[@__Foo_properties.items] = value;\n'
+                    '}\n'
+                    'return value;\n'))
+
+    def testDsMapGetterCreatesValueOnFirstRead(self):
+        (self.expectations.expect(gmidl_wrappers.writeGetter(
+                'Foo', 'owner', 'Bar', flags=gmidl_flags.FlagProfile(
+                        'maps', classStyle=gmidl_flags.kClassStyleDsMap),
+                lazy=True))
+            .shouldContain('    value = Bar_create();\n'
+                    '    ds_map_replace(argument0, __Foo_properties.owner, '
+                    'value);\n'))
+
+    def testGetterOfPrimitiveIsStillOneRead(self):
+        (self.expectations.expect(gmidl_wrappers.writeGetter(
+                'Foo', 'count', 'real', flags=gmidl_flags.kReleaseProfile,
+                lazy=True))
+            .shouldContain('return argument0[__Foo_properties.count];\n')
+            .shouldNotContain('is_undefined'))
+
+    def testRuntimeGetterIndentsBothStyles(self):
+        (self.expectations.expect(gmidl_wrappers.writeGetter(
+                'Foo', 'items', 'ds_list', lazy=True))
+            .shouldContain(
+                    '} else if (GMIDL_CLASS_STYLE == '
+                    'GMIDL_CLASS_STYLE_DSMAP) {\n'
+                    '    var value = self[? __Foo_properties.items];\n'
+                    '    if (is_undefined(value)) {\n'
+                    '        value = ds_list_create();\n'))
+
+    def testDestructorOnlyFreesCreatedValues(self):
+        (self.expectations.expect(gmidl_wrappers.writeDestructor(
+                'Foo', ['items', 'lookup'], ['ds_list', 'ds_map'],
+                flags=gmidl_flags.kReleaseProfile, lazyNames=['items']))
+            .shouldContain(
+                    'if (!is_undefined(self[__Foo_properties.items])) {\n'
+                    '    ds_list_destroy(self[__Foo_properties.items]);\n'
+                    '}\n'
+                    'ds_map_destroy(self[__Foo_properties.lookup]);\n'))
+
+    def testDestructorOnlyDestroysCreatedChildren(self):
+        (self.expectations.expect(gmidl_wrappers.writeDestructor(
+                'Foo', ['child'], ['Bar'], flags=gmidl_flags.kReleaseProfile,
+                lazyNames=['child']))
+            .shouldContain(
+                    'if (!is_undefined(self[__Foo_properties.child])) {\n'
+                    '    Bar_destroy(self[__Foo_properties.child]);\n'
+                    '}\n'))
+
+    def testPooledDestructorOnlyClearsCreatedValues(self):
+        (self.expectations.expect(gmidl_wrappers.writePooledDestructor(
+                'Foo', ['items', 'owner'], ['ds_list', 'Bar'],
+                flags=gmidl_flags.kReleaseProfile,
+                lazyNames=['items', 'owner']))
+            .shouldContain(
+                    'if (!is_undefined(self[__Foo_properties.items])) {\n'
+                    '    ds_list_clear(self[__Foo_properties.items]);\n'
+                    '}\n'
+                    'if (!is_undefined(self[__Foo_properties.owner])) {\n'
+                    '    Bar_destroy(self[__Foo_properties.owner]);\n'
+                    '}\n'
+                    'self[@__Foo_properties.owner] = undefined;\n'))
+
+    def testColumnGetterCreatesValueOnFirstRead(self):
+        (self.expectations.expect(gmidl_wrappers.writeGetter(
+                'Foo', 'items', 'ds_list', columns=True, lazy=True))
+            .shouldContain(
+                    '    global.__gmidl_column_Foo_items__[argument0] = '
+                    'value;\n'))
+
+    def testColumnDestructorOnlyFreesCreatedValues(self):
+        (self.expectations.expect(gmidl_wrappers.writeColumnDestructor(
+                'Foo', ['items'], ['ds_list'], lazyNames=['items']))
+            .shouldContain(
+                    'if (!is_undefined('
+                    'global.__gmidl_column_Foo_items__[self])) {\n'))
+
+    def testColumnDestructorDestroysChildInstances(self):
+        (self.expectations.expect(gmidl_wrappers.writeColumnDestructor(
+                'Foo', ['child'], ['Bar']))
+            .shouldContain(
+                    'Bar_destroy(global.__gmidl_column_Foo_child__[self]);\n'))
+
+
+class MutatorTest(test_util.BaseTest):
+
+    def testArraySetAtWritesInPlace(self):
+        (self.expectations.expect(gmidl_wrappers.writeMutator(
+                'Foo', 'items', 'array', 'setAt',
+                flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('///Foo_setAtitems(self Foo, index real, '
+                    'value any)\n')
+            .shouldContain(
+                    'var items = argument0[__Foo_properties.items];\n'
+                    'if (is_array(items)) {\n'
+                    '    items[@argument1] = argument2;\n'
+                    '} else {\n')
+            .shouldContain(
+                    '    argument0[@__Foo_properties.items] = items;\n'))
+
+    def testArrayClearStoresDefaultValue(self):
+        (self.expectations.expect(gmidl_wrappers.writeMutator(
+                'Foo', 'items', 'array', 'clear',
+                flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('argument0[@__Foo_properties.items] = 0;\n')
+            .shouldNotContain('var items'))
+
+    def testDsMapSetAtTakesKey(self):
+        (self.expectations.expect(gmidl_wrappers.writeMutator(
+                'Foo', 'tags', 'ds_map', 'setAt',
+                flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('///Foo_setAttags(self Foo, key any, value any)\n')
+            .shouldContain('ds_map_replace(items, argument1, argument2);\n'))
+
+    def testLazyPropertyIsReadThroughGetter(self):
+        (self.expectations.expect(gmidl_wrappers.writeMutator(
+                'Foo', 'trail', 'ds_list', 'push',
+                flags=gmidl_flags.kReleaseProfile, lazy=True))
+            .shouldContain('var items = Foo_gettrail(argument0);\n'
+                    'ds_list_add(items, argument1);\n'))
+
+    def testChecksSelf(self):
+        (self.expectations.expect(gmidl_wrappers.writeMutator(
+                'Foo', 'trail', 'ds_list', 'clear',
+                flags=gmidl_flags.kDebugProfile))
+            .shouldContain('__check_instanceof__(argument0, Foo);\n')
+            .shouldContain('ds_list_clear(items);\n'))
+
+    def testNoMutatorsForScalars(self):
+        self.assertEqual(
+                gmidl_script_components.mutatorNames('real'), [])
+        self.assertEqual(
+                gmidl_script_components.mutatorNames('ds_map'),
+                ['setAt', 'clear'])
+
+
+class DirtyTrackingTest(test_util.BaseTest):
+
+    def testSetterMarksProperty(self):
+        (self.expectations.expect(gmidl_wrappers.writeSetter(
+                'Foo', 'x', 'real', dirtyBit=4))
+            .shouldContain(
+                    'if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY) {\n'
+                    '    self[@__Foo_properties.x] = value;\n'
+                    '    self[@__Foo_properties.__dirty] = '
+                        'self[__Foo_properties.__dirty] | 4;\n'
+                    '} else if')
+            .shouldContain(
+                    '    ds_map_replace(self, __Foo_properties.__dirty, '
+                        'self[? __Foo_properties.__dirty] | 4);\n'))
+
+    def testSetterWithoutDirtyBit(self):
+        (self.expectations.expect(gmidl_wrappers.writeSetter(
+                'Foo', 'x', 'real', flags=gmidl_flags.kReleaseProfile))
+            .shouldNotContain('__dirty'))
+
+    def testColumnSetterMarksProperty(self):
+        (self.expectations.expect(gmidl_wrappers.writeSetter(
+                'Foo', 'x', 'real', flags=gmidl_flags.kReleaseProfile,
+                columns=True, dirtyBit=2))
+            .shouldContain(
+                    'global.__gmidl_column_Foo_x__[argument0] = argument1;\n'
+                    'global.__gmidl_column_Foo___dirty__[argument0] = '
+                        'global.__gmidl_column_Foo___dirty__[argument0] '
+                        '| 2;\n'))
+
+    def testMutatorMarksProperty(self):
+        (self.expectations.expect(gmidl_wrappers.writeMutator(
+                'Foo', 'trail', 'ds_list', 'push',
+                flags=gmidl_flags.kReleaseProfile, dirtyBit=8))
+            .shouldContain(
+                    'ds_list_add(items, argument1);\n'
+                    'argument0[@__Foo_properties.__dirty] = '
+                        'argument0[__Foo_properties.__dirty] | 8;\n'))
+
+    def testGetDirty(self):
+        (self.expectations.expect(gmidl_wrappers.writeDirtyHelper(
+                'Foo', 'getDirty', flags=gmidl_flags.kReleaseProfile))
+            .shouldContain('///Foo_getDirty(self Foo; -> real)\n')
+            .shouldContain('return argument0[__Foo_properties.__dirty];\n'))
+
+    def testClearDirty(self):
+        (self.expectations.expect(gmidl_wrappers.writeDirtyHelper(
+                'Foo', 'clearDirty', flags=gmidl_flags.kDebugProfile))
+            .shouldContain('__check_instanceof__(argument0, Foo);\n')
+            .shouldContain('argument0[@__Foo_properties.__dirty] = 0;\n'))
+
+    def testForEachDirtyWalksSetBits(self):
+        (self.expectations.expect(gmidl_wrappers.writeDirtyHelper(
+                'Foo', 'forEachDirty'))
+            .shouldContain('var dirty;\n'
+                    'if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY) {\n'
+                    '    dirty = argument0[__Foo_properties.__dirty];\n')
+            .shouldContain(
+                    'var slot = 1;\n'
+                    'while (dirty != 0) {\n'
+                    '    if (dirty & 1) {\n'
+                    '        script_execute(argument1, argument0, slot);\n'
+                    '    }\n'
+                    '    dirty = dirty >> 1;\n'
+                    '    slot += 1;\n'
+                    '}\n'))
+
+    def testColumnForEachDirty(self):
+        (self.expectations.expect(gmidl_wrappers.writeDirtyHelper(
+                'Foo', 'forEachDirty', flags=gmidl_flags.kReleaseProfile,
+                columns=True))
+            .shouldContain('var dirty = '
+                    'global.__gmidl_column_Foo___dirty__[argument0];\n'))
+
+
+class TypeCheckElisionTest(test_util.BaseTest):
+
+    def testAnyArgumentsAreNotChecked(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self', 'thing'], ['Foo', 'any'],
+                flags=gmidl_flags.kDebugProfile))
+            .shouldContain('__check_instanceof__(argument0, Foo);')
+            .shouldNotContain('argument1, any'))
+
+    def testAnyArgumentsInArrayAreNotChecked(self):
+        argNames = ['arg%d' % i for i in range(17)]
+        argTypes = ['real'] + ['any'] * 16
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', argNames, argTypes,
+                flags=gmidl_flags.kDebugProfile))
+            .shouldContain('__check_instanceof__(argv[0], real);')
+            .shouldNotContain(', any);'))
+
+    def testAnySetterOnlyChecksSelf(self):
+        (self.expectations.expect(gmidl_wrappers.writeSetter(
+                'Foo', 'bar', 'any', flags=gmidl_flags.kDebugProfile))
+            .shouldContain('__check_instanceof__(self, Foo);')
+            .shouldNotContain('__check_instanceof__(value'))
+
+    def testOnlyAnyArgumentsLeavesNoGuard(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['thing'], ['any']))
+            .shouldNotContain('GMIDL_ENFORCE_TYPES'))
+
+    def testSampledByRate(self):
+        flags = gmidl_flags.FlagProfile('sampled', typeCheckRate=8)
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo'], flags=flags))
+            .shouldContain(
+                    'if (GMIDL_ENFORCE_TYPES) {\n'
+                    '    if (irandom(7) == 0) {\n'
+                    '        __check_instanceof__(argument0, Foo);\n'
+                    '    }\n'
+                    '}\n'))
+
+    def testQaProfileSamplesFirstCallsAndThenAtRandom(self):
+        (self.expectations.expect(gmidl_wrappers.writeSetter(
+                'Foo', 'bar', 'real', flags=gmidl_flags.kQaProfile))
+            .shouldContain(
+                    'var checkTypes = global.__gmidl_call_counts__'
+                        '[__gmidl_script_ids.Foo_setbar] < 100;\n'
+                    'if (checkTypes) {\n'
+                    '    global.__gmidl_call_counts__'
+                        '[__gmidl_script_ids.Foo_setbar] += 1;\n'
+                    '} else {\n'
+                    '    checkTypes = irandom(15) == 0;\n'
+                    '}\n'
+                    'if (checkTypes) {\n'
+                    '    __check_instanceof__(self, Foo);\n'
+                    '    __check_instanceof__(value, real);\n'
+                    '}\n')
+            .shouldNotContain('variable_global_exists')
+            .shouldNotContain('ds_map'))
+
+    def testSampledByFirstCallsOnly(self):
+        flags = gmidl_flags.FlagProfile(
+                'sampled', enforceTypes=True, typeCheckFirstCalls=10)
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo'], flags=flags))
+            .shouldContain(
+                    '    global.__gmidl_call_counts__'
+                        '[__gmidl_script_ids.Foo_baz] += 1;\n'
+                    '}\n'
+                    'if (checkTypes) {\n')
+            .shouldNotContain('irandom'))
+
+    def testCallCountsInitializer(self):
+        (self.expectations.expect(
+                gmidl_wrappers.writeCallCountsInitializer())
+            .shouldContain('///__gmidl_init_call_counts()\n')
+            .shouldContain(
+                    'for (i = __gmidl_script_ids.__count - 1; i >= 0; '
+                        'i -= 1) {\n'
+                    '    global.__gmidl_call_counts__[i] = 0;\n'
+                    '}\n'))
+
+
+class FlagSpecializationTest(test_util.BaseTest):
+
+    kFlagNames = [
+        'GMIDL_PROFILE_TIME',
+        'GMIDL_TRACK_SCOPE',
+        'GMIDL_ENFORCE_TYPES',
+        'GMIDL_CLASS_STYLE',
+    ]
+
+    def writeAllScripts(self, flags):
+        return [
+            gmidl_wrappers.writeConstructor(
+                    'Foo', ['bar'], ['ds_list'], flags=flags),
+            gmidl_wrappers.writeGetter('Foo', 'bar', 'ds_list', flags=flags),
+            gmidl_wrappers.writeSetter('Foo', 'bar', 'ds_list', flags=flags),
+            gmidl_wrappers.writeScriptWrapper(
+                    'Foo_baz', ['self', 'count'], ['Foo', 'real'], 'real',
+                    flags=flags),
+        ]
+
+    def testRuntimeProfileChecksEveryFlag(self):
+        text = ''.join(self.writeAllScripts(gmidl_flags.kRuntimeProfile))
+        for flagName in self.kFlagNames:
+            self.expectations.expect(text).shouldContain(
+                    'if (%s' % flagName)
+
+    def testSpecializedProfilesCheckNoFlags(self):
+        for flags in [
+                gmidl_flags.kDebugProfile,
+                gmidl_flags.kProfileProfile,
+                gmidl_flags.kReleaseProfile]:
+            for script in self.writeAllScripts(flags):
+                for flagName in self.kFlagNames:
+                    self.expectations.expect(script).shouldNotContain(
+                            flagName)
+                self.expectations.expect(script).shouldNotContain('\n\n\n')
+
+    def testReleaseGetterIsSingleIndexedRead(self):
+        getter = gmidl_wrappers.writeGetter(
+                'Foo', 'bar', 'real', flags=gmidl_flags.kReleaseProfile)
+        body = getter.split(
+                gmidl_script_components.kDoNotEditNotice)[1].strip()
+        self.assertEqual(body, 'return argument0[__Foo_properties.bar];')
+
+    def testReleaseSetterIsSingleIndexedWrite(self):
+        setter = gmidl_wrappers.writeSetter(
+                'Foo', 'bar', 'real', flags=gmidl_flags.kReleaseProfile)
+        body = setter.split(
+                gmidl_script_components.kDoNotEditNotice)[1].strip()
+        self.assertEqual(
+                body, 'argument0[@__Foo_properties.bar] = argument1;')
+
+    def testDsMapStyleGetter(self):
+        flags = gmidl_flags.FlagProfile(
+                'maps', classStyle=gmidl_flags.kClassStyleDsMap)
+        (self.expectations.expect(
+                gmidl_wrappers.writeGetter('Foo', 'bar', 'real', flags=flags))
+            .shouldContain('return argument0[? __Foo_properties.bar];')
+            .shouldNotContain('GMIDL_CLASS_STYLE'))
+
+    def testDebugProfileKeepsTypeChecksAndScopeTracking(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self', 'count'], ['Foo', 'real'],
+                flags=gmidl_flags.kDebugProfile))
+            .shouldContain('\n__check_instanceof__(argument0, Foo);\n')
+            .shouldContain('\n__check_instanceof__(argument1, real);\n')
+            .shouldContain('\nglobal.__gmidl_scope_stack__[scopeSlot] = '
+                    '__gmidl_script_ids.Foo_baz;\n')
+            .shouldContain('\nglobal.__gmidl_scope_depth__ -= 1;\n')
+            .shouldNotContain('__gmidl_profile'))
+
+    def testProfileProfileKeepsOnlyTimeProfiling(self):
+        (self.expectations.expect(gmidl_wrappers.writeScriptWrapper(
+                'Foo_baz', ['self'], ['Foo'],
+                flags=gmidl_flags.kProfileProfile))
+            .shouldContain('\nglobal.__gmidl_profile_calls__'
+                    '[__gmidl_script_ids.Foo_baz] += 1;\n')
+            .shouldContain('\n    __gmidl_profile_sample__('
+                    '__gmidl_script_ids.Foo_baz, profileCaller, '
+                    'get_timer() - profileStart);\n')
+            .shouldNotContain('__check_instanceof__')
+            .shouldNotContain('__gmidl_scope'))
+
+
 if __name__ == '__main__':
     unittest.main()
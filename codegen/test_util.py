@@ -0,0 +1,45 @@
+#!/usr/local/bin/python
+
+"""Helpers shared by the gmidl tests.
+
+BaseTest provides fluent expectations about generated text:
+
+    self.expectations.expect(text).shouldContain('var self = argument0;')
+"""
+
+import unittest
+
+
+class Expectation(object):
+
+    def __init__(self, testCase, text):
+        self._testCase = testCase
+        self._text = text
+
+    def shouldEqual(self, expected):
+        self._testCase.assertEqual(self._text, expected)
+        return self
+
+    def shouldContain(self, substring):
+        self._testCase.assertIn(substring, self._text)
+        return self
+
+    def shouldNotContain(self, substring):
+        self._testCase.assertNotIn(substring, self._text)
+        return self
+
+
+class Expectations(object):
+
+    def __init__(self, testCase):
+        self._testCase = testCase
+
+    def expect(self, text):
+        return Expectation(self._testCase, text)
+
+
+class BaseTest(unittest.TestCase):
+
+    @property
+    def expectations(self):
+        return Expectations(self)
@@ -30,6 +30,15 @@ well-formatted code.
 The IndentWriter extends LineWriter, which takes any object with
 a write() method with one argument, including Python file-like objects.
 
+When generating a lot of text, use a BufferedLineWriter, which gathers the
+written fragments and passes them to the output in large chunks. Buffered
+text reaches the output when the buffer fills up, when flush() is called,
+or when the writer is used as a context manager and the context exits:
+
+    with codegen.writing.IndentWriter(
+            lineWriter=codegen.writing.BufferedLineWriter(file)) as writer:
+        writer.writeLine('Dear Bob,')
+
 To test, run:
 
   python writing_test.py
@@ -42,6 +51,7 @@ kDefaultIndentWidth = 4
 kDefaultIndentChar = ' '
 kDefaultMaxLineWidth = 80
 kDefaultNewlineChar = '\n'
+kDefaultBufferSize = 64 * 1024
 
 
 class LineWriter(object):
@@ -56,6 +66,44 @@ class LineWriter(object):
     def writeLine(self, text=''):
         self._output.write(text + self._newline)
 
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exception, traceback):
+        self.flush()
+
+
+class BufferedLineWriter(LineWriter):
+
+    def __init__(self, output=None, newline=kDefaultNewlineChar,
+            bufferSize=kDefaultBufferSize):
+        super(BufferedLineWriter, self).__init__(output, newline)
+        self._bufferSize = bufferSize
+        self._fragments = []
+        self._bufferedLength = 0
+
+    def write(self, text):
+        self._fragments.append(text)
+        self._bufferedLength += len(text)
+        if self._bufferedLength >= self._bufferSize:
+            self.flush()
+
+    def writeLine(self, text=''):
+        self._fragments.append(text)
+        self._fragments.append(self._newline)
+        self._bufferedLength += len(text) + len(self._newline)
+        if self._bufferedLength >= self._bufferSize:
+            self.flush()
+
+    def flush(self):
+        if self._fragments:
+            self._output.write(''.join(self._fragments))
+            self._fragments = []
+            self._bufferedLength = 0
+
 
 class IndentWriter(LineWriter):
 
@@ -113,19 +161,20 @@ class IndentWriter(LineWriter):
         return self._IgnoreIndent(self)
 
     def write(self, text):
-        if self._heedIndent and self._atLineStart:
-            self._writer.write(self._indentPrefix + text)
-        else:
-            self._writer.write(text)
+        if self._heedIndent and self._atLineStart and self._indentPrefix:
+            self._writer.write(self._indentPrefix)
+        self._writer.write(text)
         self._atLineStart = False
 
     def writeLine(self, text=''):
-        if self._heedIndent and self._atLineStart:
-            self._writer.writeLine(self._indentPrefix + text)
-        else:
-            self._writer.writeLine(text)
+        if self._heedIndent and self._atLineStart and self._indentPrefix:
+            self._writer.write(self._indentPrefix)
+        self._writer.writeLine(text)
         self._atLineStart = True
 
+    def flush(self):
+        self._writer.flush()
+
     def getRemainingSpaceInLine(self):
         return self._maxLineWidth - len(self._indentPrefix)
 
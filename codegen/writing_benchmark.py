@@ -0,0 +1,94 @@
+#!/usr/local/bin/python
+
+"""Compares the throughput of unbuffered and buffered IndentWriters.
+
+Writes a synthetic project of getter-like scripts through an IndentWriter
+backed by a plain LineWriter (one output.write() per call) and by a
+BufferedLineWriter, to an in-memory sink, a block-buffered file and a
+line-buffered file (one system call per line when unbuffered).
+
+To run:
+
+  python writing_benchmark.py [numberOfScripts]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+import writing
+
+
+kDefaultNumberOfScripts = 50000
+
+
+def writeSyntheticScript(writer, i):
+    writer.writeLine('///Class%d_getvalue(self)' % i)
+    writer.writeLine('/' + '*' * 79)
+    writer.writeLine('Class%d_getvalue' % i)
+    writer.writeLine('*' * 79 + '/')
+    writer.writeLine('var self = argument0;')
+    writer.writeLine()
+    writer.writeLine('if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_ARRAY) {')
+    with writer.indent():
+        writer.write('return self[')
+        writer.write('__Class%d_properties_value' % i)
+        writer.writeLine('];')
+    writer.writeLine('} else if (GMIDL_CLASS_STYLE == GMIDL_CLASS_STYLE_DSMAP) {')
+    with writer.indent():
+        writer.write('return self[? ')
+        writer.write('__Class%d_properties_value' % i)
+        writer.writeLine('];')
+    writer.writeLine('}')
+
+
+def writeProject(writer, numberOfScripts):
+    with writer:
+        for i in range(numberOfScripts):
+            writeSyntheticScript(writer, i)
+
+
+def _timeWriter(makeLineWriter, makeOutput, numberOfScripts):
+    output = makeOutput()
+    start = time.perf_counter()
+    writeProject(
+            writing.IndentWriter(lineWriter=makeLineWriter(output)),
+            numberOfScripts)
+    elapsed = time.perf_counter() - start
+    return output, elapsed
+
+
+def main(numberOfScripts):
+    path = os.path.join(tempfile.gettempdir(), 'gmidl_writing_benchmark.txt')
+    sinks = [
+        ('StringIO', io.StringIO),
+        ('file', lambda: open(path, 'w')),
+        ('linefile', lambda: open(path, 'w', buffering=1)),
+    ]
+    lineWriters = [
+        ('LineWriter', writing.LineWriter),
+        ('BufferedLineWriter', writing.BufferedLineWriter),
+    ]
+    print('%d scripts' % numberOfScripts)
+    for sinkName, makeOutput in sinks:
+        results = {}
+        for writerName, makeLineWriter in lineWriters:
+            output, elapsed = _timeWriter(
+                    makeLineWriter, makeOutput, numberOfScripts)
+            if sinkName != 'StringIO':
+                output.close()
+                with open(path) as file:
+                    results[writerName] = file.read()
+            else:
+                results[writerName] = output.getvalue()
+            print('%-10s %-20s %8.3fs %10.0f scripts/s' % (
+                    sinkName, writerName, elapsed,
+                    numberOfScripts / elapsed))
+        assert results['LineWriter'] == results['BufferedLineWriter']
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else kDefaultNumberOfScripts)
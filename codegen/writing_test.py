@@ -1,5 +1,6 @@
 #!/usr/local/bin/python
 
+import io
 import os
 import unittest
 
@@ -43,6 +44,38 @@ class Recorder(object):
         return len(self._lines) - 1
 
 
+class FlushingReader(object):
+
+    def __init__(self, recorder, writer):
+        self._recorder = recorder
+        self._writer = writer
+
+    def readline(self):
+        self._writer.flush()
+        return self._recorder.readline()
+
+    def readlines(self):
+        self._writer.flush()
+        return self._recorder.readlines()
+
+    def __iter__(self):
+        self._writer.flush()
+        return iter(self._recorder)
+
+    def numberOfUnreadLines(self):
+        self._writer.flush()
+        return self._recorder.numberOfUnreadLines()
+
+
+class ChunkRecorder(object):
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, text):
+        self.chunks.append(text)
+
+
 class LineWriterTest(unittest.TestCase):
 
     def setUp(self):
@@ -95,6 +128,43 @@ class LineWriterTest(unittest.TestCase):
             ['ab', 'cde'])
 
 
+class BufferedLineWriterTest(LineWriterTest):
+
+    def setUp(self):
+        recorder = Recorder()
+        self.writer = writing.BufferedLineWriter(recorder)
+        self.recorder = FlushingReader(recorder, self.writer)
+
+    def testNothingIsWrittenBeforeFlush(self):
+        output = ChunkRecorder()
+        writer = writing.BufferedLineWriter(output)
+        writer.write('a')
+        writer.writeLine('b')
+        self.assertEqual(output.chunks, [])
+        writer.flush()
+        self.assertEqual(output.chunks, ['ab\n'])
+        writer.flush()
+        self.assertEqual(output.chunks, ['ab\n'])
+
+    def testFlushesWhenBufferIsFull(self):
+        output = ChunkRecorder()
+        writer = writing.BufferedLineWriter(output, bufferSize=10)
+        writer.write('abcde')
+        writer.write('fghij')
+        writer.write('klmno')
+        self.assertEqual(output.chunks, ['abcdefghij'])
+        writer.writeLine('pqrs')
+        self.assertEqual(output.chunks, ['abcdefghij', 'klmnopqrs\n'])
+
+    def testFlushesOnContextExit(self):
+        output = ChunkRecorder()
+        with writing.BufferedLineWriter(output) as writer:
+            writer.writeLine('first')
+            writer.writeLine('second')
+            self.assertEqual(output.chunks, [])
+        self.assertEqual(output.chunks, ['first\nsecond\n'])
+
+
 class FileReader(object):
 
     def __init__(self, filename, file):
@@ -241,5 +311,37 @@ class IndentWriterTest(LineWriterTest):
         testIndent(0, 20)
 
 
+class BufferedIndentWriterTest(IndentWriterTest):
+
+    def setUp(self):
+        recorder = Recorder()
+        self.writer = writing.IndentWriter(
+                lineWriter=writing.BufferedLineWriter(recorder))
+        self.recorder = FlushingReader(recorder, self.writer)
+
+    def testMatchesUnbufferedOutput(self):
+        def writeLetter(writer):
+            writer.writeLine('Dear Bob,')
+            with writer.indent():
+                writer.writeLine()
+                writer.write('How ')
+                writer.write('are ')
+                writer.writeLine('you?')
+                with writer.ignoreIndent():
+                    writer.writeLine('Unindented')
+                with writer.indent(2):
+                    writer.writeLine('Deeply indented')
+            writer.writeLine('Sincerely, Frank')
+        unbufferedOutput = io.StringIO()
+        writeLetter(writing.IndentWriter(unbufferedOutput))
+        for bufferSize in [1, 7, writing.kDefaultBufferSize]:
+            bufferedOutput = io.StringIO()
+            with writing.IndentWriter(lineWriter=writing.BufferedLineWriter(
+                    bufferedOutput, bufferSize=bufferSize)) as writer:
+                writeLetter(writer)
+            self.assertEqual(
+                    bufferedOutput.getvalue(), unbufferedOutput.getvalue())
+
+
 if __name__ == '__main__':
     unittest.main()